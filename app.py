@@ -1,140 +1,402 @@
-from flask import Flask, jsonify, request, render_template, send_file
-from openpyxl import load_workbook
-from google_lib.google_service import GoogleService
-import time
+from flask import (
+    Blueprint, Flask, Response, current_app, g, jsonify, make_response, request, render_template, send_file, url_for,
+)
+from google_lib import LazyGoogleService, create_async_google_service, create_google_service
+from google_lib.google_service import API_CALL_MAX_SECONDS
+from google_lib.request_executor import is_not_applied
+from excel_lib import (
+    DependencyCache, ResultCache, build_cached_workbook, configure_dependency_cache, load_template_index,
+    stream_cached_workbook, sync_templates,
+)
+from excel_lib.template_sync import TEMPLATE_INDEX_FILE_NAME
+from filling_lib import (
+    FillingSnapshot, SyncManifest, changed_row_runs, fetch_xlsx_files, fetch_xlsx_files_async, merge_option_order,
+    rows_as_read,
+)
+from server_lib import AuditLog, FileLock, JobQueue, JobQueueFull, Metrics, SharedRun, WorkerPool, stream_zip
 import os
+import json
+import time
+import asyncio
+import atexit
 import datetime
-import shutil
-from openpyxl.worksheet.datavalidation import DataValidation
+import unicodedata
+from urllib.parse import quote
 from dotenv import load_dotenv
 from zoneinfo import ZoneInfo
+from concurrent.futures import as_completed
 
 
 load_dotenv(dotenv_path="/home/repo/google_sheet_login/.env")
 # load_dotenv(dotenv_path=".env")
 
 
-app = Flask(__name__)
-gs = GoogleService()
+bp = Blueprint("main", __name__)
+# "google" talks to the real APIs, "local" serves Sheets from memory and Drive from LOCAL_BACKEND_DIR
+GOOGLE_BACKEND = os.getenv("GOOGLE_BACKEND", "google")
+# Built on first use, so importing the app needs no credentials
+gs = LazyGoogleService(
+    lambda: create_google_service(
+        GOOGLE_BACKEND, os.getenv("LOCAL_BACKEND_DIR"), float(os.getenv("LOCAL_BACKEND_LATENCY", "0"))
+    ),
+    on_create=lambda service: attach_metrics(service),
+)
+# Load client libraries, discovery documents, lookup tables and the master in create_app,
+# before the web server forks its workers
+APP_PRELOAD = os.getenv("APP_PRELOAD", "0") == "1"
 
 EXCEL_FOLDER_GOOGLE_DRIVE_ID = os.getenv("EXCEL_FOLDER_GOOGLE_DRIVE_ID")
 GOOGLE_SHEET_LOGIN_SHEET_ID = os.getenv("GOOGLE_SHEET_LOGIN_SHEET_ID")
 FILLING_SHEET_NAME = os.getenv("FILLING_SHEET_NAME", "Fillings")
 FILLING_DATA_SHEET_NAME = os.getenv("FILLING_DATA_SHEET_NAME", "FillingsData")
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-GENERATED_FOLDER = os.path.join(BASE_DIR, "generated")
+GENERATED_FOLDER = os.getenv("GENERATED_FOLDER", os.path.join(BASE_DIR, "generated"))
 EXCEL_MASTER_FILE_ID = os.getenv("MASTER_EXCEL_FILE_ID")
-EXCEL_TEMPLATE_FOLDER = os.path.join(BASE_DIR, "excel_templates")
+EXCEL_TEMPLATE_FOLDER = os.getenv("EXCEL_TEMPLATE_FOLDER", os.path.join(BASE_DIR, "excel_templates"))
 # US Central Time
 TIME_ZONE = ZoneInfo("America/Chicago")
-os.makedirs(GENERATED_FOLDER, exist_ok=True)
+# Login sheet lookup tables shared by all workers through one file, written by sync and
+# re-read from Google once older than FILLING_CACHE_TTL seconds (0 re-reads on every request)
+FILLING_CACHE_TTL = float(os.getenv("FILLING_CACHE_TTL", "300"))
+FILLING_SNAPSHOT_PATH = os.getenv("FILLING_SNAPSHOT_PATH", os.path.join(BASE_DIR, "cache", "filling_snapshot.json"))
+filling_snapshot = FillingSnapshot(FILLING_SNAPSHOT_PATH)
+# Held by whichever worker is syncing or re-reading the login sheet tables
+sync_lock = FileLock(f"{FILLING_SNAPSHOT_PATH}.lock")
+filling_sync = SharedRun(sync_lock, f"{FILLING_SNAPSHOT_PATH}.last_sync.json")
+# Seconds browsers may reuse the option list and index page without asking, 0 revalidates every
+# load with If-None-Match, which is answered 304 from the shared snapshot
+FILLING_OPTIONS_MAX_AGE = int(os.getenv("FILLING_OPTIONS_MAX_AGE", "0"))
+INDEX_TEMPLATE_PATH = os.path.join(BASE_DIR, "templates", "index.html")
+# Parallel workbook downloads during sync and template refresh
+SYNC_MAX_WORKERS = int(os.getenv("SYNC_MAX_WORKERS", "8"))
+# Download the sync's workbooks with the asyncio client (one pooled connection set, no thread per file)
+GOOGLE_ASYNC_FETCH = os.getenv("GOOGLE_ASYNC_FETCH", "0") == "1"
+# Parsed copies of the master workbook kept per worker
+MASTER_TEMPLATE_POOL_SIZE = int(os.getenv("MASTER_TEMPLATE_POOL_SIZE", "2"))
+# Write generated workbooks at the zip level instead of through openpyxl
+OOXML_WRITER = os.getenv("OOXML_WRITER", "1") == "1"
+# Memory bound of the parsed dependency workbooks kept per worker
+DEPENDENCY_CACHE_MAX_MB = float(os.getenv("DEPENDENCY_CACHE_MAX_MB", "256"))
+dependency_cache = DependencyCache(max_bytes=int(DEPENDENCY_CACHE_MAX_MB * 1024 * 1024))
+# Job and bulk worker processes size their own dependency cache the same way
+WORKER_INITIALIZER = {"initializer": configure_dependency_cache, "initargs": (dependency_cache.max_bytes,)}
+# Versions and extracted rows of already synced workbooks
+SYNC_MANIFEST_PATH = os.getenv("SYNC_MANIFEST_PATH", os.path.join(BASE_DIR, "cache", "sync_manifest.json"))
+sync_manifest = SyncManifest(SYNC_MANIFEST_PATH)
+# Generated workbooks reused for identical selections, deleted after RESULT_CACHE_MAX_AGE seconds
+# unused and least recently used first past the size limit
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "1024"))
+RESULT_CACHE_MAX_AGE = float(os.getenv("RESULT_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+result_cache = ResultCache(
+    os.path.join(GENERATED_FOLDER, "results"),
+    max_bytes=int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+    max_age=RESULT_CACHE_MAX_AGE or None,
+)
+# generate_excel_files builds into a spooled buffer and streams it; KEEP_GENERATED_FILES also
+# stores it in result_cache while sending, otherwise nothing is written to GENERATED_FOLDER
+STREAM_GENERATED_FILES = os.getenv("STREAM_GENERATED_FILES", "1") == "1"
+KEEP_GENERATED_FILES = os.getenv("KEEP_GENERATED_FILES", "1") == "1"
+GENERATED_SPOOL_MAX_MB = float(os.getenv("GENERATED_SPOOL_MAX_MB", "16"))
+XLSM_MIMETYPE = "application/vnd.ms-excel.sheet.macroEnabled.12"
+# Background Excel generation: worker processes, unfinished job limit and finished job lifetime
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "2"))
+GENERATION_MAX_PENDING = int(os.getenv("GENERATION_MAX_PENDING", "20"))
+GENERATION_JOB_TTL = float(os.getenv("GENERATION_JOB_TTL", "3600"))
+GENERATION_RETRY_AFTER = int(os.getenv("GENERATION_RETRY_AFTER", "5"))
+generation_jobs = JobQueue(
+    os.path.join(GENERATED_FOLDER, "jobs"),
+    max_workers=GENERATION_WORKERS,
+    max_pending=GENERATION_MAX_PENDING,
+    result_ttl=GENERATION_JOB_TTL,
+    **WORKER_INITIALIZER,
+)
+atexit.register(generation_jobs.shutdown)
+# Bulk generation: selections per request and the worker processes building them
+BULK_MAX_SELECTIONS = int(os.getenv("BULK_MAX_SELECTIONS", "500"))
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", str(os.cpu_count() or 2)))
+bulk_pool = WorkerPool(max_workers=BULK_WORKERS, **WORKER_INITIALIZER)
+atexit.register(bulk_pool.shutdown, wait=False, cancel_futures=True)
+# Login log rows are stored locally and appended to the sheet in batches
+AUDIT_LOG_DB_PATH = os.getenv("AUDIT_LOG_DB_PATH", os.path.join(BASE_DIR, "cache", "audit_log.sqlite3"))
+AUDIT_LOG_BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "500"))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "2"))
+# Rows claimed longer ago are sent again, must outlast the slowest append (deadline, backoff and HTTP timeout)
+AUDIT_LOG_CLAIM_TIMEOUT = float(os.getenv("AUDIT_LOG_CLAIM_TIMEOUT", str(2 * API_CALL_MAX_SECONDS)))
+audit_log = AuditLog(
+    AUDIT_LOG_DB_PATH,
+    lambda rows: send_login_rows(rows),
+    batch_size=AUDIT_LOG_BATCH_SIZE,
+    flush_interval=AUDIT_LOG_FLUSH_INTERVAL,
+    claim_timeout=AUDIT_LOG_CLAIM_TIMEOUT,
+    send_timeout=API_CALL_MAX_SECONDS,
+    # Appends are not idempotent, only batches Sheets certainly did not store are sent again
+    retry_if=is_not_applied,
+)
+atexit.register(audit_log.close)
+# Phase timings, Google call metrics, /metrics and Server-Timing
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+metrics = Metrics(enabled=METRICS_ENABLED)
+metrics.describe("app_phase_seconds", "Duration of named request phases")
+metrics.describe("google_api_calls_total", "Google API calls by method and outcome, retries included")
+metrics.describe("google_api_call_seconds", "Google API call latency, retries and rate limit waits included")
+metrics.describe("http_requests_total", "Requests by endpoint and status")
+metrics.describe("http_request_seconds", "Request latency by endpoint")
+metrics.describe("generation_job_seconds", "Background generation time from submit to finish")
+
+
+def create_app(preload=None):
+    """
+    Flask application serving bp
+    :param preload: run warm_up() before returning, defaults to APP_PRELOAD
+    """
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    os.makedirs(GENERATED_FOLDER, exist_ok=True)
+    # Results unused for too long are otherwise only dropped when a new one is stored
+    result_cache.evict()
+    if APP_PRELOAD if preload is None else preload:
+        with app.app_context():
+            warm_up()
+    return app
+
+
+def warm_up():
+    """Do the first request's one-off work now: imports, discovery documents, lookup tables and master"""
+    from excel_lib import prepare_master
+
+    try:
+        clients = gs.clients
+        if clients is not None:
+            clients.preload(("sheets", "v4"), ("drive", "v3"))
+        get_filling_tables()
+        master_file_path = os.path.join(EXCEL_TEMPLATE_FOLDER, get_master_file_name())
+        if os.path.exists(master_file_path):
+            prepare_master(master_file_path, MASTER_TEMPLATE_POOL_SIZE, OOXML_WRITER)
+    except Exception as e:
+        current_app.logger.warning(f"Warm-up incomplete, the first request finishes it: {e}")
+
+
+def attach_metrics(service):
+    if METRICS_ENABLED:
+        service.executor.observer = metrics.observe_google_call
+
+
+@bp.before_app_request
+def start_request_metrics():
+    g.metrics_token = metrics.start_request()
+    g.request_start = time.perf_counter()
+
+
+@bp.after_app_request
+def record_request_metrics(response):
+    if metrics.enabled:
+        elapsed = time.perf_counter() - g.request_start
+        endpoint = request.endpoint or "unknown"
+        metrics.inc("http_requests_total", (("endpoint", endpoint), ("status", response.status_code)))
+        metrics.observe("http_request_seconds", elapsed, (("endpoint", endpoint),))
+        metrics.add_request_timing("total", elapsed)
+        response.headers["Server-Timing"] = metrics.server_timing()
+    return response
+
+
+@bp.teardown_app_request
+def end_request_metrics(exc):
+    metrics.end_request(g.pop("metrics_token", None))
 
 
-@app.route("/")
+@bp.route("/metrics")
+def prometheus_metrics():
+    if not metrics.enabled:
+        return jsonify({"is_success": False, "err_msg": "Metrics are disabled, set METRICS_ENABLED=1"}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@bp.route("/")
 def index():
-    return render_template("index.html", filling_options=fetch_filling_options())
+    try:
+        tables = get_filling_tables()
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch filling options: {str(e)}"}), 500
+    # 🔹 The page changes with the option list or the template
+    etag = f"{tables.option_list_version}-{os.stat(INDEX_TEMPLATE_PATH).st_mtime_ns:x}"
+    return conditional_response(etag, lambda: render_template("index.html", filling_options=tables.option_list))
 
 
-@app.route("/api/sync_filling_data", methods=["POST"])
+@bp.route("/api/sync_filling_data", methods=["POST"])
 def sync_filling_data():
+    full_sync = (request.get_json(silent=True) or {}).get("full_sync", False)
+    try:
+        # 🔹 One sync at a time across workers, a request arriving during a sync gets that sync's result
+        result, attached = filling_sync.run(lambda: run_filling_sync(full_sync))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(dict(result, attached=attached))
+
+
+def run_filling_sync(full_sync=False):
+    """Rebuild the login sheet tables from the Drive workbooks, call through filling_sync"""
     fillings_sheet = []
     fillings_data_sheet = []
     option_list = []
-    try:
-        # 1. List Excel files in folder
-        list_file_result = gs.list_latest_files_in_folder(EXCEL_FOLDER_GOOGLE_DRIVE_ID, "mimeType='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' and trashed=false")
-        file_list = list_file_result.get("files", [])
-
-        # 2. Iterate over files
+    file_report = []
+    # Another worker may have run the last sync, start from the manifest it saved
+    sync_manifest.reload()
+    # 1. List Excel files in folder
+    list_file_result = gs.list_latest_files_in_folder(EXCEL_FOLDER_GOOGLE_DRIVE_ID, "mimeType='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' and trashed=false")
+    file_list = list_file_result.get("files", [])
+
+    # 2. Download and parse only changed files in parallel, reuse stored rows for the rest
+    cached_contents = {}
+    if not full_sync:
         for file_info in file_list:
-            read_file_result = gs.read_xlsx_file(file_info["id"], ["Fillings", "FillingsData"])
-            if not read_file_result["is_success"]:
-                continue
-
-            file_data = read_file_result["file_content"]
-
-            # Fillings sheet rows
-            for row in file_data.get("Fillings", [])[1:]:
-                fillings_sheet.append(row)
-                option_list.append(row[1])
-
-            # FillingsData sheet rows
-            for row in file_data.get("FillingsData", [])[1:]:
-                # Map row to expected fields
-                if row and len(row) >= 6:
-                    fillings_data_sheet.append([
-                        row[1],  # Filling Name
-                        row[2],  # System Type
-                        row[3],  # Module
-                        row[4],  # Suffix
-                        row[5],  # MaxModules
-                    ])
-
-        # 3. Clear old ranges
-        gs.clear_range(GOOGLE_SHEET_LOGIN_SHEET_ID, f"'{FILLING_SHEET_NAME}'!A2:G")
-        time.sleep(0.1)
-        gs.clear_range(GOOGLE_SHEET_LOGIN_SHEET_ID, f"'{FILLING_DATA_SHEET_NAME}'!A2:F")
-        time.sleep(0.1)
-
-        # 4. Write new values
-        if fillings_sheet:
-            gs.write_sheet(GOOGLE_SHEET_LOGIN_SHEET_ID, f"{FILLING_SHEET_NAME}!A2", fillings_sheet)
-            time.sleep(0.1)
-        if fillings_data_sheet:
-            gs.write_sheet(GOOGLE_SHEET_LOGIN_SHEET_ID, f"{FILLING_DATA_SHEET_NAME}!B2", fillings_data_sheet)
-            time.sleep(0.1)
-
-        option_list = list(set(option_list))
-        current_option_list = []
-        filling_order_data = gs.read_sheet(os.getenv("GOOGLE_SHEET_LOGIN_SHEET_ID"), "FillingsOrder!A2:A")
-        for row in filling_order_data:
-            if row[0]:
-                current_option_list.append(row[0])
-
-        new_option_list = []
-        for option in current_option_list:
-            if option in option_list:
-                new_option_list.append([option])
-        for option in option_list:
-            if option not in current_option_list:
-                new_option_list.append([option])
-        gs.clear_range(GOOGLE_SHEET_LOGIN_SHEET_ID, f"FillingsOrder!A2:A")
-        time.sleep(0.1)
-        gs.write_sheet(GOOGLE_SHEET_LOGIN_SHEET_ID, f"FillingsOrder!A2", new_option_list)
-        time.sleep(0.1)
-
-        # 5. Return JSON
-        return jsonify({
-            "fillings_sheet": fillings_sheet,
-            "fillings_data_sheet": fillings_data_sheet
+            file_content = sync_manifest.get_content(file_info)
+            if file_content is not None:
+                cached_contents[file_info["id"]] = file_content
+
+    changed_file_list = [f for f in file_list if f["id"] not in cached_contents]
+    with metrics.phase("fetch_files"):
+        if GOOGLE_ASYNC_FETCH:
+            fetched_results = asyncio.run(fetch_xlsx_files_with_async_client(changed_file_list))
+        else:
+            fetched_results = fetch_xlsx_files(gs, changed_file_list, ["Fillings", "FillingsData"], SYNC_MAX_WORKERS)
+    fetched_results = {r["file_id"]: r for r in fetched_results}
+
+    for file_info in file_list:
+        if file_info["id"] in cached_contents:
+            read_file_result = {
+                "is_success": True,
+                "err_msg": "",
+                "file_name": file_info["name"],
+                "file_content": cached_contents[file_info["id"]],
+                "file_id": file_info["id"],
+                "seconds": 0,
+            }
+        else:
+            read_file_result = fetched_results[file_info["id"]]
+            if read_file_result["is_success"]:
+                sync_manifest.update(file_info, read_file_result["file_content"])
+
+        file_report.append({
+            "file_id": read_file_result["file_id"],
+            "file_name": read_file_result["file_name"],
+            "is_success": read_file_result["is_success"],
+            "err_msg": read_file_result["err_msg"],
+            "seconds": read_file_result["seconds"],
+            "cached": file_info["id"] in cached_contents,
         })
+        if not read_file_result["is_success"]:
+            continue
+
+        file_data = read_file_result["file_content"]
+
+        # Fillings sheet rows
+        for row in file_data.get("Fillings", [])[1:]:
+            fillings_sheet.append(row)
+            option_list.append(row[1])
+
+        # FillingsData sheet rows
+        for row in file_data.get("FillingsData", [])[1:]:
+            # Map row to expected fields
+            if row and len(row) >= 6:
+                fillings_data_sheet.append([
+                    row[1],  # Filling Name
+                    row[2],  # System Type
+                    row[3],  # Module
+                    row[4],  # Suffix
+                    row[5],  # MaxModules
+                ])
+
+    # 3. Read current login sheet tables, header rows included, in one request
+    fillings_table, fillings_data_table, filling_order_data = gs.batch_get(
+        GOOGLE_SHEET_LOGIN_SHEET_ID,
+        [
+            f"'{FILLING_SHEET_NAME}'!A1:G",
+            f"'{FILLING_DATA_SHEET_NAME}'!A1:F",
+            "FillingsOrder!A2:A",
+        ]
+    )
+    fillings_header, current_fillings = fillings_table[:1] or [[]], fillings_table[1:]
+    fillings_data_header, current_fillings_data = fillings_data_table[:1] or [[]], fillings_data_table[1:]
+
+    current_option_list = [row[0] for row in filling_order_data if row and row[0]]
+    new_option_list = [[option] for option in merge_option_order(current_option_list, option_list)]
+
+    # 4. Write only the rows that changed, in one request; readers never see emptied sheets
+    write_data = []
+    new_fillings_data = [[""] + row for row in fillings_data_sheet]
+    for sheet_name, current_rows, new_rows, width in (
+        (FILLING_SHEET_NAME, current_fillings, fillings_sheet, 7),
+        (FILLING_DATA_SHEET_NAME, current_fillings_data, new_fillings_data, 6),
+        ("FillingsOrder", filling_order_data, new_option_list, 1),
+    ):
+        for offset, rows in changed_row_runs(current_rows, new_rows, width):
+            write_data.append((f"'{sheet_name}'!A{2 + offset}", rows))
+    if write_data:
+        gs.batch_update(GOOGLE_SHEET_LOGIN_SHEET_ID, write_data)
+    # Every worker picks up the tables as now stored in the sheet, in the shape read_filling_tables() returns
+    filling_snapshot.save(
+        rows_as_read(fillings_header + fillings_sheet, 7),
+        [row[1:] for row in rows_as_read(fillings_data_header + new_fillings_data, 6)],
+        rows_as_read(new_option_list, 1),
+    )
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    if list_file_result.get("is_success"):
+        sync_manifest.prune(f["id"] for f in file_list)
+    sync_manifest.save()
 
+    # 5. Return JSON
+    return {
+        "fillings_sheet": fillings_sheet,
+        "fillings_data_sheet": fillings_data_sheet,
+        "files": file_report,
+        "updated_rows": sum(len(values) for _, values in write_data),
+    }
 
-@app.route("/api/get_filling_options", methods=["GET"])
-def get_filling_options():
-    return jsonify(fetch_filling_options())
 
+async def fetch_xlsx_files_with_async_client(file_list):
+    # The async client is bound to this asyncio.run loop and closed with it
+    async with create_async_google_service(gs) as ags:
+        return await fetch_xlsx_files_async(ags, file_list, ["Fillings", "FillingsData"])
 
-def fetch_filling_options():
-    try:
-        sheet_id = os.getenv("GOOGLE_SHEET_LOGIN_SHEET_ID")
-        read_sheet_data = gs.read_sheet(sheet_id, f"FillingsOrder!A2:A")
-        # Extract values safely
-        option_list = [
-            row[0] for row in read_sheet_data if row and row[0]
-        ]
-        # Deduplicate while preserving order
-        option_list = list(dict.fromkeys(option_list))
-        return option_list
 
+@bp.route("/api/get_filling_options", methods=["GET"])
+def get_filling_options():
+    try:
+        tables = get_filling_tables()
     except Exception as e:
         return jsonify({"error": f"Failed to fetch filling options: {str(e)}"}), 500
+    return conditional_response(tables.option_list_version, lambda: jsonify(tables.option_list))
+
 
+def conditional_response(etag, build):
+    """
+    Response validated by etag: 304 without calling build() when the client already has it
+    :param build: returns the full response (or body) for clients without a matching If-None-Match
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(build())
+    response.set_etag(etag)
+    if FILLING_OPTIONS_MAX_AGE:
+        response.cache_control.max_age = FILLING_OPTIONS_MAX_AGE
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+@bp.route("/api/cache_stats", methods=["GET"])
+def cache_stats():
+    return jsonify({
+        "filling_snapshot": filling_snapshot.stats(),
+        "filling_sync": filling_sync.stats(),
+        "dependency_cache": dependency_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "audit_log": audit_log.stats(),
+    })
 
-@app.route("/api/download_template_file", methods=["POST"])
+
+@bp.route("/api/download_template_file", methods=["POST"])
 def download_template_file():
     try:
         folder_id = os.getenv("EXCEL_FOLDER_GOOGLE_DRIVE_ID")
@@ -147,105 +409,69 @@ def download_template_file():
 
         file_list = list_file_result["files"]
 
-        # 2. Download each file into TEMPLATE_FOLDER
-        for file_info in file_list:
-            file_path = os.path.join(EXCEL_TEMPLATE_FOLDER, file_info["name"])
-            gs.download_file(file_info["id"], file_path)
+        # 2. Download changed files into TEMPLATE_FOLDER in parallel, skip unchanged ones
+        force = (request.get_json(silent=True) or {}).get("force", False)
+        sync_result = sync_templates(gs, file_list, EXCEL_TEMPLATE_FOLDER, SYNC_MAX_WORKERS, force)
+
+        if sync_result["failed"]:
+            failed_names = [f["name"] for f in sync_result["files"] if f["status"] == "failed"]
+            sync_result["is_success"] = False
+            sync_result["err_msg"] = f"Failed to download: {', '.join(failed_names)}"
+            return jsonify(sync_result), 500
 
-        return jsonify({"is_success": True})
+        sync_result["is_success"] = True
+        return jsonify(sync_result)
 
     except Exception as e:
-        app.logger.error(f"Error in download_template_file: {e}")
+        current_app.logger.error(f"Error in download_template_file: {e}")
         return jsonify({"is_success": False, "err_msg": str(e)}), 500
 
 
-def validate_input(filling_options, loading_codes):
-    result = {"is_success": False, "err_msg": ""}
-
-    # split loading codes into list
-    loading_codes_list = [x.strip() for x in loading_codes.split(",") if x.strip()]
-
-    if not filling_options:
-        result["err_msg"] = "Mandatory field Filling Options is empty"
-        return result
-
-    # --- read sheets
-    read_filling_result = gs.read_sheet(
-        os.getenv("GOOGLE_SHEET_LOGIN_SHEET_ID"),
-        f"'{os.getenv('FILLING_SHEET_NAME')}'!A1:G"
-    )
-    read_filling_data_result = gs.read_sheet(
-        os.getenv("GOOGLE_SHEET_LOGIN_SHEET_ID"),
-        f"'{os.getenv('FILLING_DATA_SHEET_NAME')}'!B1:F"
+def get_filling_tables():
+    """Compiled login sheet lookup tables (FillingIndex) of the shared snapshot"""
+    snapshot = filling_snapshot.current()
+    if snapshot is None:
+        # --- nothing saved yet, wait for whoever is reading the sheet
+        with sync_lock:
+            snapshot = filling_snapshot.current() or filling_snapshot.save(*read_filling_tables())
+    elif snapshot.age() > FILLING_CACHE_TTL and sync_lock.acquire(blocking=False):
+        # --- stale: one worker re-reads the sheet, the others keep serving this version meanwhile
+        try:
+            latest = filling_snapshot.current()
+            if latest is None or latest.version == snapshot.version:
+                snapshot = filling_snapshot.save(*read_filling_tables())
+            else:
+                snapshot = latest
+        finally:
+            sync_lock.release()
+    return snapshot.index
+
+
+def read_filling_tables():
+    """Fillings, FillingsData and FillingsOrder rows as stored in the login sheet"""
+    return gs.batch_get(
+        GOOGLE_SHEET_LOGIN_SHEET_ID,
+        [
+            f"'{FILLING_SHEET_NAME}'!A1:G",
+            f"'{FILLING_DATA_SHEET_NAME}'!B1:F",
+            "FillingsOrder!A2:A",
+        ]
     )
 
-    # --- build filling_data_dict
-    filling_data_dict = {}
-    filling_data_header = read_filling_data_result[0]
-    for row_data in read_filling_data_result[1:]:
-        row_dict = get_row_dict(row_data, filling_data_header)
-        if row_dict.get("Filling Name"):
-            filling_data_dict.setdefault(row_dict["Filling Name"], [])
-            filling_data_dict[row_dict["Filling Name"]].append(row_data)
-
-    # --- build filling_info_dict
-    filling_info_dict = {}
-    filling_header = read_filling_result[0]
-    for row_data in read_filling_result[1:]:
-        row_dict = get_row_dict(row_data, filling_header)
-        filling_visible_name = row_dict.get("Visible Name")
-        filling_name = row_dict.get("Filling Name")
-
-        if filling_visible_name:
-            filling_info_dict.setdefault(filling_visible_name, {})
-
-            dependencies_splited = row_dict.get("Dependencies", "").split(",")
-            dependencies_list = [d.strip() for d in dependencies_splited if d.strip()]
-            dependencies_list.append(row_dict.get("SpreadSheet Name"))
-
-            filling_info_dict[filling_visible_name][filling_name] = {
-                "row_data": row_data,
-                "LC_code": row_dict.get("Loading Code", ""),
-                "sheet_name": row_dict.get("SpreadSheet Name"),
-                "sheet_id": row_dict.get("SpreadSheet ID"),
-                "filling_data": filling_data_dict.get(filling_name, []),
-                "dependencies": dependencies_list,
-            }
-
-    # --- validate requested filling_options
-    validated_filling_dict = {}
-    for filling_option in filling_options:
-        if filling_option not in filling_info_dict:
-            result["err_msg"] = f"Filling options: {filling_option} is not available. Please contact developer"
-            return result
-
-        validated_filling_name_list = []
-        filling_code_dict = filling_info_dict[filling_option]
-
-        for filling_name, details in filling_code_dict.items():
-            expected_loading_code = details.get("LC_code", "")
-            if expected_loading_code in loading_codes_list or expected_loading_code == "":
-                validated_filling_name_list.append(filling_name)
-                loading_codes_list = [val for val in loading_codes_list if val != expected_loading_code]
-
-        if not validated_filling_name_list:
-            result["err_msg"] = f"Option code not found for filling: {filling_option}."
-            return result
 
-        validated_filling_dict[filling_option] = {
-            filling_name: filling_info_dict[filling_option][filling_name]
-            for filling_name in validated_filling_name_list
-        }
+def validate_input(filling_options, loading_codes, tables=None):
+    """:param tables: FillingIndex to validate against, defaults to the current snapshot"""
+    if not filling_options:
+        return {"is_success": False, "err_msg": "Mandatory field Filling Options is empty"}
+    return (tables or get_filling_tables()).validate(filling_options, loading_codes)
 
-    result["is_success"] = True
-    result["validated_filling_dict"] = validated_filling_dict
-    return result
 
-@app.route("/api/generate_excel_files", methods=["POST"])
+@bp.route("/api/generate_excel_files", methods=["POST"])
 def generate_excel_files():
     err_msg = ""
     file_name = ""
     copy_path = ""
+    workbook = None
     body = request.get_json()
     filling_options = body.get("filling_options", [])
     loading_codes = body.get("loading_codes", "")
@@ -254,70 +480,23 @@ def generate_excel_files():
     client_ip = request.remote_addr
     login_row = [time_now.strftime("%Y-%m-%d %H:%M:%S"), client_ip, ", ".join(filling_options), loading_codes]
     # 🔹 Validate input
-    validate_result = validate_input(filling_options, loading_codes)
+    with metrics.phase("validate"):
+        validate_result = validate_input(filling_options, loading_codes)
     if validate_result["is_success"]:
         try:
-            validated_filling_dict = validate_result["validated_filling_dict"]
-            filling = []
-            filling_data = []
-            dependencies = []
-            # 🔹 Collect data
-
-            for filling_option, names in validated_filling_dict.items():
-                for filling_name, details in names.items():
-                    filling.append(details["row_data"])
-                    filling_data.extend(details["filling_data"])
-                    dependencies.extend(details["dependencies"])
-
-            dependencies = list(dict.fromkeys(dependencies))  # dedupe
-
-            # 🔹 Create timestamped file name
-            master_file_name = gs.get_file_name(EXCEL_MASTER_FILE_ID)
-            master_file_path = os.path.join(EXCEL_TEMPLATE_FOLDER, master_file_name)
-            file_name = f"User Copy of {master_file_name.replace('.xlsm', '').replace('Template_', '')} {timestamp}.xlsm"
-            copy_path = os.path.join(GENERATED_FOLDER, file_name)
-
-            # 🔹 Copy master file
-            shutil.copy(master_file_path, copy_path)
-
-            # 🔹 Load workbook
-            wb = load_workbook(copy_path, keep_vba=True)
-
-            # 🔹 Write Fillings
-            if "Fillings" in wb.sheetnames and filling:
-                ws = wb["Fillings"]
-                for r, row in enumerate(filling, start=2):
-                    for c, val in enumerate(row, start=1):
-                        ws.cell(row=r, column=c, value=val)
-
-            # 🔹 Write FillingsData
-            if "FillingsData" in wb.sheetnames and filling_data:
-                ws = wb["FillingsData"]
-                for r, row in enumerate(filling_data, start=2):  # write starting at row 2
-                    for c, val in enumerate(row, start=2):
-                        if isinstance(val, str) and val.strip().replace(".", "", 1).isdigit():
-                            # Convert to int or float depending on presence of "."
-                            if "." in val:
-                                val = float(val)
-                            else:
-                                val = int(val)
-                        ws.cell(row=r, column=c, value=val)
-            rebuild_data_validation(wb)
-
-            # 🔹 Copy dependency sheets (if exist)
-            for dep in dependencies:
-                dep_file = os.path.join(EXCEL_TEMPLATE_FOLDER, f"{dep}.xlsx")
-                if os.path.exists(dep_file):
-                    dep_wb = load_workbook(dep_file)
-                    for sheet_name in dep_wb.sheetnames:
-                        if sheet_name not in ("Fillings", "FillingsData") and "." in sheet_name:
-                            dep_ws = dep_wb[sheet_name]
-                            copied_ws = copy_sheet_values(dep_ws, wb, f"{sheet_name}.{dep}")
-                            copied_ws.sheet_state = "hidden"
-
-            # 🔹 Save workbook
-            wb.save(copy_path)
-            wb.close()
+            with metrics.phase("prepare"):
+                generation = prepare_generation(validate_result["validated_filling_dict"], timestamp)
+            file_name = generation["file_name"]
+
+            # 🔹 Write the copy from the prepared master, or reuse the stored one
+            with metrics.phase("build"):
+                if STREAM_GENERATED_FILES:
+                    workbook = stream_cached_workbook(
+                        *generation_args(generation, dependency_cache),
+                        keep=KEEP_GENERATED_FILES, max_memory=int(GENERATED_SPOOL_MAX_MB * 1024 * 1024)
+                    )
+                else:
+                    copy_path = build_cached_workbook(*generation_args(generation, dependency_cache))
             login_row.append(f"Success: Excel file: {file_name} has been generated")
             login_row.append("1")
         except Exception as e:
@@ -328,11 +507,21 @@ def generate_excel_files():
         login_row.append(f"Failed: {err_msg}")
         login_row.append("0")
 
-    gs.append_sheet(
-            os.getenv("GOOGLE_SHEET_LOGIN_SHEET_ID"),
-            f"{os.getenv('LOGIN_LOG_SHEET_NAME')}",
-            [login_row]
-        )
+    try:
+        with metrics.phase("audit"):
+            append_login_row(login_row)
+
+        if workbook is not None:
+            # 🔹 Stream the built bytes, a kept copy is written to disk as they are sent
+            response = Response(workbook, mimetype=XLSM_MIMETYPE, direct_passthrough=True)
+            response.headers.set("Content-Disposition", "attachment", **attachment_file_name(file_name))
+            response.content_length = workbook.size
+            return response
+    except BaseException:
+        # --- the response never took the stream, close it here or its spooled file leaks
+        if workbook is not None:
+            workbook.close()
+        raise
 
     if err_msg:
         return jsonify(login_row)
@@ -341,70 +530,304 @@ def generate_excel_files():
             copy_path,
             as_attachment=True,
             download_name=file_name,
-            mimetype="application/vnd.ms-excel.sheet.macroEnabled.12"
+            mimetype=XLSM_MIMETYPE
         )
 
 
-def get_row_dict(row_data, header):
-    row_dict = {}
-    for index, col_name in enumerate(header):
-        if str(col_name):  # only if header cell has value
-            if index < len(row_data):
-                row_dict[col_name] = row_data[index]
+@bp.route("/api/generate_excel_files/bulk", methods=["POST"])
+def generate_excel_files_bulk():
+    """
+    Build one workbook per selection and stream them back in a zip as they finish.
+    Body: {"selections": [{"filling_options": [...], "loading_codes": "..."}, ...]}
+    The zip ends with summary.json, the outcome of every selection.
+    """
+    body = request.get_json(silent=True) or {}
+    selections = body.get("selections")
+    if not isinstance(selections, list) or not selections:
+        return jsonify({"is_success": False, "err_msg": "selections must be a non-empty list"}), 400
+    if len(selections) > BULK_MAX_SELECTIONS:
+        return jsonify({"is_success": False, "err_msg": f"At most {BULK_MAX_SELECTIONS} selections per request"}), 400
+    time_now = datetime.datetime.now(TIME_ZONE)
+    timestamp = time_now.strftime("%Y%m%d %H%M%S")
+    client_ip = request.remote_addr
+
+    # 🔹 Validate every selection against one snapshot, identical workbooks are built once
+    entries = []
+    futures = {}  # result key -> future of its stored path
+    generations = {}  # result key -> prepare_generation result, to build it again
+    with metrics.phase("prepare"):
+        tables = get_filling_tables()
+        master_file_name = get_master_file_name()
+        for index, selection in enumerate(selections):
+            selection = selection if isinstance(selection, dict) else {}
+            filling_options = selection.get("filling_options", [])
+            loading_codes = selection.get("loading_codes", "")
+            entry = {
+                "index": index,
+                "filling_options": filling_options,
+                "loading_codes": loading_codes,
+                "login_row": [time_now.strftime("%Y-%m-%d %H:%M:%S"), client_ip, ", ".join(filling_options), loading_codes],
+                "file_name": "",
+                "err_msg": "",
+                "key": None,
+                "sent": False,
+            }
+            entries.append(entry)
+            validate_result = validate_input(filling_options, loading_codes, tables)
+            if not validate_result["is_success"]:
+                entry["err_msg"] = validate_result["err_msg"]
+                continue
+            try:
+                generation = prepare_generation(validate_result["validated_filling_dict"], timestamp, master_file_name)
+                entry["file_name"] = f"{index + 1:03d} {generation['file_name']}"
+                entry["key"] = generation["key"]
+                if generation["key"] not in futures:
+                    generations[generation["key"]] = generation
+                    # --- each worker process keeps the parsed master and dependencies between selections
+                    futures[generation["key"]] = bulk_pool.submit(build_cached_workbook, *generation_args(generation))
+            except Exception as e:
+                entry["err_msg"] = f"❌ Excel generation failed: {e}"
+
+    def summary():
+        return [
+            {
+                "index": entry["index"],
+                "filling_options": entry["filling_options"],
+                "loading_codes": entry["loading_codes"],
+                "is_success": entry["sent"],
+                "err_msg": entry["err_msg"],
+                "file_name": entry["file_name"] if entry["sent"] else "",
+            }
+            for entry in entries
+        ]
+
+    def log_entries():
+        # 🔹 One batched append for the whole request
+        for future in futures.values():
+            future.cancel()
+        login_rows = []
+        for entry in entries:
+            if entry["sent"]:
+                result_row = [f"Success: Excel file: {entry['file_name']} has been generated", "1"]
             else:
-                row_dict[col_name] = ""
-    return row_dict
+                result_row = [f"Failed: {entry['err_msg'] or 'Download was interrupted'}", "0"]
+            login_rows.append(entry["login_row"] + result_row)
+        audit_log.enqueue_many(login_rows)
 
+    if not futures:
+        log_entries()
+        return jsonify({"is_success": False, "err_msg": "No selection could be generated", "results": summary()}), 400
 
-def copy_sheet_values(source_ws, target_wb, new_title):
-    target_ws = target_wb.create_sheet(title=new_title)
-    for row in source_ws.iter_rows():
-        for cell in row:
-            new_cell = target_ws[cell.coordinate]
-            new_cell.value = cell.value
-    return target_ws
+    def open_workbook(key, path):
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            # --- evicted from result_cache since it was built, build it again
+            path = bulk_pool.submit(build_cached_workbook, *generation_args(generations[key])).result()
+            return open(path, "rb")
+
+    def finished_workbooks():
+        keys = {future: key for key, future in futures.items()}
+        for future in as_completed(keys):
+            key = keys[future]
+            try:
+                path, err_msg = future.result(), ""
+            except Exception as e:
+                path, err_msg = None, f"❌ Excel generation failed: {e}"
+            for entry in entries:
+                if entry["key"] != key:
+                    continue
+                if not err_msg:
+                    try:
+                        fh = open_workbook(key, path)
+                    except Exception as e:
+                        err_msg = f"❌ Excel generation failed: {e}"
+                if err_msg:
+                    entry["err_msg"] = err_msg
+                    continue
+                yield entry["file_name"], fh
+                entry["sent"] = True
+        yield "summary.json", json.dumps(summary(), ensure_ascii=False, indent=2).encode("utf-8")
+
+    response = Response(stream_zip(finished_workbooks()), mimetype="application/zip")
+    response.headers.set("Content-Disposition", "attachment", filename=f"Excel files {timestamp}.zip")
+    response.call_on_close(log_entries)
+    return response
+
+
+@bp.route("/api/generate_excel_jobs", methods=["POST"])
+def submit_generate_excel_job():
+    body = request.get_json()
+    filling_options = body.get("filling_options", [])
+    loading_codes = body.get("loading_codes", "")
+    time_now = datetime.datetime.now(TIME_ZONE)
+    timestamp = time_now.strftime("%Y%m%d %H%M%S")
+    client_ip = request.remote_addr
+    login_row = [time_now.strftime("%Y-%m-%d %H:%M:%S"), client_ip, ", ".join(filling_options), loading_codes]
+    # 🔹 Validate input in the request, only the workbook build is queued
+    with metrics.phase("validate"):
+        validate_result = validate_input(filling_options, loading_codes)
+    if not validate_result["is_success"]:
+        append_login_row(login_row + [f"Failed: {validate_result['err_msg']}", "0"])
+        return jsonify({"is_success": False, "err_msg": validate_result["err_msg"]}), 400
 
+    try:
+        with metrics.phase("prepare"):
+            generation = prepare_generation(validate_result["validated_filling_dict"], timestamp)
+        meta = {"file_name": generation["file_name"], "copy_path": result_cache.path_for(generation["key"])}
+        if result_cache.get(generation["key"]):
+            job, created = generation_jobs.record(generation["key"], meta), True
+        else:
+            job, created = generation_jobs.submit(
+                generation["key"], build_cached_workbook, generation_args(generation), meta
+            )
+    except JobQueueFull:
+        response = jsonify({"is_success": False, "err_msg": "Too many Excel generations in progress, please retry shortly"})
+        response.headers["Retry-After"] = str(GENERATION_RETRY_AFTER)
+        return response, 503
+    except Exception as e:
+        err_msg = f"❌ Excel generation failed: {e}"
+        append_login_row(login_row + [f"Failed: {err_msg}", "0"])
+        return jsonify({"is_success": False, "err_msg": err_msg}), 500
 
-def rebuild_data_validation(wb):
-    configurator_sheet = wb["Configurator"]
+    logger = current_app.logger
 
-    # Example: Dropdown in D7 from Fillings!A2:A50
-    dv_main = DataValidation(
-        type="list",
-        formula1="=Fillings!$A$2:$A$50",
-        allow_blank=True,
-        showDropDown=False
-    )
-    configurator_sheet.add_data_validation(dv_main)
-    dv_main.add("D7:I7")
-
-    # Row-based dependent dropdowns
-    start_row = 15
-    end_row = 50
-
-    for r in range(start_row, end_row + 1):
-        # IMPORTANT: formula must be quoted as string for Excel
-        formula = f'=$AD${r}:$BJ${r}'
-
-        dv = DataValidation(
-            type="list",
-            formula1=formula,
-            allow_blank=True,
-            showDropDown=False
+    # 🔹 Log the request once its job finishes, collapsed requests log their own row
+    def log_job(finished_job):
+        metrics.observe(
+            "generation_job_seconds", finished_job.finished_at - finished_job.created_at,
+            (("status", finished_job.status),)
         )
-        configurator_sheet.add_data_validation(dv)
-        dv.add(configurator_sheet[f"F{r}"])
-
-    dv_head = DataValidation(
-        type="list",
-        formula1='=TestHeads!$K$2:$K$50',
-        allow_blank=True,
-        showDropDown=False
+        if finished_job.status == "done":
+            result_row = [f"Success: Excel file: {generation['file_name']} has been generated", "1"]
+        else:
+            result_row = [f"Failed: ❌ Excel generation failed: {finished_job.err_msg}", "0"]
+        try:
+            append_login_row(login_row + result_row)
+        except Exception as e:
+            logger.warning("Login row for job %s was not written: %s", finished_job.id, e)
+
+    job.add_done_callback(log_job)
+    # A collapsed request shares the job but downloads under its own file name
+    return jsonify(job_status_response(job.to_dict(), collapsed=not created, file_name=generation["file_name"])), 202
+
+
+@bp.route("/api/generate_excel_jobs/<job_id>", methods=["GET"])
+def get_generate_excel_job(job_id):
+    job = generation_jobs.get(job_id)
+    if job is None:
+        return jsonify({"is_success": False, "err_msg": f"Job {job_id} not found"}), 404
+    return jsonify(job_status_response(job, file_name=request.args.get("file_name")))
+
+
+@bp.route("/api/generate_excel_jobs/<job_id>/download", methods=["GET"])
+def download_generate_excel_job(job_id):
+    job = generation_jobs.get(job_id)
+    if job is None:
+        return jsonify({"is_success": False, "err_msg": f"Job {job_id} not found"}), 404
+    if job["status"] != "done":
+        return jsonify({"is_success": False, "err_msg": f"Job {job_id} is {job['status']}"}), 409
+    if not os.path.exists(job["meta"]["copy_path"]):
+        return jsonify({"is_success": False, "err_msg": f"Result of job {job_id} is no longer stored"}), 410
+    return send_file(
+        job["meta"]["copy_path"],
+        as_attachment=True,
+        download_name=request.args.get("file_name") or job["meta"]["file_name"],
+        mimetype=XLSM_MIMETYPE
+    )
+
+
+@bp.route("/api/job_stats", methods=["GET"])
+def job_stats():
+    return jsonify(generation_jobs.stats())
+
+
+def job_status_response(job, collapsed=False, file_name=None):
+    """:param file_name: attachment name of this request, when it differs from the job's"""
+    job_id = job["job_id"]
+    file_name = file_name or job["meta"].get("file_name", "")
+    name_arg = {"file_name": file_name} if file_name != job["meta"].get("file_name", "") else {}
+    return {
+        "is_success": job["status"] != "failed",
+        "err_msg": job["err_msg"],
+        "job_id": job_id,
+        "status": job["status"],
+        "collapsed": collapsed,
+        "file_name": file_name,
+        "status_url": url_for(".get_generate_excel_job", job_id=job_id, **name_arg),
+        "download_url": url_for(".download_generate_excel_job", job_id=job_id, **name_arg),
+    }
+
+
+def prepare_generation(validated_filling_dict, timestamp, master_file_name=None):
+    """
+    Rows, dependencies and paths of one generated workbook
+    :param master_file_name: already looked up name of the master, e.g. once for a bulk request
+    """
+    filling = []
+    filling_data = []
+    dependencies = []
+    # 🔹 Collect data
+    for filling_option, names in validated_filling_dict.items():
+        for filling_name, details in names.items():
+            filling.append(details["row_data"])
+            filling_data.extend(details["filling_data"])
+            dependencies.extend(details["dependencies"])
+
+    dependencies = list(dict.fromkeys(dependencies))  # dedupe
+
+    # 🔹 Create timestamped file name
+    master_file_name = master_file_name or get_master_file_name()
+    master_file_path = os.path.join(EXCEL_TEMPLATE_FOLDER, master_file_name)
+    file_name = f"User Copy of {master_file_name.replace('.xlsm', '').replace('Template_', '')} {timestamp}.xlsm"
+    return {
+        "filling": filling,
+        "filling_data": filling_data,
+        "dependencies": dependencies,
+        "master_file_path": master_file_path,
+        "file_name": file_name,
+        "key": result_cache.key_for(master_file_path, filling, filling_data, dependencies, EXCEL_TEMPLATE_FOLDER),
+    }
+
+
+def generation_args(generation, cache=None):
+    """build_cached_workbook arguments, without the dependency cache they can be sent to a job process"""
+    return (
+        result_cache, generation["key"], generation["master_file_path"], generation["filling"],
+        generation["filling_data"], generation["dependencies"], EXCEL_TEMPLATE_FOLDER,
+        cache, MASTER_TEMPLATE_POOL_SIZE, OOXML_WRITER,
     )
-    configurator_sheet.add_data_validation(dv_head)
-    dv_head.add(configurator_sheet["F12"])
+
+
+def attachment_file_name(file_name):
+    """Content-Disposition filename parameters, with an RFC 5987 form for non-ASCII names like send_file"""
+    try:
+        file_name.encode("ascii")
+        return {"filename": file_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", file_name).encode("ascii", "ignore").decode("ascii")
+        return {"filename": simple, "filename*": f"UTF-8''{quote(file_name, safe='!#$&+^`|~')}"}
+
+
+def append_login_row(login_row):
+    """Queue login_row for the login log sheet, the request does not wait for Sheets"""
+    audit_log.enqueue(login_row)
+
+
+def send_login_rows(login_rows):
+    gs.append_sheet(
+            os.getenv("GOOGLE_SHEET_LOGIN_SHEET_ID"),
+            f"{os.getenv('LOGIN_LOG_SHEET_NAME')}",
+            login_rows
+        )
+
+
+def get_master_file_name():
+    """Master file name from the local template index, Drive only when it is not indexed yet"""
+    template_index = load_template_index(os.path.join(EXCEL_TEMPLATE_FOLDER, TEMPLATE_INDEX_FILE_NAME))
+    return template_index.name_for_id(EXCEL_MASTER_FILE_ID) or gs.get_file_name(EXCEL_MASTER_FILE_ID)
 
 
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    create_app().run(debug=True, host="0.0.0.0", port=5000)
 
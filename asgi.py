@@ -0,0 +1,5 @@
+from asgiref.wsgi import WsgiToAsgi
+from app import create_app
+
+# ASGI entry point, e.g. "uvicorn asgi:app". Views run in asgiref's thread pool
+app = WsgiToAsgi(create_app())
@@ -0,0 +1,64 @@
+"""
+Counts Sheets/Drive client builds per simulated /api/generate_excel_files request.
+
+Run from the repository root:
+    python -m benchmarks.bench_client_builds [requests] [threads]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import google_auth_httplib2
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.discovery import build
+from google_lib import GoogleService, RequestExecutor
+from tests.fake_transport import FakeHttp
+
+
+def simulate_generate_request(gs):
+    # Same Google calls a generate_excel_files request makes
+    gs.read_sheet("sheet", "'Fillings'!A1:G")
+    gs.read_sheet("sheet", "'FillingsData'!B1:F")
+    gs.get_file_name("master")
+    gs.append_sheet("sheet", "Log", [["row"]])
+
+
+def simulate_rebuild_request(http):
+    # Previous behaviour: build() and resource creation on every call
+    for api, version in (("sheets", "v4"), ("sheets", "v4"), ("drive", "v3"), ("sheets", "v4")):
+        service = build(api, version, http=http, cache_discovery=False)
+        if api == "sheets":
+            service.spreadsheets().values()
+        else:
+            service.files()
+
+
+def timed(label, request_count, thread_count, fn):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=thread_count) as pool:
+        list(pool.map(lambda _: fn(), range(request_count)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20} {elapsed / request_count * 1000:.3f} ms/request")
+
+
+def main():
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    thread_count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    transport = FakeHttp()
+    # No rate limits, only client reuse is measured here
+    gs = GoogleService(creds=AnonymousCredentials(), http_factory=lambda: transport, executor=RequestExecutor())
+
+    print(f"requests:            {request_count} on {thread_count} threads")
+    timed("pooled clients:", request_count, thread_count, lambda: simulate_generate_request(gs))
+    print(f"HTTP calls:          {transport.request_count}")
+    print(f"client builds:       {gs.clients.build_count}")
+    print(f"builds per request:  {gs.clients.build_count / request_count:.3f}")
+
+    # Setup cost alone, without even issuing the requests
+    http = google_auth_httplib2.AuthorizedHttp(AnonymousCredentials(), http=transport)
+    rebuild_count = max(1, request_count // 10)
+    timed("build() per call:", rebuild_count, thread_count, lambda: simulate_rebuild_request(http))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Cold start of a web server worker, with and without APP_PRELOAD.
+
+Each sample is a fresh interpreter that imports wsgi (boot), then forks the
+way a preloading gunicorn master does. The forked worker serves the first
+filling options and generate requests. Reported: boot time, modules
+loaded and RSS after boot, first request latency in the worker, and the
+worker's private (unshared) memory afterwards. Runs against the local
+Google backend, so no credentials or network are needed.
+
+Run from the repository root (Linux, needs fork and /proc):
+    python -m benchmarks.bench_cold_start [--samples 5] [--master-rows 2000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import statistics
+import subprocess
+import tempfile
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=5, help="fresh processes per mode")
+    parser.add_argument("--source-files", type=int, default=5)
+    parser.add_argument("--fillings-per-file", type=int, default=50)
+    parser.add_argument("--data-rows", type=int, default=5)
+    parser.add_argument("--master-rows", type=int, default=2000)
+    parser.add_argument("--dependencies", type=int, default=3)
+    parser.add_argument("--dependency-rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every Google call")
+    parser.add_argument("--child", choices=["setup", "measure"], help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def private_mib():
+    """Memory only this process holds, i.e. not shared copy-on-write with its parent"""
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as fh:
+            fields = dict(line.split(":", 1) for line in fh if ":" in line)
+    except OSError:
+        return None
+    kib = sum(int(fields[name].split()[0]) for name in ("Private_Clean", "Private_Dirty") if name in fields)
+    return kib / 1024
+
+
+def setup_child():
+    """Sync the fixture once and store the login sheet and a valid selection for the samples"""
+    import app
+    from benchmarks.bench_service import make_selections
+
+    client = app.create_app(preload=False).test_client()
+    for path in ("/api/download_template_file", "/api/sync_filling_data"):
+        response = client.post(path, json={})
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+    spreadsheet_id = os.environ["GOOGLE_SHEET_LOGIN_SHEET_ID"]
+    sheets = {
+        name: app.gs.get_values(spreadsheet_id, name)
+        for name in ("Fillings", "FillingsData", "FillingsOrder", "Log")
+    }
+    with open(os.path.join(os.environ["LOCAL_BACKEND_DIR"], "sheets", f"{spreadsheet_id}.json"), "w", encoding="utf-8") as fh:
+        json.dump(sheets, fh)
+    selection = make_selections(app.get_filling_tables().filling_info_dict, 1, 3)[0]
+    with open(selection_path(), "w", encoding="utf-8") as fh:
+        json.dump(selection, fh)
+    app.audit_log.close()
+
+
+def selection_path():
+    return os.path.join(os.environ["LOCAL_BACKEND_DIR"], "selection.json")
+
+
+def measure_child():
+    with open(selection_path(), encoding="utf-8") as fh:
+        filling_options, loading_codes = json.load(fh)
+    start = time.perf_counter()
+    import wsgi
+    boot = time.perf_counter() - start
+    sample = {
+        "boot_ms": boot * 1000,
+        "modules": len(sys.modules),
+        "boot_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        client = wsgi.app.test_client()
+        start = time.perf_counter()
+        client.get("/api/get_filling_options")
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        response = client.post("/api/generate_excel_files", json={"filling_options": filling_options, "loading_codes": loading_codes})
+        generate = time.perf_counter() - start
+        ok = response.mimetype.startswith("application/vnd.ms-excel")
+        response.close()
+        with os.fdopen(write_fd, "w") as fh:
+            json.dump({"first_request_ms": first * 1000, "first_generate_ms": generate * 1000,
+                       "generate_ok": ok, "worker_private_mib": private_mib()}, fh)
+        os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as fh:
+        sample.update(json.load(fh))
+    os.waitpid(pid, 0)
+    print(json.dumps(sample))
+
+
+def run_child(mode, env):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_cold_start", "--child", mode],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1]) if mode == "measure" else None
+
+
+def main():
+    args = parse_args()
+    if args.child == "setup":
+        return setup_child()
+    if args.child == "measure":
+        return measure_child()
+
+    # Imported here, the measured processes must not load openpyxl through the fixture code
+    from benchmarks.bench_service import build_fixture
+
+    with tempfile.TemporaryDirectory() as root:
+        build_fixture(root, args)
+        env = dict(os.environ, PYTHONPATH=os.getcwd())
+        run_child("setup", env)
+
+        print(f"{'APP_PRELOAD':<12} {'boot ms':>9} {'modules':>8} {'boot RSS':>9} "
+              f"{'1st req ms':>11} {'1st gen ms':>11} {'worker private':>15}")
+        for preload in ("0", "1"):
+            # a fresh GENERATED_FOLDER per sample, so no generate is a result cache hit
+            samples = [
+                run_child("measure", dict(env, APP_PRELOAD=preload, GENERATED_FOLDER=os.path.join(root, f"generated-{preload}-{i}")))
+                for i in range(args.samples)
+            ]
+            if not all(s["generate_ok"] for s in samples):
+                raise RuntimeError("generate_excel_files failed in a sample")
+
+            def median(name):
+                values = [s[name] for s in samples if s[name] is not None]
+                return statistics.median(values) if values else float("nan")
+
+            print(f"{preload:<12} {median('boot_ms'):9.1f} {median('modules'):8.0f} "
+                  f"{median('boot_rss_mib'):6.1f} MiB {median('first_request_ms'):11.1f} "
+                  f"{median('first_generate_ms'):11.1f} {median('worker_private_mib'):11.1f} MiB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Workbook generation throughput: copy + load_workbook per request, a pre-parsed
+MasterTemplate, and the zip-level OOXML writer.
+
+Run from the repository root:
+    python -m benchmarks.bench_master_template [requests] [master_rows]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+from openpyxl import load_workbook
+from excel_lib import DependencyCache, MasterTemplate, build_workbook, populate_workbook
+from benchmarks.synthetic import make_selection, make_template_folder
+
+
+def generate_reload(master_path, output_path, selection, template_folder):
+    # Previous generate_excel_files behaviour
+    shutil.copy(master_path, output_path)
+    wb = load_workbook(output_path, keep_vba=True)
+    populate_workbook(wb, *selection, template_folder)
+    wb.save(output_path)
+    wb.close()
+
+
+def generate_prepared(template, output_path, selection, template_folder):
+    with template.checkout() as wb:
+        populate_workbook(wb, *selection, template_folder)
+        wb.save(output_path)
+
+
+def run(label, request_count, generate):
+    start = time.perf_counter()
+    for i in range(request_count):
+        generate(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {request_count / elapsed:6.2f} requests/s   {elapsed / request_count * 1000:8.1f} ms/request")
+
+
+def main():
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    master_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    with tempfile.TemporaryDirectory() as folder:
+        master_path, dependency_names = make_template_folder(folder, master_rows=master_rows, dependency_count=1)
+        selection = make_selection(dependency_names=dependency_names)
+        output_path = os.path.join(folder, "out.xlsm")
+        print(f"master: {os.path.getsize(master_path) / 1024:.0f} KiB, {master_rows} x 30 cells")
+
+        run("copy + load_workbook:", request_count,
+            lambda i: generate_reload(master_path, output_path, selection, folder))
+
+        template = MasterTemplate(master_path, pool_size=1)
+        generate_prepared(template, output_path, selection, folder)  # warm-up parse
+        run("MasterTemplate:", request_count,
+            lambda i: generate_prepared(template, output_path, selection, folder))
+        print(f"master parses:         {template.parse_count}")
+
+        dependency_cache = DependencyCache()
+        build_workbook(master_path, output_path, *selection, folder, dependency_cache)  # warm-up prepare
+        run("OOXML writer:", request_count,
+            lambda i: build_workbook(master_path, output_path, *selection, folder, dependency_cache))
+
+
+if __name__ == "__main__":
+    main()
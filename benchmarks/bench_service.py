@@ -0,0 +1,192 @@
+"""
+End-to-end benchmark of sync_filling_data, validate_input, generate_excel_files
+and the bulk endpoint against the local Google backend, with synthetic source
+workbooks, master and dependencies. No credentials or network are needed.
+
+Run from the repository root:
+    python -m benchmarks.bench_service [--source-files 10] [--requests 50] [--threads 4] ...
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.synthetic import make_source_workbook, make_template_folder
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source-files", type=int, default=10, help="Drive workbooks read by sync")
+    parser.add_argument("--fillings-per-file", type=int, default=50)
+    parser.add_argument("--data-rows", type=int, default=5, help="FillingsData rows per filling")
+    parser.add_argument("--master-rows", type=int, default=2000)
+    parser.add_argument("--dependencies", type=int, default=3)
+    parser.add_argument("--dependency-rows", type=int, default=500)
+    parser.add_argument("--syncs", type=int, default=3, help="the first one is a full sync")
+    parser.add_argument("--requests", type=int, default=50, help="validate and generate requests")
+    parser.add_argument("--options-per-request", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=4, help="concurrent generate requests")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every Google call")
+    return parser.parse_args()
+
+
+def build_fixture(root, args):
+    """Drive folder with sources and templates plus a login spreadsheet holding only headers"""
+    drive_folder = os.path.join(root, "drive", "excel")
+    _, dependency_names = make_template_folder(
+        drive_folder, master_rows=args.master_rows,
+        dependency_count=args.dependencies, dependency_rows=args.dependency_rows,
+    )
+    for i in range(args.source_files):
+        make_source_workbook(
+            os.path.join(drive_folder, f"source{i:03d}.xlsx"), f"S{i}",
+            args.fillings_per_file, args.data_rows, dependency_names,
+        )
+
+    os.makedirs(os.path.join(root, "sheets"))
+    with open(os.path.join(root, "sheets", "login.json"), "w", encoding="utf-8") as fh:
+        json.dump({
+            "Fillings": [["Visible Name", "Filling Name", "Loading Code", "SpreadSheet Name", "SpreadSheet ID", "Dependencies", "Notes"]],
+            "FillingsData": [["", "Filling Name", "System Type", "Module", "Suffix", "MaxModules"]],
+            "FillingsOrder": [["Order"]],
+            "Log": [],
+        }, fh)
+
+    os.environ.update({
+        "GOOGLE_BACKEND": "local",
+        "LOCAL_BACKEND_DIR": root,
+        "LOCAL_BACKEND_LATENCY": str(args.latency),
+        "EXCEL_FOLDER_GOOGLE_DRIVE_ID": "excel",
+        "MASTER_EXCEL_FILE_ID": "excel/Template_Master.xlsm",
+        "GOOGLE_SHEET_LOGIN_SHEET_ID": "login",
+        "LOGIN_LOG_SHEET_NAME": "Log",
+        "GENERATED_FOLDER": os.path.join(root, "generated"),
+        "EXCEL_TEMPLATE_FOLDER": os.path.join(root, "templates"),
+        "SYNC_MANIFEST_PATH": os.path.join(root, "cache", "sync_manifest.json"),
+        "AUDIT_LOG_DB_PATH": os.path.join(root, "cache", "audit_log.sqlite3"),
+        "FILLING_SNAPSHOT_PATH": os.path.join(root, "cache", "filling_snapshot.json"),
+    })
+
+
+def make_selections(filling_info_dict, count, options_per_request, seed=0):
+    """(filling_options, loading_codes) pairs that validate, each selecting every coded filling too"""
+    rng = random.Random(seed)
+    options = sorted(filling_info_dict)
+    selections = []
+    for _ in range(count):
+        chosen = rng.sample(options, min(options_per_request, len(options)))
+        codes = [d["LC_code"] for o in chosen for d in filling_info_dict[o].values() if d["LC_code"]]
+        selections.append((chosen, ", ".join(codes)))
+    return selections
+
+
+def peak_rss_mib():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(label, calls, threads=1):
+    """Run every call, print latency percentiles, throughput and peak RSS"""
+    def timed(call):
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(timed, calls))
+    else:
+        latencies = [timed(call) for call in calls]
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))] * 1000
+
+    print(
+        f"{label:<14} n={len(latencies):<5} p50={percentile(50):8.2f} ms  p90={percentile(90):8.2f} ms  "
+        f"p99={percentile(99):8.2f} ms  {len(latencies) / elapsed:8.2f} req/s  peak RSS {peak_rss_mib():7.1f} MiB"
+    )
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        build_fixture(root, args)
+        import app  # reads the environment set up above
+
+        client = app.create_app().test_client()
+
+        def post(path, body):
+            response = client.post(path, json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            return response
+
+        print(f"sources: {args.source_files} x {args.fillings_per_file} fillings, "
+              f"master {args.master_rows} rows, {args.dependencies} dependencies x {args.dependency_rows} rows, "
+              f"latency {args.latency * 1000:.0f} ms/call")
+        post("/api/download_template_file", {})
+
+        run("sync", [
+            (lambda full: lambda: post("/api/sync_filling_data", {"full_sync": full}))(i == 0)
+            for i in range(args.syncs)
+        ])
+
+        def get(path, headers=None, status=200):
+            response = client.get(path, headers=headers)
+            if response.status_code != status:
+                raise RuntimeError(f"{path} returned {response.status_code}, expected {status}")
+            return response
+
+        # --- page loads: full render, then revalidation of the copy the browser holds
+        etag = get("/").headers["ETag"]
+        run("index", [lambda: get("/") for _ in range(args.requests)])
+        run("index (304)", [lambda: get("/", {"If-None-Match": etag}, 304) for _ in range(args.requests)])
+
+        filling_info_dict = app.get_filling_tables().filling_info_dict
+        selections = make_selections(filling_info_dict, args.requests, args.options_per_request)
+
+        def validate(selection):
+            result = app.validate_input(*selection)
+            if not result["is_success"]:
+                raise RuntimeError(result["err_msg"])
+
+        run("validate", [(lambda s: lambda: validate(s))(s) for s in selections])
+
+        def generate(selection):
+            response = post("/api/generate_excel_files", {"filling_options": selection[0], "loading_codes": selection[1]})
+            if not response.mimetype.startswith("application/vnd.ms-excel"):
+                raise RuntimeError(f"generate_excel_files failed: {response.get_data(as_text=True)[:200]}")
+            response.close()
+
+        run("generate", [(lambda s: lambda: generate(s))(s) for s in selections], args.threads)
+        run("generate (hit)", [(lambda s: lambda: generate(s))(s) for s in selections], args.threads)
+
+        # --- the same number of new selections in one bulk request, built by BULK_WORKERS processes
+        bulk_selections = make_selections(filling_info_dict, args.requests, args.options_per_request, seed=1)
+        start = time.perf_counter()
+        response = post("/api/generate_excel_files/bulk", {"selections": [
+            {"filling_options": options, "loading_codes": codes} for options, codes in bulk_selections
+        ]})
+        size = len(response.get_data())
+        response.close()
+        elapsed = time.perf_counter() - start
+        print(f"{'bulk':<14} n={len(bulk_selections):<5} {elapsed * 1000:8.2f} ms total  "
+              f"{len(bulk_selections) / elapsed:8.2f} selections/s  zip {size / 1024 / 1024:.1f} MiB, "
+              f"{app.BULK_WORKERS} workers")
+
+        print(f"Google calls: {app.gs.request_count}, result cache: {app.result_cache.stats()['hits']} hits")
+        app.audit_log.close()
+        app.generation_jobs.shutdown()
+        app.bulk_pool.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Times validate_input against a login sheet with thousands of filling rows:
+the previous per-request dict rebuild versus one compiled FillingIndex.
+
+Run from the repository root:
+    python -m benchmarks.bench_validate [filling_rows] [requests]
+"""
+import sys
+import time
+import random
+from filling_lib import FillingIndex
+
+FILLING_HEADER = ["Visible Name", "Filling Name", "Loading Code", "SpreadSheet Name", "SpreadSheet ID", "Dependencies", "Note"]
+FILLING_DATA_HEADER = ["Filling Name", "System Type", "Module", "Suffix", "MaxModules"]
+
+
+def make_tables(filling_rows, fillings_per_option=4, data_rows_per_filling=3):
+    fillings = [FILLING_HEADER]
+    filling_data = [FILLING_DATA_HEADER]
+    for i in range(filling_rows):
+        option = f"Option {i // fillings_per_option}"
+        # One filling per option without a code, the others behind LC codes
+        code = "" if i % fillings_per_option == 0 else f"LC{i}"
+        fillings.append([option, f"Filling {i}", code, f"Sheet {i % 50}", f"id{i}", f"Dep {i % 7}, Dep {i % 11}", ""])
+        for j in range(data_rows_per_filling):
+            filling_data.append([f"Filling {i}", "T", f"M{j}", "S", str(j)])
+    order = [[f"Option {i}"] for i in range(filling_rows // fillings_per_option)]
+    return fillings, filling_data, order
+
+
+def get_row_dict(row_data, header):
+    row_dict = {}
+    for index, col_name in enumerate(header):
+        if str(col_name):
+            row_dict[col_name] = row_data[index] if index < len(row_data) else ""
+    return row_dict
+
+
+def legacy_validate(fillings, filling_data, filling_options, loading_codes):
+    # Previous validate_input: rebuild both dicts, then scan the code list per filling
+    loading_codes_list = [x.strip() for x in loading_codes.split(",") if x.strip()]
+    filling_data_dict = {}
+    for row_data in filling_data[1:]:
+        row_dict = get_row_dict(row_data, filling_data[0])
+        if row_dict.get("Filling Name"):
+            filling_data_dict.setdefault(row_dict["Filling Name"], []).append(row_data)
+    filling_info_dict = {}
+    for row_data in fillings[1:]:
+        row_dict = get_row_dict(row_data, fillings[0])
+        if row_dict.get("Visible Name"):
+            dependencies_list = [d.strip() for d in row_dict.get("Dependencies", "").split(",") if d.strip()]
+            dependencies_list.append(row_dict.get("SpreadSheet Name"))
+            filling_info_dict.setdefault(row_dict["Visible Name"], {})[row_dict.get("Filling Name")] = {
+                "row_data": row_data,
+                "LC_code": row_dict.get("Loading Code", ""),
+                "filling_data": filling_data_dict.get(row_dict.get("Filling Name"), []),
+                "dependencies": dependencies_list,
+            }
+    validated_filling_dict = {}
+    for filling_option in filling_options:
+        names = []
+        for filling_name, details in filling_info_dict[filling_option].items():
+            expected_loading_code = details["LC_code"]
+            if expected_loading_code in loading_codes_list or expected_loading_code == "":
+                names.append(filling_name)
+                loading_codes_list = [val for val in loading_codes_list if val != expected_loading_code]
+        validated_filling_dict[filling_option] = {n: filling_info_dict[filling_option][n] for n in names}
+    return validated_filling_dict
+
+
+def make_requests(order, request_count, options_per_request=20, fillings_per_option=4):
+    rng = random.Random(0)
+    requests = []
+    for _ in range(request_count):
+        options = rng.sample([row[0] for row in order], options_per_request)
+        codes = [f"LC{int(o.split()[1]) * fillings_per_option + k}" for o in options for k in (1, 2)]
+        requests.append((options, ", ".join(codes)))
+    return requests
+
+
+def main():
+    filling_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    request_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    fillings, filling_data, order = make_tables(filling_rows)
+    requests = make_requests(order, request_count)
+
+    start = time.perf_counter()
+    index = FillingIndex(fillings, filling_data, order)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # Same fillings selected either way
+    for options, codes in requests[:20]:
+        compiled = index.validate(options, codes)["validated_filling_dict"]
+        legacy = legacy_validate(fillings, filling_data, options, codes)
+        assert {k: list(v) for k, v in compiled.items()} == {k: list(v) for k, v in legacy.items()}
+
+    legacy_count = max(1, request_count // 10)
+    start = time.perf_counter()
+    for options, codes in requests[:legacy_count]:
+        legacy_validate(fillings, filling_data, options, codes)
+    legacy_ms = (time.perf_counter() - start) * 1000 / legacy_count
+
+    start = time.perf_counter()
+    for options, codes in requests:
+        index.validate(options, codes)
+    index_ms = (time.perf_counter() - start) * 1000 / request_count
+
+    print(f"filling rows:        {filling_rows} ({len(filling_data) - 1} data rows)")
+    print(f"index build:         {build_ms:.2f} ms once per data version")
+    print(f"rebuild per request: {legacy_ms:.3f} ms/request")
+    print(f"compiled index:      {index_ms:.3f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
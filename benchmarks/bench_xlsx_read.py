@@ -0,0 +1,76 @@
+"""
+Full vs streaming (read-only) extraction of Fillings/FillingsData from a large xlsx.
+
+The synthetic workbook also holds an unrequested sheet, as the real filling
+workbooks do, which streaming mode never parses.
+
+Run from the repository root:
+    python -m benchmarks.bench_xlsx_read [rows] [other_sheet_rows]
+"""
+import io
+import sys
+import time
+import tracemalloc
+from openpyxl import Workbook, load_workbook
+from excel_lib import read_sheet_rows
+
+SHEETS = ["Fillings", "FillingsData"]
+
+
+def make_workbook(rows, other_rows):
+    # A regular (not write-only) workbook, so sheets carry a <dimension> like Excel writes
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Fillings"
+    ws.append(["Visible Name", "Filling Name", "Loading Code", "SpreadSheet Name", "SpreadSheet ID", "Dependencies"])
+    for r in range(rows):
+        ws.append([f"Option {r % 50}", f"Filling {r}", f"LC{r % 7}", f"Sheet {r}", f"id{r}", "dep.a, dep.b"])
+    ws = wb.create_sheet("FillingsData")
+    ws.append(["", "Filling Name", "System Type", "Module", "Suffix", "MaxModules"])
+    for r in range(rows):
+        ws.append([r, f"Filling {r}", "Type", f"Module {r % 20}", "S", r % 16])
+    ws = wb.create_sheet("Configurator.data")
+    for r in range(other_rows):
+        ws.append([f"value {r}.{c}" for c in range(20)])
+    fh = io.BytesIO()
+    wb.save(fh)
+    return fh.getvalue()
+
+
+def read_full(data):
+    # Previous read_xlsx_file behaviour
+    wb = load_workbook(filename=io.BytesIO(data), data_only=True)
+    return {name: [list(row) for row in wb[name].iter_rows(values_only=True)] for name in SHEETS}
+
+
+def read_streaming(data):
+    return read_sheet_rows(io.BytesIO(data), SHEETS, 1000)
+
+
+def measure(label, fn, data):
+    start = time.perf_counter()
+    content = fn(data)
+    elapsed = time.perf_counter() - start
+
+    # Separate pass, tracemalloc slows the parse down considerably
+    tracemalloc.start()
+    fn(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<10} {elapsed:8.3f} s   peak {peak / 1024 / 1024:8.1f} MiB")
+    return content
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    other_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    data = make_workbook(rows, other_rows)
+    print(f"workbook: {len(data) / 1024 / 1024:.1f} MiB, {rows} filling rows, {other_rows} x 20 other rows")
+
+    full = measure("full", read_full, data)
+    streaming = measure("streaming", read_streaming, data)
+    assert full == streaming, "streaming output differs from full load"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Synthetic master, dependency and filling data shaped like the real templates."""
+import os
+from openpyxl import Workbook
+
+
+def make_master(path, rows=2000, cols=30):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Configurator"
+    for r in range(1, rows + 1):
+        for c in range(1, cols + 1):
+            ws.cell(row=r, column=c, value=f"=A{r}+{c}" if c % 5 == 0 else r * c)
+    wb.create_sheet("Fillings").append(["Visible Name", "Filling Name", "Loading Code", "SpreadSheet Name", "SpreadSheet ID", "Dependencies"])
+    wb.create_sheet("FillingsData").append(["", "Filling Name", "System Type", "Module", "Suffix", "MaxModules"])
+    test_heads = wb.create_sheet("TestHeads")
+    for r in range(50):
+        test_heads.append([f"head {r}.{c}" for c in range(12)])
+    wb.save(path)
+    return path
+
+
+def make_dependency(path, name, rows=500, cols=10):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = f"Data.{name}"
+    for r in range(rows):
+        ws.append([f"{name} {r}.{c}" if c % 2 else r * c for c in range(cols)])
+    wb.create_sheet("Fillings").append(["ignored"])
+    wb.save(path)
+    return path
+
+
+def make_selection(filling_count=20, data_rows_per_filling=10, dependency_names=()):
+    """Rows in the shape validate_input hands to generate_excel_files"""
+    filling = []
+    filling_data = []
+    for f in range(filling_count):
+        filling.append([f"Option {f}", f"Filling {f}", f"LC{f}", f"Sheet {f}", f"id{f}", ", ".join(dependency_names)])
+        for r in range(data_rows_per_filling):
+            filling_data.append([f"Filling {f}", "Type", f"Module {r}", "S", str(r % 16)])
+    return filling, filling_data, list(dependency_names)
+
+
+def make_template_folder(folder, master_rows=2000, dependency_count=3, dependency_rows=500):
+    os.makedirs(folder, exist_ok=True)
+    master_path = make_master(os.path.join(folder, "Template_Master.xlsm"), rows=master_rows)
+    dependency_names = [f"dep{i}" for i in range(dependency_count)]
+    for name in dependency_names:
+        make_dependency(os.path.join(folder, f"{name}.xlsx"), name, rows=dependency_rows)
+    return master_path, dependency_names
+
+
+def make_source_workbook(path, prefix, filling_count=50, data_rows_per_filling=5, dependency_names=()):
+    """Drive workbook as sync_filling_data reads it: a Fillings and a FillingsData sheet"""
+    wb = Workbook()
+    fillings = wb.active
+    fillings.title = "Fillings"
+    fillings.append(["Visible Name", "Filling Name", "Loading Code", "SpreadSheet Name", "SpreadSheet ID", "Dependencies", "Notes"])
+    filling_data = wb.create_sheet("FillingsData")
+    filling_data.append(["", "Filling Name", "System Type", "Module", "Suffix", "MaxModules"])
+    dependency_names = list(dependency_names)
+    for f in range(filling_count):
+        # Two fillings per option: one always selected, one behind a loading code
+        code = "" if f % 2 == 0 else f"{prefix}-LC{f}"
+        sheet_name = dependency_names[f % len(dependency_names)] if dependency_names else f"{prefix} Sheet"
+        extra = dependency_names[(f + 1) % len(dependency_names)] if len(dependency_names) > 1 else ""
+        fillings.append([f"{prefix} Option {f // 2}", f"{prefix} Filling {f}", code, sheet_name, f"{prefix}-id{f}", extra, ""])
+        for r in range(data_rows_per_filling):
+            filling_data.append(["", f"{prefix} Filling {f}", "Type", f"Module {r}", "S", r % 16])
+    wb.save(path)
+    return path
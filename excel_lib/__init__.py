@@ -0,0 +1,47 @@
+import importlib
+
+# Public names and the submodule defining each. Submodules are imported on
+# first use, so importing excel_lib does not load openpyxl.
+_EXPORTS = {
+    "DependencyCache": "dependency_cache",
+    "MasterTemplate": "master_template",
+    "OOXMLTemplate": "ooxml_writer",
+    "OOXMLUnsupported": "ooxml_writer",
+    "ResultCache": "result_cache",
+    "WorkbookStream": "result_cache",
+    "TemplateIndex": "template_sync",
+    "append_sheet_rows": "workbook_builder",
+    "build_cached_workbook": "result_cache",
+    "build_data_validations": "workbook_builder",
+    "build_workbook": "workbook_builder",
+    "collect_dependency_sheets": "workbook_builder",
+    "configure_dependency_cache": "dependency_cache",
+    "fill_workbook": "workbook_builder",
+    "get_master_template": "master_template",
+    "get_ooxml_template": "ooxml_writer",
+    "iter_sheet_rows": "xlsx_reader",
+    "load_template_index": "template_sync",
+    "populate_workbook": "workbook_builder",
+    "prepare_master": "workbook_builder",
+    "read_sheet_rows": "xlsx_reader",
+    "rebuild_data_validation": "workbook_builder",
+    "stream_cached_workbook": "result_cache",
+    "sync_templates": "template_sync",
+    "to_number": "workbook_builder",
+    "write_atomic": "template_sync",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
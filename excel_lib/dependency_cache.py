@@ -0,0 +1,84 @@
+import os
+import threading
+from collections import OrderedDict
+from .xlsx_reader import read_sheet_rows
+
+
+class DependencyCache:
+    """
+    LRU cache of dependency workbooks as plain row lists per sheet.
+
+    Entries are keyed on path and dropped when the file's mtime or size
+    changes. The least recently used entries are evicted once the estimated
+    size of all cached rows passes max_bytes.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # path -> (version, sheets, size)
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        """
+        Sheets of the workbook at path
+        :return: {sheet_name: [[...], ...]} with formulas kept as written. Do not modify.
+        """
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        sheets = read_sheet_rows(path, data_only=False)
+        size = _estimate_size(sheets)
+        with self._lock:
+            old_entry = self._entries.pop(path, None)
+            if old_entry:
+                self._size -= old_entry[2]
+            if size <= self.max_bytes:
+                self._entries[path] = (version, sheets, size)
+                self._size += size
+            while self._size > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+        return sheets
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Used by build_workbook when no cache is passed, e.g. in job and bulk worker processes
+default_dependency_cache = DependencyCache()
+
+
+def configure_dependency_cache(max_bytes):
+    """Memory bound of default_dependency_cache, WorkerPool initializer of job and bulk workers"""
+    default_dependency_cache.max_bytes = max_bytes
+
+
+def _estimate_size(sheets):
+    # Rough CPython footprint of the row lists, good enough for an eviction bound
+    size = 0
+    for rows in sheets.values():
+        for row in rows:
+            size += 56 + 8 * len(row)
+            for value in row:
+                if isinstance(value, str):
+                    size += 49 + len(value)
+                elif value is not None:
+                    size += 32
+    return size
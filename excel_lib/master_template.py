@@ -0,0 +1,134 @@
+import io
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from openpyxl import load_workbook
+
+
+class _PreparedWorkbook:
+    """One parsed copy of the master plus the state needed to undo a request's edits"""
+
+    def __init__(self, path, cell_sheet_names):
+        stat = os.stat(path)
+        self.version = (stat.st_mtime_ns, stat.st_size)
+        with open(path, "rb") as fh:
+            # Parse from memory so the VBA archive does not hold the file open
+            self.wb = load_workbook(io.BytesIO(fh.read()), keep_vba=True)
+        self.sheet_names = list(self.wb.sheetnames)
+        self.cell_values = {
+            name: {key: cell.value for key, cell in self.wb[name]._cells.items()}
+            for name in cell_sheet_names if name in self.wb.sheetnames
+        }
+        self.validation_counts = {
+            ws.title: len(ws.data_validations.dataValidation) for ws in self.wb.worksheets
+        }
+
+    def restore(self):
+        """Put the workbook back to how it was right after parsing"""
+        wb = self.wb
+        for name in list(wb.sheetnames):
+            if name not in self.sheet_names:
+                wb.remove(wb[name])
+        for name, values in self.cell_values.items():
+            cells = wb[name]._cells
+            for key in list(cells):
+                if key in values:
+                    cells[key].value = values[key]
+                else:
+                    del cells[key]
+        for ws in wb.worksheets:
+            del ws.data_validations.dataValidation[self.validation_counts.get(ws.title, 0):]
+
+
+class MasterTemplate:
+    """
+    Keeps parsed copies of the master workbook so requests skip load_workbook.
+
+    A request checks out a parsed copy, fills it and saves it under its own
+    name; on return the copy is restored and handed to the next request.
+    Only cells of cell_sheet_names, added sheets and added data validations
+    are restored, so requests must not edit anything else. The master is
+    parsed again when its mtime or size changes on disk.
+    """
+
+    def __init__(self, path, pool_size=2, cell_sheet_names=("Fillings", "FillingsData")):
+        self.path = path
+        self.pool_size = pool_size
+        self.cell_sheet_names = tuple(cell_sheet_names)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self.parse_count = 0
+
+    def _current_version(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _prepare(self):
+        prepared = _PreparedWorkbook(self.path, self.cell_sheet_names)
+        with self._lock:
+            self.parse_count += 1
+        return prepared
+
+    def _acquire(self):
+        while True:
+            try:
+                prepared = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.pool_size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    return self._prepare_or_release()
+                try:
+                    # Timeout so a slot freed by a failed request is noticed
+                    prepared = self._idle.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+
+            try:
+                is_stale = prepared.version != self._current_version()
+            except OSError:
+                with self._lock:
+                    self._created -= 1
+                raise
+            if is_stale:
+                return self._prepare_or_release()
+            return prepared
+
+    def _prepare_or_release(self):
+        try:
+            return self._prepare()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    @contextmanager
+    def checkout(self):
+        """Yield a parsed master workbook for the duration of one request"""
+        prepared = self._acquire()
+        try:
+            yield prepared.wb
+            prepared.restore()
+        except BaseException:
+            # A failed request may have left edits that restore does not cover
+            with self._lock:
+                self._created -= 1
+            raise
+        self._idle.put(prepared)
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_master_template(path, pool_size=2):
+    """Process-wide MasterTemplate for path"""
+    with _templates_lock:
+        template = _templates.get(path)
+        if template is None:
+            template = _templates[path] = MasterTemplate(path, pool_size)
+        return template
@@ -0,0 +1,661 @@
+import io
+import os
+import re
+import math
+import time
+import zlib
+import struct
+import zipfile
+import posixpath
+import threading
+from xml.sax.saxutils import escape, unescape
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE, ERROR_CODES, TIME_FORMATS, TIME_TYPES
+from openpyxl.styles.numbers import BUILTIN_FORMATS, BUILTIN_FORMATS_MAX_SIZE, is_date_format
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, to_excel
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.workbook.child import INVALID_TITLE_REGEX, avoid_duplicate_name
+from openpyxl.xml.functions import tostring
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+WORKSHEET_REL_TYPE = f"{REL_NS}/worksheet"
+WORKSHEET_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+
+# Elements that follow <dataValidations> in a worksheet, in schema order
+_AFTER_DATA_VALIDATIONS = (
+    "hyperlinks", "printOptions", "pageMargins", "pageSetup", "headerFooter", "rowBreaks",
+    "colBreaks", "customProperties", "cellWatches", "ignoredErrors", "smartTags", "drawing",
+    "legacyDrawing", "legacyDrawingHF", "picture", "oleObjects", "controls", "webPublishItems",
+    "tableParts", "extLst", "mc:AlternateContent",
+)
+_ATTR_RE = re.compile(r"""([\w:.-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_QUOTE_ENTITIES = {"&quot;": '"', "&apos;": "'"}
+
+
+class OOXMLUnsupported(Exception):
+    """The master or the data uses something this writer cannot reproduce exactly"""
+
+
+def _attrs(text):
+    return {
+        name: unescape(double if double is not None else single, _QUOTE_ENTITIES)
+        for name, double, single in _ATTR_RE.findall(text)
+    }
+
+
+def _quote(value):
+    return escape(str(value), {'"': "&quot;"})
+
+
+def _element_prefix(xml, local_name):
+    """Namespace prefix ("x:" or "") used for local_name in xml"""
+    match = re.search(rf"<(\w+:)?{local_name}[\s>/]", xml)
+    if not match:
+        return None
+    return match.group(1) or ""
+
+
+def _cell_xml(prefix, coordinate, value, style="", dates=None):
+    """
+    <c> element for value, same typing rules as openpyxl's Cell
+    :param dates: _DateStyles of the workbook, needed to write dates and times
+    """
+    if isinstance(value, TIME_TYPES):
+        if dates is None:
+            raise OOXMLUnsupported("dates in a workbook without a styles part")
+        style, value = dates.style_for(value, style), dates.serial(value)
+    style_attr = f' s="{style}"' if style else ""
+    # openpyxl writes empty strings as empty cells too
+    if value is None or value == "":
+        return f'<{prefix}c r="{coordinate}"{style_attr}/>' if style else None
+    if isinstance(value, bool):
+        return f'<{prefix}c r="{coordinate}"{style_attr} t="b"><{prefix}v>{int(value)}</{prefix}v></{prefix}c>'
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and not math.isfinite(value):
+            raise OOXMLUnsupported(f"non-finite number {value!r}")
+        return f'<{prefix}c r="{coordinate}"{style_attr}><{prefix}v>{value!r}</{prefix}v></{prefix}c>'
+    if isinstance(value, str):
+        value = value[:32767]
+        if ILLEGAL_CHARACTERS_RE.search(value):
+            raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+        if len(value) > 1 and value.startswith("="):
+            return f'<{prefix}c r="{coordinate}"{style_attr}><{prefix}f>{escape(value[1:])}</{prefix}f></{prefix}c>'
+        if value in ERROR_CODES:
+            return f'<{prefix}c r="{coordinate}"{style_attr} t="e"><{prefix}v>{escape(value)}</{prefix}v></{prefix}c>'
+        space = ' xml:space="preserve"' if value != value.strip() else ""
+        return (
+            f'<{prefix}c r="{coordinate}"{style_attr} t="inlineStr"><{prefix}is>'
+            f'<{prefix}t{space}>{escape(value)}</{prefix}t></{prefix}is></{prefix}c>'
+        )
+    raise OOXMLUnsupported(f"cell value of type {type(value).__name__}")
+
+
+class _DateStyles:
+    """
+    Number formats for date and time cells, added to the master's styles part.
+
+    openpyxl gives a date cell the number format of its type (e.g.
+    yyyy-mm-dd h:mm:ss) unless the cell already has a date format. The
+    missing formats and one cell style for each are appended to styles.xml
+    once per template; cells are written as serial numbers in the
+    workbook's date system.
+    """
+
+    def __init__(self, styles_xml, date1904=False):
+        self.epoch = MAC_EPOCH if date1904 else WINDOWS_EPOCH
+        prefix = _element_prefix(styles_xml, "cellXfs")
+        if prefix is None:
+            raise OOXMLUnsupported("styles without cellXfs")
+
+        # --- number formats defined in the master
+        formats = dict(BUILTIN_FORMATS)
+        defined_formats = re.findall(rf"<{prefix}numFmt\b([^>]*?)/?>", styles_xml)
+        for fmt in defined_formats:
+            fmt = _attrs(fmt)
+            formats[int(fmt["numFmtId"])] = fmt.get("formatCode", "")
+        format_ids = {code: fmt_id for fmt_id, code in sorted(formats.items(), reverse=True)}
+
+        # --- cell styles, remembering which ones already show dates
+        xfs_match = re.search(rf"<{prefix}cellXfs\b[^>]*>(.*?)</{prefix}cellXfs>", styles_xml, re.S)
+        if xfs_match is None:
+            raise OOXMLUnsupported("empty cellXfs")
+        xfs = re.findall(rf"<{prefix}xf\b([^>]*?)(?:/>|>.*?</{prefix}xf>)", xfs_match.group(1), re.S)
+        self.date_xfs = {
+            str(index) for index, xf in enumerate(xfs)
+            if is_date_format(formats.get(int(_attrs(xf).get("numFmtId", 0)), ""))
+        }
+        if "0" in self.date_xfs:
+            self.date_xfs.add("")
+
+        # --- one added style per date type, with a new number format where needed
+        new_formats = []
+        new_xfs = []
+        self.styles = {}
+        next_format_id = max(BUILTIN_FORMATS_MAX_SIZE, max(formats) + 1)
+        for value_type, code in TIME_FORMATS.items():
+            if code not in format_ids:
+                format_ids[code] = next_format_id
+                new_formats.append(f'<{prefix}numFmt numFmtId="{next_format_id}" formatCode="{_quote(code)}"/>')
+                next_format_id += 1
+            self.styles[value_type] = str(len(xfs) + len(new_xfs))
+            new_xfs.append(
+                f'<{prefix}xf numFmtId="{format_ids[code]}" fontId="0" fillId="0" borderId="0" xfId="0" '
+                'applyNumberFormat="1"/>'
+            )
+
+        xml = styles_xml[:xfs_match.end(1)] + "".join(new_xfs) + styles_xml[xfs_match.end(1):]
+        xml = re.sub(
+            rf'(<{prefix}cellXfs\b[^>]*?\scount\s*=\s*")[^"]*(")',
+            lambda m: f"{m.group(1)}{len(xfs) + len(new_xfs)}{m.group(2)}", xml, count=1,
+        )
+        if new_formats:
+            num_fmts = re.search(rf"<{prefix}numFmts\b([^>]*?)(/?)>", xml)
+            if num_fmts is None:
+                # numFmts is the first child of styleSheet
+                opening = re.search(rf"<{prefix}styleSheet\b[^>]*>", xml)
+                xml = (
+                    xml[:opening.end()] + f'<{prefix}numFmts count="{len(new_formats)}">'
+                    + "".join(new_formats) + f"</{prefix}numFmts>" + xml[opening.end():]
+                )
+            else:
+                count = len(defined_formats) + len(new_formats)
+                attrs = re.sub(r'\scount\s*=\s*"[^"]*"', "", num_fmts.group(1)).rstrip()
+                close_tag = f"</{prefix}numFmts>"
+                if num_fmts.group(2):
+                    # openpyxl writes an empty <numFmts count="0"/>
+                    defined, rest = "", xml[num_fmts.end():]
+                else:
+                    end = xml.index(close_tag, num_fmts.end())
+                    defined, rest = xml[num_fmts.end():end], xml[end + len(close_tag):]
+                xml = (
+                    xml[:num_fmts.start()] + f'<{prefix}numFmts count="{count}"{attrs}>'
+                    + defined + "".join(new_formats) + close_tag + rest
+                )
+        self.xml = xml
+
+    def style_for(self, value, style):
+        """Style of a date cell: its own when that already shows dates, else the added one for the type"""
+        if style in self.date_xfs:
+            return style
+        return self.styles[type(value) if type(value) in self.styles else _date_base_type(value)]
+
+    def serial(self, value):
+        if getattr(value, "tzinfo", None) is not None:
+            raise OOXMLUnsupported("timezone-aware datetime")
+        return to_excel(value, self.epoch)
+
+
+def _date_base_type(value):
+    # Subclasses such as pandas Timestamp use the format of their base type
+    return next(value_type for value_type in TIME_FORMATS if isinstance(value, value_type))
+
+
+class _EditableSheet:
+    """A worksheet part split into head, parsed <sheetData> rows and tail"""
+
+    def __init__(self, xml):
+        prefix = _element_prefix(xml, "sheetData")
+        if prefix is None:
+            raise OOXMLUnsupported("worksheet without sheetData")
+        self.prefix = prefix
+        match = re.search(rf"<{prefix}sheetData\b[^>]*?(/?)>", xml)
+        if match.group(1):
+            self.head = xml[:match.start()] + f"<{prefix}sheetData>"
+            body = ""
+            self.tail = f"</{prefix}sheetData>" + xml[match.end():]
+        else:
+            end = xml.index(f"</{prefix}sheetData>", match.end())
+            self.head = xml[:match.end()]
+            body = xml[match.end():end]
+            self.tail = xml[end:]
+
+        # row number -> (extra row attributes, {column index: (style, cell xml)})
+        self.rows = {}
+        row_re = re.compile(rf"<{prefix}row\b([^>]*?)(?:/>|>(.*?)</{prefix}row>)", re.S)
+        cell_re = re.compile(rf"<{prefix}c\b([^>]*?)(?:/>|>(.*?)</{prefix}c>)", re.S)
+        for row_match in row_re.finditer(body):
+            row_attrs = _attrs(row_match.group(1))
+            if "r" not in row_attrs:
+                raise OOXMLUnsupported("row without r attribute")
+            extra = re.sub(r'\s(?:r|spans)\s*=\s*"[^"]*"', "", row_match.group(1)).rstrip(" /")
+            cells = {}
+            for cell_match in cell_re.finditer(row_match.group(2) or ""):
+                cell_attrs = _attrs(cell_match.group(1))
+                if "r" not in cell_attrs:
+                    raise OOXMLUnsupported("cell without r attribute")
+                column = column_index_from_string(coordinate_from_string(cell_attrs["r"])[0])
+                cells[column] = (cell_attrs.get("s", ""), cell_match.group(0))
+            self.rows[int(row_attrs["r"])] = (extra, cells)
+
+    def render(self, start_row, start_col, values, dates=None):
+        """Chunks of the sheet XML with values written from (start_row, start_col)"""
+        prefix = self.prefix
+        rows = {r: (extra, dict(cells)) for r, (extra, cells) in self.rows.items()}
+        for r, row in enumerate(values, start=start_row):
+            extra, cells = rows.setdefault(r, ("", {}))
+            for c, value in enumerate(row, start=start_col):
+                style, old_xml = cells.get(c, ("", ""))
+                if 't="shared"' in old_xml and "ref=" in old_xml:
+                    raise OOXMLUnsupported("overwriting the anchor of a shared formula")
+                cell_xml = _cell_xml(prefix, f"{get_column_letter(c)}{r}", value, style, dates)
+                if cell_xml is None:
+                    cells.pop(c, None)
+                else:
+                    cells[c] = (style, cell_xml)
+
+        used = [(r, c) for r, (_, cells) in rows.items() for c in cells]
+        if used:
+            dimension = (
+                f"{get_column_letter(min(c for _, c in used))}{min(r for r, _ in used)}:"
+                f"{get_column_letter(max(c for _, c in used))}{max(r for r, _ in used)}"
+            )
+        else:
+            dimension = "A1"
+        yield re.sub(
+            rf'(<{prefix}dimension\b[^>]*?\sref\s*=\s*")[^"]*(")',
+            lambda m: f"{m.group(1)}{dimension}{m.group(2)}",
+            self.head,
+            count=1,
+        )
+        for r in sorted(rows):
+            extra, cells = rows[r]
+            if not cells:
+                if extra:
+                    yield f'<{prefix}row r="{r}"{extra}/>'
+                continue
+            yield f'<{prefix}row r="{r}"{extra}>'
+            yield "".join(cells[c][1] for c in sorted(cells))
+            yield f"</{prefix}row>"
+        yield self.tail
+
+
+def _new_sheet_chunks(rows, dates=None):
+    """Chunks of a minimal worksheet part holding rows from A1"""
+    max_col = max((len(row) for row in rows), default=0)
+    dimension = f"A1:{get_column_letter(max_col)}{len(rows)}" if max_col else "A1"
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+        f'<dimension ref="{dimension}"/><sheetData>'
+    )
+    for r, row in enumerate(rows, start=1):
+        cells = [
+            _cell_xml("", f"{get_column_letter(c)}{r}", value, dates=dates)
+            for c, value in enumerate(row, start=1) if value is not None
+        ]
+        yield f'<row r="{r}">' + "".join(cells) + "</row>"
+    yield "</sheetData></worksheet>"
+
+
+class _ZipEntry:
+    __slots__ = ("name", "flag_bits", "compress_type", "dos_time", "dos_date",
+                 "crc", "compress_size", "file_size", "external_attr", "raw")
+
+
+class _ZipStreamWriter:
+    """
+    Minimal zip writer: copies already-compressed entries as they are and
+    deflates new entries on the fly, using data descriptors so the output
+    only needs write().
+    """
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.offset = 0
+        self.central = []
+
+    def _write(self, data):
+        self.fh.write(data)
+        self.offset += len(data)
+
+    def _central_record(self, entry, name_bytes, header_offset):
+        self.central.append(struct.pack(
+            "<4s4B4HL2L5H2L", b"PK\x01\x02", 20, 0, 20, 0, entry.flag_bits, entry.compress_type,
+            entry.dos_time, entry.dos_date, entry.crc, entry.compress_size, entry.file_size,
+            len(name_bytes), 0, 0, 0, 0, entry.external_attr, header_offset,
+        ) + name_bytes)
+
+    def copy(self, entry):
+        name_bytes = entry.name.encode("utf-8")
+        header_offset = self.offset
+        self._write(struct.pack(
+            "<4s2B4HL2L2H", b"PK\x03\x04", 20, 0, entry.flag_bits, entry.compress_type,
+            entry.dos_time, entry.dos_date, entry.crc, entry.compress_size, entry.file_size,
+            len(name_bytes), 0,
+        ) + name_bytes)
+        self._write(entry.raw)
+        self._central_record(entry, name_bytes, header_offset)
+
+    def stream(self, name, chunks, date_time):
+        entry = _ZipEntry()
+        entry.name = name
+        entry.flag_bits = 0x08 | (0 if name.isascii() else 0x800)
+        entry.compress_type = zipfile.ZIP_DEFLATED
+        entry.dos_time = (date_time[3] << 11) | (date_time[4] << 5) | (date_time[5] // 2)
+        entry.dos_date = ((date_time[0] - 1980) << 9) | (date_time[1] << 5) | date_time[2]
+        entry.external_attr = 0o600 << 16
+
+        name_bytes = name.encode("utf-8")
+        header_offset = self.offset
+        self._write(struct.pack(
+            "<4s2B4HL2L2H", b"PK\x03\x04", 20, 0, entry.flag_bits, entry.compress_type,
+            entry.dos_time, entry.dos_date, 0, 0, 0, len(name_bytes), 0,
+        ) + name_bytes)
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        crc = 0
+        file_size = 0
+        compress_size = 0
+        for chunk in chunks:
+            data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            crc = zlib.crc32(data, crc)
+            file_size += len(data)
+            compressed = compressor.compress(data)
+            compress_size += len(compressed)
+            self._write(compressed)
+        compressed = compressor.flush()
+        compress_size += len(compressed)
+        self._write(compressed)
+        if file_size >= 0xFFFFFFFF or compress_size >= 0xFFFFFFFF:
+            raise OOXMLUnsupported("zip64 sized part")
+
+        entry.crc, entry.compress_size, entry.file_size = crc, compress_size, file_size
+        self._write(struct.pack("<4s3L", b"PK\x07\x08", crc, compress_size, file_size))
+        self._central_record(entry, name_bytes, header_offset)
+
+    def close(self):
+        central_offset = self.offset
+        for record in self.central:
+            self._write(record)
+        # An entry count of 0xFFFF already tells readers to look for zip64 records
+        if len(self.central) >= 0xFFFF or central_offset >= 0xFFFFFFFF:
+            raise OOXMLUnsupported("zip64 sized archive")
+        self._write(struct.pack(
+            "<4s4H2LH", b"PK\x05\x06", 0, 0, len(self.central), len(self.central),
+            self.offset - central_offset, central_offset, 0,
+        ))
+
+
+class OOXMLTemplate:
+    """
+    A master workbook prepared for writing generated copies at the zip level.
+
+    Only the parts a generation changes are produced again: the edited
+    worksheets, the worksheets that get extra data validations, new
+    worksheets and the workbook/relationship/content-type listings. Every
+    other part, vbaProject.bin included, is copied as its original
+    compressed bytes. xl/calcChain.xml is dropped and the workbook is marked
+    for a full recalculation on open, as openpyxl does.
+    """
+
+    def __init__(self, path, data_validations=None, editable_sheet_names=()):
+        stat = os.stat(path)
+        self.path = path
+        self.version = (stat.st_mtime_ns, stat.st_size)
+        with open(path, "rb") as fh:
+            data = fh.read()
+
+        self.entries = []
+        texts = {}
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                if info.flag_bits & 0x01:
+                    raise OOXMLUnsupported("encrypted zip entry")
+                if info.compress_size >= 0xFFFFFFFF or info.header_offset >= 0xFFFFFFFF:
+                    raise OOXMLUnsupported("zip64 master")
+                name_length, extra_length = struct.unpack("<2H", data[info.header_offset + 26:info.header_offset + 30])
+                start = info.header_offset + 30 + name_length + extra_length
+                entry = _ZipEntry()
+                entry.name = info.filename
+                entry.flag_bits = info.flag_bits & 0x800
+                entry.compress_type = info.compress_type
+                entry.dos_time = (info.date_time[3] << 11) | (info.date_time[4] << 5) | (info.date_time[5] // 2)
+                entry.dos_date = ((info.date_time[0] - 1980) << 9) | (info.date_time[1] << 5) | info.date_time[2]
+                entry.crc = info.CRC
+                entry.compress_size = info.compress_size
+                entry.file_size = info.file_size
+                entry.external_attr = info.external_attr
+                entry.raw = data[start:start + info.compress_size]
+                self.entries.append(entry)
+            names = {entry.name for entry in self.entries}
+
+            def read_text(name):
+                if name not in texts:
+                    texts[name] = archive.read(name).decode("utf-8")
+                return texts[name]
+
+            # --- Locate the workbook part and its relationships
+            root_rels = read_text("_rels/.rels")
+            workbook_part = None
+            for rel in re.findall(r"<(?:\w+:)?Relationship\b([^>]*)>", root_rels):
+                rel = _attrs(rel)
+                if rel.get("Type", "").endswith("/officeDocument"):
+                    workbook_part = rel["Target"].lstrip("/")
+            if workbook_part not in names:
+                raise OOXMLUnsupported("workbook part not found")
+            self.workbook_part = workbook_part
+            workbook_dir = posixpath.dirname(workbook_part)
+            self.workbook_rels_part = posixpath.join(workbook_dir, "_rels", posixpath.basename(workbook_part) + ".rels")
+
+            workbook_xml = read_text(workbook_part)
+            rels_xml = read_text(self.workbook_rels_part)
+            content_types_xml = read_text("[Content_Types].xml")
+
+            rels = {}
+            calc_chain_part = None
+            styles_part = None
+            for rel_text in re.findall(r"<(?:\w+:)?Relationship\b[^>]*>", rels_xml):
+                rel = _attrs(rel_text)
+                target = rel.get("Target", "")
+                if rel.get("TargetMode") == "External":
+                    part = None
+                elif target.startswith("/"):
+                    part = target.lstrip("/")
+                else:
+                    part = posixpath.normpath(posixpath.join(workbook_dir, target))
+                rels[rel.get("Id")] = part
+                if rel.get("Type", "").endswith("/styles"):
+                    styles_part = part
+                if rel.get("Type", "").endswith("/calcChain"):
+                    calc_chain_part = part
+                    rels_xml = rels_xml.replace(rel_text, "")
+            self.skip_parts = {calc_chain_part} if calc_chain_part else set()
+            if calc_chain_part:
+                content_types_xml = re.sub(
+                    rf'<(?:\w+:)?Override\b[^>]*PartName="/{re.escape(calc_chain_part)}"[^>]*/>', "", content_types_xml
+                )
+
+            # --- Sheets listed in the workbook
+            sheets_prefix = _element_prefix(workbook_xml, "sheets")
+            if sheets_prefix is None:
+                raise OOXMLUnsupported("workbook without sheets")
+            self.sheet_prefix = sheets_prefix
+            self.sheet_parts = {}
+            sheet_ids = []
+            for sheet_text in re.findall(rf"<{sheets_prefix}sheet\b([^>]*)/?>", workbook_xml):
+                sheet = _attrs(sheet_text)
+                rid = next((value for key, value in sheet.items() if key.endswith(":id")), None)
+                self.sheet_parts[sheet["name"]] = rels.get(rid)
+                sheet_ids.append(int(sheet.get("sheetId", 0)))
+            self.next_sheet_id = max(sheet_ids, default=0) + 1
+
+            # --- Workbook: recalculate on open, since cached formula results are stale
+            calc_pr = re.search(rf"<{sheets_prefix}calcPr\b[^>]*?/?>", workbook_xml)
+            if calc_pr:
+                tag = re.sub(r'\sfullCalcOnLoad\s*=\s*"[^"]*"', "", calc_pr.group(0))
+                tag = re.sub(r"\s*(/?)>$", r' fullCalcOnLoad="1"\1>', tag, count=1)
+                workbook_xml = workbook_xml.replace(calc_pr.group(0), tag, 1)
+            else:
+                following = re.search(
+                    rf"<{sheets_prefix}(?:oleSize|customWorkbookViews|pivotCaches|smartTagPr|smartTagTypes|"
+                    rf"webPublishing|fileRecoveryPr|webPublishObjects|extLst)\b|</{sheets_prefix}workbook>",
+                    workbook_xml,
+                )
+                position = following.start()
+                workbook_xml = workbook_xml[:position] + f'<{sheets_prefix}calcPr fullCalcOnLoad="1"/>' + workbook_xml[position:]
+            self.workbook_xml = workbook_xml
+            self.rels_xml = rels_xml
+            self.content_types_xml = content_types_xml
+            self.rel_ids = set(rels)
+            self.part_names = names
+            self.fixed_parts = {}
+
+            # --- Date formats, the styles part is rewritten with them for every copy
+            self.dates = None
+            if styles_part in names:
+                date1904 = re.search(r'<(?:\w+:)?workbookPr\b[^>]*\sdate1904\s*=\s*"(?:1|true)"', workbook_xml)
+                self.dates = _DateStyles(read_text(styles_part), bool(date1904))
+                self.fixed_parts[styles_part] = self.dates.xml.encode("utf-8")
+
+            # --- Sheets whose cells get written
+            self.editable_sheets = {}
+            for sheet_name in editable_sheet_names:
+                part = self.sheet_parts.get(sheet_name)
+                if part:
+                    self.editable_sheets[sheet_name] = _EditableSheet(read_text(part))
+
+            # --- Sheets that get extra data validations, identical for every request
+            for sheet_name, validations in (data_validations or {}).items():
+                part = self.sheet_parts.get(sheet_name)
+                if not part:
+                    raise OOXMLUnsupported(f"worksheet {sheet_name} does not exist")
+                self.fixed_parts[part] = _with_data_validations(read_text(part), validations).encode("utf-8")
+
+    def render(self, fh, cell_updates=None, new_sheets=()):
+        """
+        Write a generated copy of the master into fh
+        :param cell_updates: {sheet_name: (start_row, start_col, rows)} for editable sheets;
+                             sheets missing from the master are ignored
+        :param new_sheets: list of (title, rows, state) appended as new worksheets
+        """
+        date_time = time.localtime()[:6]
+        changed_parts = dict(self.fixed_parts)
+        for sheet_name, (start_row, start_col, rows) in (cell_updates or {}).items():
+            sheet = self.editable_sheets.get(sheet_name)
+            if sheet is not None:
+                changed_parts[self.sheet_parts[sheet_name]] = sheet.render(start_row, start_col, rows, self.dates)
+
+        # --- New worksheets: part names, relationship ids and listing entries
+        workbook_xml = self.workbook_xml
+        rels_xml = self.rels_xml
+        content_types_xml = self.content_types_xml
+        sheet_names = list(self.sheet_parts)
+        sheet_id = self.next_sheet_id
+        part_number = 1
+        rel_number = 1
+        added_parts = []
+        sheet_elements = []
+        rel_elements = []
+        override_elements = []
+        for title, rows, state in new_sheets:
+            match = INVALID_TITLE_REGEX.search(title)
+            if match:
+                raise ValueError(f"Invalid character {match.group(0)} found in sheet title")
+            title = avoid_duplicate_name(sheet_names, title)
+            sheet_names.append(title)
+            while f"xl/worksheets/sheet{part_number}.xml" in self.part_names:
+                part_number += 1
+            part = f"xl/worksheets/sheet{part_number}.xml"
+            part_number += 1
+            while f"rId{rel_number}" in self.rel_ids:
+                rel_number += 1
+            rel_id = f"rId{rel_number}"
+            rel_number += 1
+
+            state_attr = f' state="{state}"' if state and state != "visible" else ""
+            sheet_elements.append(
+                f'<{self.sheet_prefix}sheet xmlns:r="{REL_NS}" name="{_quote(title)}" '
+                f'sheetId="{sheet_id}"{state_attr} r:id="{rel_id}"/>'
+            )
+            sheet_id += 1
+            target = "/" + part
+            rel_elements.append(f'<Relationship Id="{rel_id}" Type="{WORKSHEET_REL_TYPE}" Target="{target}"/>')
+            override_elements.append(f'<Override PartName="{target}" ContentType="{WORKSHEET_CONTENT_TYPE}"/>')
+            added_parts.append((part, _new_sheet_chunks(rows, self.dates)))
+
+        if sheet_elements:
+            workbook_xml = _insert_before_close(workbook_xml, f"{self.sheet_prefix}sheets", "".join(sheet_elements))
+            rels_xml = _insert_before_close(rels_xml, _element_prefix(rels_xml, "Relationships") + "Relationships", "".join(rel_elements))
+            content_types_xml = _insert_before_close(content_types_xml, _element_prefix(content_types_xml, "Types") + "Types", "".join(override_elements))
+        changed_parts[self.workbook_part] = workbook_xml
+        changed_parts[self.workbook_rels_part] = rels_xml
+        changed_parts["[Content_Types].xml"] = content_types_xml
+
+        # --- Write the archive
+        writer = _ZipStreamWriter(fh)
+        for entry in self.entries:
+            if entry.name in self.skip_parts:
+                continue
+            content = changed_parts.get(entry.name)
+            if content is None:
+                writer.copy(entry)
+            elif isinstance(content, (str, bytes)):
+                writer.stream(entry.name, [content], date_time)
+            else:
+                writer.stream(entry.name, content, date_time)
+        for part, chunks in added_parts:
+            writer.stream(part, chunks, date_time)
+        writer.close()
+        return fh
+
+
+def _insert_before_close(xml, tag, content):
+    close_tag = f"</{tag}>"
+    position = xml.rfind(close_tag)
+    if position == -1:
+        # Self-closing element, e.g. <Relationships .../>
+        match = re.search(rf"<{re.escape(tag)}\b([^>]*?)/>", xml)
+        if not match:
+            raise OOXMLUnsupported(f"{tag} element not found")
+        return xml[:match.start()] + f"<{tag}{match.group(1)}>{content}{close_tag}" + xml[match.end():]
+    return xml[:position] + content + xml[position:]
+
+
+def _with_data_validations(xml, validations):
+    """Worksheet XML with validations appended to its <dataValidations>"""
+    if _element_prefix(xml, "worksheet") != "":
+        raise OOXMLUnsupported("prefixed worksheet namespace")
+    elements = "".join(tostring(dv.to_tree()).decode("utf-8") for dv in validations)
+
+    existing = re.search(r"<dataValidations\b([^>]*?)(/?)>", xml)
+    if existing:
+        if existing.group(2):
+            raise OOXMLUnsupported("empty self-closing dataValidations")
+        end = xml.index("</dataValidations>", existing.end())
+        count = len(re.findall(r"<dataValidation\b", xml[existing.end():end])) + len(validations)
+        attrs = re.sub(r'\scount\s*=\s*"[^"]*"', "", existing.group(1))
+        return (
+            xml[:existing.start()] + f'<dataValidations count="{count}"{attrs}>'
+            + xml[existing.end():end] + elements + xml[end:]
+        )
+
+    sheet_data_end = max(xml.find("</sheetData>"), xml.find("<sheetData/>"))
+    if sheet_data_end == -1:
+        raise OOXMLUnsupported("worksheet without sheetData")
+    positions = [
+        match.start()
+        for name in _AFTER_DATA_VALIDATIONS
+        for match in [re.compile(rf"<{name}[\s>/]").search(xml, sheet_data_end)]
+        if match
+    ]
+    position = min(positions) if positions else xml.rindex("</worksheet>")
+    return xml[:position] + f'<dataValidations count="{len(validations)}">{elements}</dataValidations>' + xml[position:]
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_ooxml_template(path, data_validations=None, editable_sheet_names=()):
+    """Process-wide OOXMLTemplate for path, prepared again when the file changes"""
+    stat = os.stat(path)
+    with _templates_lock:
+        template = _templates.get(path)
+    if template is not None and template.version == (stat.st_mtime_ns, stat.st_size):
+        return template
+    template = OOXMLTemplate(path, data_validations, editable_sheet_names)
+    with _templates_lock:
+        _templates[path] = template
+    return template
@@ -0,0 +1,275 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+# Bytes per chunk of a streamed workbook
+STREAM_CHUNK_SIZE = 256 * 1024
+# How much of a workbook being built stays in memory before spooling to disk
+SPOOL_MAX_MEMORY = 16 * 1024 * 1024
+# Temporary files older than this were left by a crashed writer
+STALE_TMP_SECONDS = 3600
+
+
+class ResultCache:
+    """
+    Generated workbooks stored on disk under a hash of everything that shapes them.
+
+    The key covers the selected rows, the dependency names and the mtime/size
+    of the master and dependency files, so a template refresh yields new keys
+    instead of stale hits. Files are named by key only, the per-request file
+    name is applied at download. Results unused for max_age seconds are
+    deleted, and once the folder holds more than max_bytes the least recently
+    used ones go too. State lives in the folder, so several worker processes
+    can share one cache.
+    """
+
+    def __init__(self, folder, max_bytes=1024 * 1024 * 1024, suffix=".xlsm", max_age=None):
+        """
+        :param max_age: seconds since last use after which a result is deleted, None keeps it
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def __getstate__(self):
+        # Sent to job processes, which get their own lock and counters
+        return {"folder": self.folder, "max_bytes": self.max_bytes, "suffix": self.suffix, "max_age": self.max_age}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def key_for(self, master_path, filling, filling_data, dependencies, template_folder):
+        """Hash of the selection plus the versions of the files it is built from"""
+        versions = [_file_version(master_path)]
+        versions.extend(_file_version(os.path.join(template_folder, f"{dep}.xlsx")) for dep in dependencies)
+        content = [os.path.basename(master_path), filling, filling_data, dependencies, versions]
+        return hashlib.sha256(json.dumps(content, default=str).encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.folder, f"{key}{self.suffix}")
+
+    def get(self, key):
+        """Stored path for key, or None"""
+        path = self.path_for(key)
+        try:
+            # --- mtime doubles as last use for eviction
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def store(self, key, build):
+        """
+        Store the result of build(tmp_path) under key
+        :param build: writes the complete workbook to the path it is given
+        :return: stored path
+        """
+        tmp_path = self.staging_path(key)
+        try:
+            build(tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self.commit(key, tmp_path)
+
+    def staging_path(self, key):
+        """Temporary path to write key's result to before commit()"""
+        os.makedirs(self.folder, exist_ok=True)
+        return f"{self.path_for(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def commit(self, key, tmp_path):
+        """Publish the complete file at tmp_path as key's result, then evict"""
+        path = self.path_for(key)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """
+        Delete results unused for max_age, then least recently used ones until
+        the folder fits max_bytes, and temporary files left by crashed writers
+        """
+        now = time.time()
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    if entry.name.endswith(".tmp"):
+                        if now - stat.st_mtime > STALE_TMP_SECONDS:
+                            self._remove(entry.path)
+                        continue
+                    if not entry.name.endswith(self.suffix):
+                        continue
+                    if entry.path != keep and self.max_age is not None and now - stat.st_mtime > self.max_age:
+                        self._remove(entry.path)
+                        continue
+                    total += stat.st_size
+                    if entry.path != keep:
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        with self._lock:
+            self.evicted += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "folder": self.folder,
+                "max_bytes": self.max_bytes,
+                "max_age": self.max_age,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+            }
+
+
+def build_cached_workbook(result_cache, key, master_path, filling, filling_data, dependencies, template_folder,
+                          dependency_cache=None, pool_size=2, use_ooxml=True):
+    """
+    build_workbook through result_cache, reusing the stored file when key is present
+    :return: stored path of the workbook
+    """
+    path = result_cache.get(key)
+    if path:
+        return path
+    # Deferred, the builder pulls in openpyxl
+    from .workbook_builder import build_workbook
+
+    return result_cache.store(key, lambda tmp_path: build_workbook(
+        master_path, tmp_path, filling, filling_data, dependencies, template_folder,
+        dependency_cache, pool_size, use_ooxml
+    ))
+
+
+def stream_cached_workbook(result_cache, key, master_path, filling, filling_data, dependencies, template_folder,
+                           dependency_cache=None, pool_size=2, use_ooxml=True, keep=True,
+                           max_memory=SPOOL_MAX_MEMORY):
+    """
+    build_workbook into a spooled buffer, to be sent as a streamed response
+    :param keep: reuse and store the workbook in result_cache, written while it is sent
+    :return: WorkbookStream of the built or stored workbook
+    """
+    if keep:
+        path = result_cache.get(key)
+        if path:
+            try:
+                return WorkbookStream(open(path, "rb"))
+            except FileNotFoundError:
+                pass  # evicted in between, build it again
+    from .workbook_builder import build_workbook
+
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    try:
+        build_workbook(
+            master_path, spool, filling, filling_data, dependencies, template_folder,
+            dependency_cache, pool_size, use_ooxml
+        )
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    if keep:
+        return WorkbookStream(spool, result_cache, key)
+    return WorkbookStream(spool)
+
+
+class WorkbookStream:
+    """
+    Iterable of a workbook's bytes in chunks, for a streamed response.
+
+    With result_cache and key, every chunk is also written to the cache as it
+    is sent, so a kept workbook goes to disk and to the client in one pass
+    and is never read back. When the client goes away early the remaining
+    bytes are still stored on close().
+    """
+
+    def __init__(self, fh, result_cache=None, key=None, chunk_size=STREAM_CHUNK_SIZE):
+        self._fh = fh
+        self._result_cache = result_cache
+        self._key = key
+        self._chunk_size = chunk_size
+        self._store = None
+        self._tmp_path = None
+        fh.seek(0, os.SEEK_END)
+        self.size = fh.tell()
+        fh.seek(0)
+
+    def __iter__(self):
+        self._open_store()
+        for chunk in self._chunks():
+            if self._store is not None:
+                self._store.write(chunk)
+            yield chunk
+        self._commit_store()
+
+    def close(self):
+        try:
+            if self._result_cache is not None:
+                # --- stopped early (or never started), store the rest anyway
+                self._open_store()
+                for chunk in self._chunks():
+                    self._store.write(chunk)
+                self._commit_store()
+        finally:
+            if self._store is not None:
+                self._store.close()
+                os.remove(self._tmp_path)
+                self._store = None
+            self._result_cache = None
+            self._fh.close()
+
+    def _chunks(self):
+        return iter(lambda: self._fh.read(self._chunk_size), b"")
+
+    def _open_store(self):
+        if self._result_cache is not None and self._store is None:
+            self._tmp_path = self._result_cache.staging_path(self._key)
+            self._store = open(self._tmp_path, "wb")
+
+    def _commit_store(self):
+        if self._store is None:
+            return
+        self._store.close()
+        self._store = None
+        self._result_cache.commit(self._key, self._tmp_path)
+        self._result_cache = None
+
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TEMPLATE_INDEX_FILE_NAME = ".template_index.json"
+_loaded_indexes = {}  # path -> (file key, TemplateIndex)
+_loaded_indexes_lock = threading.Lock()
+
+
+class TemplateIndex:
+    """JSON record of the Drive version (modifiedTime, md5Checksum) of each local template"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                self._files = json.load(fh)
+        except (OSError, ValueError):
+            self._files = {}
+
+    @staticmethod
+    def _version(file_info):
+        return {
+            "id": file_info.get("id"),
+            "modifiedTime": file_info.get("modifiedTime"),
+            "md5Checksum": file_info.get("md5Checksum"),
+        }
+
+    def is_current(self, file_info, file_path):
+        if not file_info.get("modifiedTime") or not os.path.exists(file_path):
+            return False
+        with self._lock:
+            return self._files.get(file_info["name"]) == self._version(file_info)
+
+    def name_for_id(self, file_id):
+        """Local file name of the Drive file file_id, or None when it was never downloaded"""
+        with self._lock:
+            for name, version in self._files.items():
+                if version.get("id") == file_id:
+                    return name
+        return None
+
+    def update(self, file_info):
+        with self._lock:
+            self._files[file_info["name"]] = self._version(file_info)
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._files, indent=1)
+        write_atomic(self.path, lambda fh: fh.write(data.encode("utf-8")))
+
+
+def load_template_index(path):
+    """
+    TemplateIndex of path for lookups, parsed again only once the file changed (e.g. after
+    another worker's sync_templates). Do not update the returned index.
+    """
+    try:
+        stat = os.stat(path)
+        file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        file_key = None
+    with _loaded_indexes_lock:
+        loaded = _loaded_indexes.get(path)
+    if loaded is not None and loaded[0] == file_key:
+        return loaded[1]
+    index = TemplateIndex(path)
+    with _loaded_indexes_lock:
+        _loaded_indexes[path] = (file_key, index)
+    return index
+
+
+def write_atomic(dest_path, write):
+    """
+    Call write(fh) on a temp file next to dest_path, then rename it over dest_path.
+    Readers see either the old file or the complete new one, never a partial write.
+    """
+    tmp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as fh:
+            write(fh)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return dest_path
+
+
+def sync_templates(gs, file_list, template_folder, max_workers=8, force=False):
+    """
+    Download changed Drive templates into template_folder concurrently
+    :param gs: GoogleService
+    :param file_list: Drive file dicts {id, name, modifiedTime, md5Checksum}
+    :param force: download every file even when the local copy is current
+    :return: dict {downloaded, skipped, failed, seconds, files: [{name, status, seconds, err_msg}]}
+    """
+    start = time.perf_counter()
+    os.makedirs(template_folder, exist_ok=True)
+    index = TemplateIndex(os.path.join(template_folder, TEMPLATE_INDEX_FILE_NAME))
+
+    def refresh(file_info):
+        file_start = time.perf_counter()
+        file_path = os.path.join(template_folder, file_info["name"])
+        report = {"name": file_info["name"], "status": "skipped", "err_msg": ""}
+        try:
+            if force or not index.is_current(file_info, file_path):
+                write_atomic(file_path, lambda fh: gs.download_to(file_info["id"], fh))
+                index.update(file_info)
+                report["status"] = "downloaded"
+        except Exception as e:
+            report["status"] = "failed"
+            report["err_msg"] = str(e)
+        report["seconds"] = round(time.perf_counter() - file_start, 3)
+        return report
+
+    file_reports = []
+    if file_list:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(file_list)))) as pool:
+            file_reports = list(pool.map(refresh, file_list))
+    index.save()
+
+    return {
+        "downloaded": sum(1 for r in file_reports if r["status"] == "downloaded"),
+        "skipped": sum(1 for r in file_reports if r["status"] == "skipped"),
+        "failed": sum(1 for r in file_reports if r["status"] == "failed"),
+        "seconds": round(time.perf_counter() - start, 3),
+        "files": file_reports,
+    }
@@ -0,0 +1,176 @@
+import os
+import logging
+from openpyxl.worksheet.datavalidation import DataValidation
+from .dependency_cache import default_dependency_cache
+from .master_template import get_master_template
+from .ooxml_writer import OOXMLUnsupported, get_ooxml_template
+
+logger = logging.getLogger(__name__)
+
+
+def build_workbook(master_path, output_path, filling, filling_data, dependencies, template_folder,
+                   dependency_cache=None, pool_size=2, use_ooxml=True):
+    """
+    Write the generated copy of the master for one generate_excel_files request
+    :param output_path: file path, or a writable and seekable binary file object
+    :param use_ooxml: write at the zip level, regenerating only the changed parts;
+                      falls back to the parsed-master path for anything it cannot reproduce
+    :return: output_path
+    """
+    dependency_sheets = collect_dependency_sheets(dependencies, template_folder, dependency_cache)
+
+    if use_ooxml:
+        try:
+            template = get_ooxml_template(
+                master_path, {"Configurator": build_data_validations()}, ("Fillings", "FillingsData")
+            )
+            cell_updates = {}
+            if filling:
+                cell_updates["Fillings"] = (2, 1, filling)
+            if filling_data:
+                cell_updates["FillingsData"] = (2, 2, [[to_number(val) for val in row] for row in filling_data])
+            new_sheets = [(title, rows, "hidden") for title, rows in dependency_sheets]
+            if hasattr(output_path, "write"):
+                template.render(output_path, cell_updates, new_sheets)
+            else:
+                with open(output_path, "wb") as fh:
+                    template.render(fh, cell_updates, new_sheets)
+            return output_path
+        except OOXMLUnsupported as e:
+            logger.info(f"OOXML writer not usable for {master_path}, using openpyxl: {e}")
+            if hasattr(output_path, "write"):
+                output_path.seek(0)
+                output_path.truncate()
+
+    with get_master_template(master_path, pool_size).checkout() as wb:
+        fill_workbook(wb, filling, filling_data, dependency_sheets)
+        wb.save(output_path)
+    return output_path
+
+
+def prepare_master(master_path, pool_size=2, use_ooxml=True):
+    """Parse the master the way build_workbook will use it, e.g. before web server workers fork"""
+    if use_ooxml:
+        try:
+            return get_ooxml_template(
+                master_path, {"Configurator": build_data_validations()}, ("Fillings", "FillingsData")
+            )
+        except OOXMLUnsupported as e:
+            logger.info(f"OOXML writer not usable for {master_path}, using openpyxl: {e}")
+    return get_master_template(master_path, pool_size)
+
+
+def populate_workbook(wb, filling, filling_data, dependencies, template_folder, dependency_cache=None):
+    """
+    Fill a master workbook for one generate_excel_files request
+    :param filling: Fillings rows, written from A2
+    :param filling_data: FillingsData rows, written from B2
+    :param dependencies: dependency names, each read from template_folder/{dep}.xlsx
+    :param dependency_cache: DependencyCache to read dependencies through
+    """
+    fill_workbook(wb, filling, filling_data, collect_dependency_sheets(dependencies, template_folder, dependency_cache))
+
+
+def fill_workbook(wb, filling, filling_data, dependency_sheets):
+    """populate_workbook with the dependency sheets already collected"""
+    # 🔹 Write Fillings
+    if "Fillings" in wb.sheetnames and filling:
+        ws = wb["Fillings"]
+        for r, row in enumerate(filling, start=2):
+            for c, val in enumerate(row, start=1):
+                ws.cell(row=r, column=c, value=val)
+
+    # 🔹 Write FillingsData
+    if "FillingsData" in wb.sheetnames and filling_data:
+        ws = wb["FillingsData"]
+        for r, row in enumerate(filling_data, start=2):  # write starting at row 2
+            for c, val in enumerate(row, start=2):
+                ws.cell(row=r, column=c, value=to_number(val))
+    rebuild_data_validation(wb)
+
+    # 🔹 Copy dependency sheets (if exist)
+    for title, rows in dependency_sheets:
+        copied_ws = append_sheet_rows(rows, wb, title)
+        copied_ws.sheet_state = "hidden"
+
+
+def to_number(val):
+    """Numeric strings from the login sheet as int or float, anything else unchanged"""
+    if isinstance(val, str) and val.strip().replace(".", "", 1).isdigit():
+        # Convert to int or float depending on presence of "."
+        if "." in val:
+            return float(val)
+        return int(val)
+    return val
+
+
+def collect_dependency_sheets(dependencies, template_folder, dependency_cache=None):
+    """
+    Sheets copied (hidden) into a generated workbook
+    :return: list of (title, rows); only sheets with "." in their name, titled "{sheet}.{dep}"
+    """
+    dependency_cache = dependency_cache or default_dependency_cache
+    dependency_sheets = []
+    for dep in dependencies:
+        dep_file = os.path.join(template_folder, f"{dep}.xlsx")
+        if os.path.exists(dep_file):
+            for sheet_name, rows in dependency_cache.get(dep_file).items():
+                if sheet_name not in ("Fillings", "FillingsData") and "." in sheet_name:
+                    dependency_sheets.append((f"{sheet_name}.{dep}", rows))
+    return dependency_sheets
+
+
+def append_sheet_rows(rows, target_wb, new_title):
+    """New sheet holding rows from A1, appended row by row instead of cell by cell"""
+    target_ws = target_wb.create_sheet(title=new_title)
+    for row in rows:
+        target_ws.append(row)
+    return target_ws
+
+
+def rebuild_data_validation(wb):
+    configurator_sheet = wb["Configurator"]
+    for dv in build_data_validations():
+        configurator_sheet.add_data_validation(dv)
+
+
+def build_data_validations():
+    """Drop-down validations the Configurator sheet gets in every generated workbook"""
+    data_validations = []
+
+    # Example: Dropdown in D7 from Fillings!A2:A50
+    dv_main = DataValidation(
+        type="list",
+        formula1="=Fillings!$A$2:$A$50",
+        allow_blank=True,
+        showDropDown=False
+    )
+    dv_main.add("D7:I7")
+    data_validations.append(dv_main)
+
+    # Row-based dependent dropdowns
+    start_row = 15
+    end_row = 50
+
+    for r in range(start_row, end_row + 1):
+        # IMPORTANT: formula must be quoted as string for Excel
+        formula = f'=$AD${r}:$BJ${r}'
+
+        dv = DataValidation(
+            type="list",
+            formula1=formula,
+            allow_blank=True,
+            showDropDown=False
+        )
+        dv.add(f"F{r}")
+        data_validations.append(dv)
+
+    dv_head = DataValidation(
+        type="list",
+        formula1='=TestHeads!$K$2:$K$50',
+        allow_blank=True,
+        showDropDown=False
+    )
+    dv_head.add("F12")
+    data_validations.append(dv_head)
+    return data_validations
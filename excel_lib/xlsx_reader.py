@@ -0,0 +1,45 @@
+def iter_sheet_rows(source, sheet_name_list=None, max_blank_rows=None, data_only=True):
+    """
+    Stream rows out of an xlsx opened in read-only mode
+    :param source: file path or binary file object
+    :param sheet_name_list: sheets to read (default = all), other sheets are never parsed
+    :param max_blank_rows: stop reading a sheet after this many consecutive blank rows
+    :param data_only: cached values instead of formulas
+    :return: generator of (sheet_name, rows) where rows is a generator of value lists;
+             trailing blank rows are dropped. Exhaust rows before moving to the next sheet.
+    """
+    from openpyxl import load_workbook  # deferred, openpyxl is a slow import
+
+    wb = load_workbook(filename=source, read_only=True, data_only=data_only)
+    try:
+        if sheet_name_list:
+            sheet_names = [name for name in sheet_name_list if name in wb.sheetnames]
+        else:
+            sheet_names = wb.sheetnames
+        for sheet_name in sheet_names:
+            yield sheet_name, _iter_rows(wb[sheet_name], max_blank_rows)
+    finally:
+        wb.close()
+
+
+def read_sheet_rows(source, sheet_name_list=None, max_blank_rows=None, data_only=True):
+    """Same as iter_sheet_rows, collected into {sheet_name: [[...], ...]}"""
+    return {
+        sheet_name: list(rows)
+        for sheet_name, rows in iter_sheet_rows(source, sheet_name_list, max_blank_rows, data_only)
+    }
+
+
+def _iter_rows(ws, max_blank_rows):
+    blank_run = 0
+    for row in ws.iter_rows(values_only=True):
+        if all(value is None for value in row):
+            blank_run += 1
+            if max_blank_rows is not None and blank_run >= max_blank_rows:
+                return
+            continue
+        # Blank rows between data rows are kept, only trailing ones are dropped
+        for _ in range(blank_run):
+            yield [None] * len(row)
+        blank_run = 0
+        yield list(row)
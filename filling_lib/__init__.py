@@ -0,0 +1,17 @@
+from .filling_index import FillingIndex
+from .filling_snapshot import FillingSnapshot, Snapshot
+from .sheet_diff import changed_row_runs, merge_option_order, rows_as_read
+from .sync_manifest import SyncManifest
+from .sync_pipeline import fetch_xlsx_files, fetch_xlsx_files_async
+
+__all__ = [
+    "FillingIndex",
+    "FillingSnapshot",
+    "Snapshot",
+    "SyncManifest",
+    "changed_row_runs",
+    "fetch_xlsx_files",
+    "fetch_xlsx_files_async",
+    "merge_option_order",
+    "rows_as_read",
+]
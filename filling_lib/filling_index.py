@@ -0,0 +1,127 @@
+import json
+import hashlib
+
+
+class FillingIndex:
+    """
+    Lookup tables of the login sheet, compiled once per data version.
+
+    Header positions are resolved once instead of building a dict per row,
+    dependencies are split at build time, and every visible name keeps its
+    fillings in sheet order with their loading codes, so validate() only
+    does set lookups.
+    """
+
+    def __init__(self, filling_rows, filling_data_rows, filling_order_rows):
+        """
+        :param filling_rows: Fillings sheet values, header row first
+        :param filling_data_rows: FillingsData sheet values from column B, header row first
+        :param filling_order_rows: FillingsOrder values below the header, option in the first column
+        """
+        # --- build filling_data_dict
+        self.filling_data_dict = {}
+        data_col = _column_getter(filling_data_rows[0] if filling_data_rows else [])
+        name_of_data = data_col("Filling Name")
+        for row_data in filling_data_rows[1:]:
+            filling_name = name_of_data(row_data)
+            if filling_name:
+                self.filling_data_dict.setdefault(filling_name, []).append(row_data)
+
+        # --- build filling_info_dict, plus the (filling name, loading code) list per visible name
+        self.filling_info_dict = {}
+        self.option_entries = {}
+        col = _column_getter(filling_rows[0] if filling_rows else [])
+        visible_name_of = col("Visible Name")
+        filling_name_of = col("Filling Name")
+        loading_code_of = col("Loading Code")
+        sheet_name_of = col("SpreadSheet Name")
+        sheet_id_of = col("SpreadSheet ID")
+        dependencies_of = col("Dependencies")
+        for row_data in filling_rows[1:]:
+            filling_visible_name = visible_name_of(row_data)
+            if not filling_visible_name:
+                continue
+            filling_name = filling_name_of(row_data)
+            sheet_name = sheet_name_of(row_data)
+            loading_code = loading_code_of(row_data) or ""
+
+            dependencies_list = [d.strip() for d in (dependencies_of(row_data) or "").split(",") if d.strip()]
+            dependencies_list.append(sheet_name)
+
+            self.filling_info_dict.setdefault(filling_visible_name, {})[filling_name] = {
+                "row_data": row_data,
+                "LC_code": loading_code,
+                "sheet_name": sheet_name,
+                "sheet_id": sheet_id_of(row_data),
+                "filling_data": self.filling_data_dict.get(filling_name, []),
+                "dependencies": dependencies_list,
+            }
+
+        # A repeated filling name keeps its first position and its last details, like the dict it replaces
+        for filling_visible_name, names in self.filling_info_dict.items():
+            self.option_entries[filling_visible_name] = [
+                (filling_name, details["LC_code"]) for filling_name, details in names.items()
+            ]
+
+        # --- option list, deduplicated while preserving order
+        option_list = [row[0] for row in filling_order_rows if row and row[0]]
+        self.option_list = list(dict.fromkeys(option_list))
+        # Content version of option_list, pages listing the options use it as their ETag
+        self.option_list_version = hashlib.sha256(json.dumps(self.option_list).encode("utf-8")).hexdigest()[:16]
+
+    def validate(self, filling_options, loading_codes):
+        """
+        Fillings selected by filling_options and the comma separated loading_codes.
+        A filling with no loading code is always selected, a code selects the
+        first filling that asks for it and is used up by it.
+        :return: {"is_success", "err_msg", "validated_filling_dict"}
+        """
+        result = {"is_success": False, "err_msg": ""}
+        if not filling_options:
+            result["err_msg"] = "Mandatory field Filling Options is empty"
+            return result
+
+        available_codes = {x.strip() for x in loading_codes.split(",") if x.strip()}
+
+        validated_filling_dict = {}
+        for filling_option in filling_options:
+            entries = self.option_entries.get(filling_option)
+            if entries is None:
+                result["err_msg"] = f"Filling options: {filling_option} is not available. Please contact developer"
+                return result
+
+            validated_names = []
+            for filling_name, loading_code in entries:
+                if loading_code == "" or loading_code in available_codes:
+                    validated_names.append(filling_name)
+                    available_codes.discard(loading_code)
+
+            if not validated_names:
+                result["err_msg"] = f"Option code not found for filling: {filling_option}."
+                return result
+
+            filling_code_dict = self.filling_info_dict[filling_option]
+            validated_filling_dict[filling_option] = {name: filling_code_dict[name] for name in validated_names}
+
+        result["is_success"] = True
+        result["validated_filling_dict"] = validated_filling_dict
+        return result
+
+
+def _column_getter(header):
+    """
+    Build value getters by column name, resolved once per header.
+    A missing column reads as None and a short row as "", like get_row_dict.
+    """
+    positions = {}
+    for index, col_name in enumerate(header):
+        if str(col_name):
+            positions[col_name] = index
+
+    def getter(col_name):
+        index = positions.get(col_name)
+        if index is None:
+            return lambda row_data: None
+        return lambda row_data: row_data[index] if index < len(row_data) else ""
+
+    return getter
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import threading
+from functools import cached_property
+from excel_lib.template_sync import write_atomic
+from .filling_index import FillingIndex
+
+
+class Snapshot:
+    """One saved version of the login sheet tables"""
+
+    def __init__(self, version, saved_at, filling_rows, filling_data_rows, filling_order_rows):
+        self.version = version
+        self.saved_at = saved_at
+        self.filling_rows = filling_rows
+        self.filling_data_rows = filling_data_rows
+        self.filling_order_rows = filling_order_rows
+
+    @cached_property
+    def index(self):
+        """FillingIndex of this version, compiled on first use"""
+        return FillingIndex(self.filling_rows, self.filling_data_rows, self.filling_order_rows)
+
+    def age(self):
+        return time.time() - self.saved_at
+
+
+class FillingSnapshot:
+    """
+    Login sheet tables (Fillings, FillingsData, FillingsOrder) shared by every worker process.
+
+    The rows live in one JSON file that is replaced atomically on save()
+    with the version incremented. current() only stats the file and parses
+    it again once another process saved a new version, so workers read the
+    tables without calling Google and compile each version once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file_key = None
+        self._snapshot = None
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+
+    def current(self):
+        """Latest saved Snapshot, or None before the first save (counted as a miss)"""
+        snapshot = self._read()
+        with self._lock:
+            if snapshot is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return snapshot
+
+    def _read(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if file_key == self._file_key:
+                return self._snapshot
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                snapshot = Snapshot(**json.load(fh))
+        except (OSError, ValueError, TypeError):
+            return None
+        with self._lock:
+            self._file_key = file_key
+            self._snapshot = snapshot
+            self.loads += 1
+        return snapshot
+
+    def save(self, filling_rows, filling_data_rows, filling_order_rows):
+        """
+        Store a new version, callers serialize saves (e.g. with the sync FileLock)
+        :return: the saved Snapshot
+        """
+        previous = self._read()
+        snapshot = Snapshot(
+            (previous.version if previous else 0) + 1, time.time(),
+            filling_rows, filling_data_rows, filling_order_rows,
+        )
+        data = json.dumps({
+            "version": snapshot.version,
+            "saved_at": snapshot.saved_at,
+            "filling_rows": filling_rows,
+            "filling_data_rows": filling_data_rows,
+            "filling_order_rows": filling_order_rows,
+        }, default=str).encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        write_atomic(self.path, lambda fh: fh.write(data))
+        stat = os.stat(self.path)
+        with self._lock:
+            self._file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._snapshot = snapshot
+        return snapshot
+
+    def stats(self):
+        snapshot = self._read()
+        with self._lock:
+            return {
+                "path": self.path,
+                "version": snapshot.version if snapshot else None,
+                "age": round(snapshot.age(), 1) if snapshot else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+            }
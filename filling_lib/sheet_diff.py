@@ -0,0 +1,73 @@
+def changed_row_runs(current_rows, new_rows, width):
+    """
+    Rows to write so a sheet holding current_rows ends up holding new_rows
+    :param current_rows: rows as read back from Sheets, trailing blanks trimmed
+    :param new_rows: rows as they should be
+    :param width: columns the table spans, shorter rows are padded with ""
+    :return: list of (offset, rows) runs of consecutive changed rows, offset counted from
+             the first row; rows beyond new_rows come back blank so old values are cleared
+    """
+    runs = []
+    run_start = None
+    run_rows = []
+    for offset in range(max(len(current_rows), len(new_rows))):
+        row = _padded(new_rows[offset] if offset < len(new_rows) else [], width)
+        current = current_rows[offset] if offset < len(current_rows) else []
+        if _as_read(row) == _as_read(_padded(current, width)):
+            if run_rows:
+                runs.append((run_start, run_rows))
+                run_rows = []
+            continue
+        if not run_rows:
+            run_start = offset
+        run_rows.append(row)
+    if run_rows:
+        runs.append((run_start, run_rows))
+    return runs
+
+
+def merge_option_order(current_order, options):
+    """
+    FillingsOrder column after a sync: the existing order of options that are still
+    offered, then new options in the order they were found
+    """
+    offered = set(options)
+    listed = set(current_order)
+    return [option for option in current_order if option in offered] + [
+        option for option in dict.fromkeys(options) if option not in listed
+    ]
+
+
+def rows_as_read(rows, width):
+    """
+    Rows as Sheets reads them back once written: cells as text, trailing blank
+    cells and rows trimmed
+    :param width: columns the table spans, longer rows are cut like the writes are
+    """
+    table = []
+    for row in rows:
+        row = _as_read(_padded(row, width))
+        while row and row[-1] == "":
+            row.pop()
+        table.append(row)
+    while table and not table[-1]:
+        table.pop()
+    return table
+
+
+def _padded(row, width):
+    row = ["" if val is None else val for val in row[:width]]
+    return row + [""] * (width - len(row))
+
+
+def _as_read(row):
+    # Sheets reads cells back as text: 5 and 5.0 as "5", True as "TRUE"
+    return [_cell_text(val) for val in row]
+
+
+def _cell_text(val):
+    if isinstance(val, bool):
+        return "TRUE" if val else "FALSE"
+    if isinstance(val, float) and val.is_integer():
+        return str(int(val))
+    return str(val)
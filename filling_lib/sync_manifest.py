@@ -0,0 +1,72 @@
+import os
+import json
+import threading
+from excel_lib.template_sync import write_atomic
+
+
+class SyncManifest:
+    """
+    JSON record of the Drive workbooks already extracted by sync_filling_data.
+
+    Each entry stores the file's modifiedTime and md5Checksum next to the sheet
+    rows extracted from it, so a later sync only downloads files whose version
+    changed and reuses the stored rows for the rest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._files = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                return json.load(fh).get("files", {})
+        except (OSError, ValueError):
+            return {}
+
+    def reload(self):
+        """Pick up entries another process saved since this one loaded the file"""
+        files = self._load()
+        with self._lock:
+            self._files = files
+
+    @staticmethod
+    def _version(file_info):
+        return {
+            "modifiedTime": file_info.get("modifiedTime"),
+            "md5Checksum": file_info.get("md5Checksum"),
+        }
+
+    def get_content(self, file_info):
+        """Stored sheet rows for file_info, or None when missing or out of date"""
+        with self._lock:
+            entry = self._files.get(file_info["id"])
+        if not entry or not file_info.get("modifiedTime"):
+            return None
+        if entry["version"] != self._version(file_info):
+            return None
+        return entry["file_content"]
+
+    def update(self, file_info, file_content):
+        with self._lock:
+            self._files[file_info["id"]] = {
+                "name": file_info.get("name"),
+                "version": self._version(file_info),
+                "file_content": file_content,
+            }
+
+    def prune(self, keep_file_ids):
+        """Forget files that are no longer in the Drive folder"""
+        keep_file_ids = set(keep_file_ids)
+        with self._lock:
+            for file_id in list(self._files):
+                if file_id not in keep_file_ids:
+                    del self._files[file_id]
+
+    def save(self):
+        # Write to a temp file and rename, so a crash never leaves half a manifest
+        with self._lock:
+            data = json.dumps({"files": self._files}, default=str).encode("utf-8")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_atomic(self.path, lambda fh: fh.write(data))
@@ -0,0 +1,74 @@
+import time
+import asyncio
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from excel_lib import read_sheet_rows
+
+# Workbooks are parsed read-only and only for the requested sheets,
+# a sheet ends after this many consecutive blank rows
+STREAM_MAX_BLANK_ROWS = 1000
+read_workbook_rows = partial(read_sheet_rows, max_blank_rows=STREAM_MAX_BLANK_ROWS)
+
+
+def fetch_xlsx_files(gs, file_list, sheet_name_list=None, max_workers=8):
+    """
+    Download and parse Drive workbooks concurrently
+    :param gs: GoogleService
+    :param file_list: list of Drive file dicts with at least {id, name}
+    :param sheet_name_list: sheets to read from every workbook
+    :param max_workers: upper bound on parallel downloads
+    :return: list of read_xlsx_file results in file_list order, each with
+             extra keys {file_id, seconds}
+    """
+    if not file_list:
+        return []
+
+    def fetch(file_info):
+        start = time.perf_counter()
+        try:
+            result = gs.read_xlsx_file(
+                file_info["id"], sheet_name_list, file_name=file_info.get("name"), parser=read_workbook_rows
+            )
+        except Exception as e:
+            result = _failed_result(file_info, e)
+        return _with_timing(result, file_info, start)
+
+    worker_count = max(1, min(max_workers, len(file_list)))
+    with ThreadPoolExecutor(max_workers=worker_count) as pool:
+        # map keeps results in input order whatever order they finish in
+        return list(pool.map(fetch, file_list))
+
+
+async def fetch_xlsx_files_async(ags, file_list, sheet_name_list=None):
+    """
+    fetch_xlsx_files for asyncio: every download is started at once, concurrency is
+    bounded by the service's per-API limits and parsing runs in worker threads
+    :param ags: AsyncGoogleService (or ThreadedAsyncService)
+    :return: list of read_xlsx_file results in file_list order, each with extra keys {file_id, seconds}
+    """
+    async def fetch(file_info):
+        start = time.perf_counter()
+        try:
+            result = await ags.read_xlsx_file(
+                file_info["id"], sheet_name_list, file_name=file_info.get("name"), parser=read_workbook_rows
+            )
+        except Exception as e:
+            result = _failed_result(file_info, e)
+        return _with_timing(result, file_info, start)
+
+    return list(await asyncio.gather(*(fetch(file_info) for file_info in file_list)))
+
+
+def _failed_result(file_info, error):
+    return {
+        "is_success": False,
+        "err_msg": f"Error reading XLSX file from Google Drive: {error}",
+        "file_name": file_info.get("name", ""),
+        "file_content": None,
+    }
+
+
+def _with_timing(result, file_info, start):
+    result["file_id"] = file_info["id"]
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
@@ -1,3 +1,21 @@
+from .async_service import AsyncGoogleService, ThreadedAsyncService
+from .backends import LazyGoogleService, create_async_google_service, create_google_service
+from .clients import ClientPool
 from .google_service import GoogleService
+from .local_service import LocalGoogleService
+from .request_executor import ApiError, DeadlineExceeded, RequestExecutor, TokenBucket
 
-__all__ = ["GoogleService"]
\ No newline at end of file
+__all__ = [
+    "ApiError",
+    "AsyncGoogleService",
+    "ClientPool",
+    "DeadlineExceeded",
+    "GoogleService",
+    "LazyGoogleService",
+    "LocalGoogleService",
+    "RequestExecutor",
+    "ThreadedAsyncService",
+    "TokenBucket",
+    "create_async_google_service",
+    "create_google_service",
+]
@@ -0,0 +1,369 @@
+import os
+import re
+import asyncio
+import tempfile
+from urllib.parse import quote
+from .google_service import (
+    API_CALL_DEADLINE,
+    API_MAX_BACKOFF,
+    API_RATES,
+    CREDENTIALS_FILE_PATH,
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_SPOOL_MAX_MEMORY,
+    HTTP_TIMEOUT,
+    SCOPES,
+    read_workbook_sheets,
+)
+from .request_executor import ApiError, RequestExecutor
+
+
+SHEETS_URL = "https://sheets.googleapis.com/v4/spreadsheets"
+DRIVE_URL = "https://www.googleapis.com/drive/v3/files"
+
+# Requests in flight at once per API, on top of the executor's rate limits
+API_CONCURRENCY = {
+    "sheets": int(os.getenv("SHEETS_MAX_CONCURRENCY", "4")),
+    "drive": int(os.getenv("DRIVE_MAX_CONCURRENCY", "16")),
+}
+# Seconds an idle pooled connection is kept open
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+_CONTENT_RANGE_TOTAL = re.compile(r"/(\d+)$")
+
+
+class _LoopState:
+    """HTTP client and asyncio primitives, bound to the event loop they were created in"""
+
+    def __init__(self, loop, max_concurrency, transport=None):
+        import httpx
+
+        self.loop = loop
+        connections = sum(max_concurrency.values())
+        self.client = httpx.AsyncClient(
+            transport=transport,
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=connections,
+                max_keepalive_connections=connections,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        self.semaphores = {api: asyncio.Semaphore(limit) for api, limit in max_concurrency.items()}
+        self.refresh_lock = asyncio.Lock()
+
+
+class AsyncGoogleService:
+    """
+    GoogleService for asyncio code, talking to the Sheets and Drive REST APIs over httpx.
+
+    Methods mirror GoogleService and return the same values, but are
+    coroutines. Requests share one keep-alive connection pool, go through
+    the RequestExecutor (rate limits, retries, deadline) and are capped per
+    API by max_concurrency. Workbooks are parsed in a worker thread so the
+    event loop is never blocked. The client is bound to the event loop that
+    first uses it; call aclose() (or use "async with") before that loop ends.
+    """
+
+    def __init__(self, creds=None, executor=None, max_concurrency=None, transport=None):
+        # Build credentials from the service account file
+        if creds is None:
+            from google.oauth2 import service_account
+
+            creds = service_account.Credentials.from_service_account_file(
+                CREDENTIALS_FILE_PATH,
+                scopes=SCOPES
+            )
+
+        self.creds = creds
+        # Rate limits, retries and deadlines for every request, may be shared with a GoogleService
+        self.executor = executor or RequestExecutor(API_RATES, max_delay=API_MAX_BACKOFF, deadline=API_CALL_DEADLINE)
+        self.max_concurrency = dict(API_CONCURRENCY, **(max_concurrency or {}))
+        # httpx transport, None for the default pooled HTTP transport
+        self._transport = transport
+        self._state = None
+        self.refresh_count = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the pooled connections"""
+        state, self._state = self._state, None
+        if state is not None:
+            await state.client.aclose()
+
+    def _loop_state(self):
+        loop = asyncio.get_running_loop()
+        if self._state is None or self._state.loop is not loop:
+            # A client left from a finished loop cannot be closed from this one, it is dropped
+            self._state = _LoopState(loop, self.max_concurrency, self._transport)
+        return self._state
+
+    async def _auth_headers(self, state):
+        if not getattr(self.creds, "valid", True):
+            async with state.refresh_lock:
+                if not self.creds.valid:
+                    # google-auth refreshes synchronously, keep it off the event loop
+                    await asyncio.to_thread(self._refresh_token)
+        headers = {}
+        self.creds.apply(headers)
+        return headers
+
+    def _refresh_token(self):
+        import httplib2
+        import google_auth_httplib2
+
+        self.creds.refresh(google_auth_httplib2.Request(httplib2.Http(timeout=HTTP_TIMEOUT)))
+        self.refresh_count += 1
+
+    async def _send(self, api, method_name, http_method, url, params=None, json=None, headers=None,
+                    idempotent=True):
+        """
+        One API request through the executor
+        :return: the httpx response, raises ApiError for error statuses
+        """
+        state = self._loop_state()
+
+        async def send():
+            async with state.semaphores[api]:
+                request_headers = await self._auth_headers(state)
+                if headers:
+                    request_headers.update(headers)
+                response = await state.client.request(
+                    http_method, url, params=params, json=json, headers=request_headers
+                )
+                if response.status_code >= 400:
+                    raise ApiError(response.status_code, response.content, response.headers, url)
+                return response
+
+        return await self.executor.acall(api, send, method=method_name, idempotent=idempotent)
+
+    async def _request(self, api, method_name, http_method, url, params=None, json=None, idempotent=True):
+        response = await self._send(api, method_name, http_method, url, params, json, idempotent=idempotent)
+        return response.json()
+
+    def _values_url(self, spreadsheet_id, range_name=None, action=""):
+        url = f"{SHEETS_URL}/{quote(spreadsheet_id, safe='')}/values"
+        if range_name is not None:
+            url += "/" + quote(range_name, safe="")
+        return url + action
+
+    # --- Sheets ---
+    async def read_sheet(self, spreadsheet_id, range_name):
+        result = await self._request(
+            "sheets", "sheets.spreadsheets.values.get", "GET", self._values_url(spreadsheet_id, range_name)
+        )
+        return result.get("values", [])
+
+    async def append_sheet(self, spreadsheet_id, range_name, values):
+        return await self._request(
+            "sheets", "sheets.spreadsheets.values.append", "POST",
+            self._values_url(spreadsheet_id, range_name, ":append"),
+            params={"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+            json={"values": values},
+            idempotent=False,
+        )
+
+    async def write_sheet(self, spreadsheet_id, range_name, values):
+        return await self._request(
+            "sheets", "sheets.spreadsheets.values.update", "PUT",
+            self._values_url(spreadsheet_id, range_name),
+            params={"valueInputOption": "RAW"},
+            json={"values": values},
+        )
+
+    async def clear_range(self, spreadsheet_id, range_name):
+        return await self._request(
+            "sheets", "sheets.spreadsheets.values.clear", "POST",
+            self._values_url(spreadsheet_id, range_name, ":clear"),
+            json={},
+        )
+
+    async def batch_get(self, spreadsheet_id, ranges):
+        """
+        Read several ranges in a single values:batchGet request
+        :return: list of row lists, one per range, in the order requested
+        """
+        result = await self._request(
+            "sheets", "sheets.spreadsheets.values.batchGet", "GET",
+            self._values_url(spreadsheet_id, action=":batchGet"),
+            params={"ranges": list(ranges)},
+        )
+        return [value_range.get("values", []) for value_range in result.get("valueRanges", [])]
+
+    async def batch_update(self, spreadsheet_id, data, value_input_option="RAW"):
+        """
+        Write several ranges in a single values:batchUpdate request
+        :param data: list of (range_name, values) pairs
+        """
+        return await self._request(
+            "sheets", "sheets.spreadsheets.values.batchUpdate", "POST",
+            self._values_url(spreadsheet_id, action=":batchUpdate"),
+            json={
+                "valueInputOption": value_input_option,
+                "data": [{"range": range_name, "values": values} for range_name, values in data],
+            },
+        )
+
+    async def batch_clear(self, spreadsheet_id, ranges):
+        """Clear several ranges in a single values:batchClear request"""
+        return await self._request(
+            "sheets", "sheets.spreadsheets.values.batchClear", "POST",
+            self._values_url(spreadsheet_id, action=":batchClear"),
+            json={"ranges": list(ranges)},
+        )
+
+    # --- Drive ---
+    async def download_file(self, file_id, dest_path, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        with open(dest_path, "wb") as fh:
+            await self.download_to(file_id, fh, chunk_size)
+        return dest_path
+
+    async def download_to(self, file_id, fh, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        """
+        Download a Drive file's content into a writable binary file object
+        :param chunk_size: bytes fetched per request, a failed chunk resumes at the last received byte
+        """
+        url = f"{DRIVE_URL}/{quote(file_id, safe='')}"
+        received = 0
+        total = None
+        while total is None or received < total:
+            # --- each chunk is one rate limited call, retried by the executor
+            response = await self._send(
+                "drive", "drive.files.get_media", "GET", url,
+                params={"alt": "media"},
+                headers={"Range": f"bytes={received}-{received + chunk_size - 1}"},
+            )
+            fh.write(response.content)
+            received += len(response.content)
+            match = _CONTENT_RANGE_TOTAL.search(response.headers.get("content-range", ""))
+            if response.status_code != 206 or match is None or not response.content:
+                # The whole file came back in one response
+                break
+            total = int(match.group(1))
+        return fh
+
+    async def download_to_spool(self, file_id, chunk_size=DOWNLOAD_CHUNK_SIZE, max_memory=DOWNLOAD_SPOOL_MAX_MEMORY):
+        """
+        Download a Drive file into a SpooledTemporaryFile, which moves to disk past max_memory
+        :return: the spooled file, positioned at the start. Caller closes it.
+        """
+        fh = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        try:
+            await self.download_to(file_id, fh, chunk_size)
+        except BaseException:
+            fh.close()
+            raise
+        fh.seek(0)
+        return fh
+
+    async def get_file_name(self, file_id):
+        file = await self._request(
+            "drive", "drive.files.get", "GET", f"{DRIVE_URL}/{quote(file_id, safe='')}",
+            params={"fields": "name"},
+        )
+        return file.get("name")
+
+    async def list_latest_files_in_folder(self, folder_id, query=None):
+        result = {
+            "is_success": False,
+            "err_msg": "",
+            "files": []  # array of {id, name, mimeType, modifiedTime, md5Checksum}
+        }
+
+        try:
+            # Always constrain search to the folder
+            formatted_query = f"'{folder_id}' in parents"
+            if query:
+                formatted_query += f" and ({query})"
+
+            response = await self._request(
+                "drive", "drive.files.list", "GET", DRIVE_URL,
+                params={
+                    "q": formatted_query,
+                    "fields": "files(id, name, mimeType, modifiedTime, md5Checksum)",
+                    "orderBy": "modifiedTime desc",
+                },
+            )
+
+            # Keep only the latest per name, first occurrence = newest due to orderBy
+            latest_by_name = {}
+            for f in response.get("files", []):
+                latest_by_name.setdefault(f["name"], f)
+
+            result["files"] = list(latest_by_name.values())
+            result["is_success"] = True
+
+        except Exception as e:
+            result["err_msg"] = f"Error listing files in folder: {e}"
+
+        return result
+
+    async def read_xlsx_file(self, file_id, sheet_name_list=None, file_name=None, parser=None):
+        """
+        Download an Excel file from Google Drive and parse sheets into dict, parsing runs in a worker thread
+        :return: dict with keys {is_success, err_msg, file_name, file_content}, as GoogleService.read_xlsx_file
+        """
+        result = {
+            "is_success": False,
+            "err_msg": "",
+            "file_name": "",
+            "file_content": None  # {Sheet1: [[...], ...]}
+        }
+
+        try:
+            # --- Get file metadata (name) unless the caller already has it
+            if file_name is None:
+                file_name = await self.get_file_name(file_id)
+            result["file_name"] = file_name
+
+            # --- Download file content, spooled to disk when large
+            fh = await self.download_to_spool(file_id)
+            with fh:
+                result["file_content"] = await asyncio.to_thread(parser or read_workbook_sheets, fh, sheet_name_list)
+            result["is_success"] = True
+
+        except Exception as e:
+            result["err_msg"] = f"Error reading XLSX file from Google Drive: {e}"
+
+        return result
+
+
+class ThreadedAsyncService:
+    """
+    AsyncGoogleService surface over a blocking service (e.g. LocalGoogleService),
+    each call runs in a worker thread
+    """
+
+    METHODS = (
+        "read_sheet", "append_sheet", "write_sheet", "clear_range",
+        "batch_get", "batch_update", "batch_clear",
+        "download_file", "download_to", "download_to_spool", "get_file_name",
+        "list_latest_files_in_folder", "read_xlsx_file",
+    )
+
+    def __init__(self, service):
+        self.service = service
+        self.executor = service.executor
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        pass
+
+    def __getattr__(self, name):
+        if name not in self.METHODS:
+            raise AttributeError(name)
+        method = getattr(self.service, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
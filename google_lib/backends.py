@@ -0,0 +1,68 @@
+import threading
+from .async_service import AsyncGoogleService, ThreadedAsyncService
+from .google_service import GoogleService
+from .local_service import LocalGoogleService
+
+
+def create_google_service(backend="google", local_root=None, local_latency=0.0):
+    """
+    GoogleService for the configured backend
+    :param backend: "google" for the real APIs, "local" for LocalGoogleService under local_root
+    :param local_latency: seconds added to every local call
+    """
+    if backend == "google":
+        return GoogleService()
+    if backend == "local":
+        if not local_root:
+            raise ValueError("The local Google backend needs a root folder")
+        return LocalGoogleService(local_root, latency=local_latency)
+    raise ValueError(f"Unknown Google backend: {backend}")
+
+
+def create_async_google_service(service, max_concurrency=None):
+    """
+    Async counterpart of a service made by create_google_service, sharing its credentials,
+    rate limits and metrics observer. Create it inside the event loop that uses it.
+    :param service: GoogleService, LocalGoogleService or LazyGoogleService
+    """
+    if isinstance(service, LazyGoogleService):
+        service = service.get()
+    if isinstance(service, LocalGoogleService):
+        return ThreadedAsyncService(service)
+    return AsyncGoogleService(service.creds, executor=service.executor, max_concurrency=max_concurrency)
+
+
+class LazyGoogleService:
+    """
+    Stand-in that builds the service on first use.
+
+    Importing the app then needs neither credentials nor the client
+    libraries, and each attribute access is forwarded to the built service.
+    on_create(service) runs once, right after the service is built.
+    """
+
+    def __init__(self, factory, on_create=None):
+        self._factory = factory
+        self._on_create = on_create
+        self._service = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The built service, created on the first call"""
+        service = self._service
+        if service is None:
+            with self._lock:
+                if self._service is None:
+                    service = self._factory()
+                    if self._on_create is not None:
+                        self._on_create(service)
+                    self._service = service
+                service = self._service
+        return service
+
+    @property
+    def created(self):
+        return self._service is not None
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
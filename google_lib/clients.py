@@ -0,0 +1,112 @@
+import os
+import threading
+
+
+class ClientPool:
+    """
+    Builds each Google API client once per thread and reuses it.
+
+    googleapiclient service objects (and the httplib2 connection under them)
+    are not thread-safe, so every thread gets its own authorized HTTP
+    connection and its own built services. Discovery documents are loaded
+    once per process and token refresh is serialized behind one lock. The
+    client libraries themselves are only imported on first use.
+    """
+
+    def __init__(self, creds, http_factory=None, timeout=60):
+        self.creds = creds
+        self.timeout = timeout
+        # http_factory returns the raw transport, it is always wrapped with auth
+        self._http_factory = http_factory or self._default_http
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._discovery_docs = {}
+        self.build_count = 0
+
+    def get(self, api, version, *resource_path):
+        """
+        Return the calling thread's client for api/version, building it on first use
+        :param resource_path: optional sub-resources, e.g. ("spreadsheets", "values")
+        :return: the built service, or the cached sub-resource at resource_path
+        """
+        self._reset_after_fork()
+        self.ensure_valid_token()
+
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+
+        key = (api, version) + resource_path
+        client = clients.get(key)
+        if client is not None:
+            return client
+
+        if resource_path:
+            # Creating a resource generates its method docstrings, which is
+            # as costly as the request itself, so the resource is cached too
+            client = getattr(self.get(api, version, *resource_path[:-1]), resource_path[-1])()
+        else:
+            from googleapiclient.discovery import build_from_document
+
+            client = build_from_document(
+                self._discovery_doc(api, version),
+                http=self._thread_http(),
+            )
+            with self._lock:
+                self.build_count += 1
+        clients[key] = client
+        return client
+
+    def preload(self, *apis):
+        """
+        Load the discovery documents of apis, e.g. ("sheets", "v4"), ahead of the first request.
+        Called before workers fork, the documents and client modules are shared with every worker.
+        """
+        import googleapiclient.discovery  # noqa: F401
+        import google_auth_httplib2  # noqa: F401
+
+        for api, version in apis:
+            self._discovery_doc(api, version)
+
+    def ensure_valid_token(self):
+        """Refresh the shared credentials once, instead of once per thread"""
+        if getattr(self.creds, "valid", True):
+            return
+        import google_auth_httplib2
+
+        with self._lock:
+            if not self.creds.valid:
+                self.creds.refresh(google_auth_httplib2.Request(self._http_factory()))
+
+    def _thread_http(self):
+        # --- one keep-alive connection per thread, shared by Sheets and Drive
+        http = getattr(self._local, "http", None)
+        if http is None:
+            import google_auth_httplib2
+
+            http = google_auth_httplib2.AuthorizedHttp(self.creds, http=self._http_factory())
+            self._local.http = http
+        return http
+
+    def _discovery_doc(self, api, version):
+        doc = self._discovery_docs.get((api, version))
+        if doc is None:
+            from googleapiclient.discovery_cache import get_static_doc
+
+            doc = get_static_doc(api, version)
+            if doc is None:
+                raise ValueError(f"No bundled discovery document for {api} {version}")
+            self._discovery_docs[(api, version)] = doc
+        return doc
+
+    def _default_http(self):
+        import httplib2
+
+        return httplib2.Http(timeout=self.timeout)
+
+    def _reset_after_fork(self):
+        # Connections inherited from a parent process must not be reused
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
@@ -1,9 +1,8 @@
 import os
 import io
-from openpyxl import load_workbook
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
+import tempfile
+from .clients import ClientPool
+from .request_executor import RequestExecutor
 
 
 SCOPES = [
@@ -20,91 +19,171 @@ CREDENTIALS_DIR = os.path.join(BASE_DIR, "credentials")
 # Paths
 CREDENTIALS_FILE_PATH = os.path.join(CREDENTIALS_DIR, "google_credentials.json")
 
+# Drive media downloads: bytes per request, and how much stays in memory before spooling to disk
+DOWNLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+DOWNLOAD_SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+# Requests per second and burst per API. Sheets allows 60 requests per minute
+# per user (the service account), Drive far more
+API_RATES = {
+    "sheets": (float(os.getenv("SHEETS_REQUESTS_PER_SECOND", "1")), float(os.getenv("SHEETS_REQUESTS_BURST", "10"))),
+    "drive": (float(os.getenv("DRIVE_REQUESTS_PER_SECOND", "20")), float(os.getenv("DRIVE_REQUESTS_BURST", "40"))),
+}
+# Seconds one API call may take, retries and rate limit waits included
+API_CALL_DEADLINE = float(os.getenv("API_CALL_DEADLINE", "120"))
+# Longest backoff between two attempts, and seconds one HTTP request may take
+API_MAX_BACKOFF = float(os.getenv("API_MAX_BACKOFF", "32"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+# Upper bound on one call: waits never pass the deadline, but the last attempt
+# may start just before it and run for HTTP_TIMEOUT
+API_CALL_MAX_SECONDS = API_CALL_DEADLINE + API_MAX_BACKOFF + HTTP_TIMEOUT
+
 
 class GoogleService:
-    def __init__(self):
+    def __init__(self, creds=None, http_factory=None, executor=None):
         # Build credentials from the service account file
-        creds = service_account.Credentials.from_service_account_file(
-            CREDENTIALS_FILE_PATH,
-            scopes=SCOPES
-        )
+        if creds is None:
+            from google.oauth2 import service_account
+
+            creds = service_account.Credentials.from_service_account_file(
+                CREDENTIALS_FILE_PATH,
+                scopes=SCOPES
+            )
 
         self.creds = creds
+        # Sheets/Drive clients are built once per thread and reused
+        self.clients = ClientPool(creds, http_factory=http_factory, timeout=HTTP_TIMEOUT)
+        # Rate limits, retries and deadlines for every request
+        self.executor = executor or RequestExecutor(API_RATES, max_delay=API_MAX_BACKOFF, deadline=API_CALL_DEADLINE)
+
+    def _sheet_values(self):
+        return self.clients.get("sheets", "v4", "spreadsheets", "values")
+
+    def _drive_files(self):
+        return self.clients.get("drive", "v3", "files")
+
+    def _execute(self, api, request, idempotent=True):
+        return self.executor.execute(api, request, idempotent=idempotent)
 
     # --- Sheets ---
     def read_sheet(self, spreadsheet_id, range_name):
-        service = build("sheets", "v4", credentials=self.creds)
-        result = service.spreadsheets().values().get(
+        result = self._execute("sheets", self._sheet_values().get(
             spreadsheetId=spreadsheet_id, range=range_name
-        ).execute()
+        ))
         return result.get("values", [])
 
     def append_sheet(self, spreadsheet_id, range_name, values):
-        service = build("sheets", "v4", credentials=self.creds)
         body = {
             "values": values
         }
-        result = service.spreadsheets().values().append(
+        result = self._execute("sheets", self._sheet_values().append(
             spreadsheetId=spreadsheet_id,
             range=range_name,
             valueInputOption="RAW",   # or "USER_ENTERED"
             insertDataOption="INSERT_ROWS",
             body=body
-        ).execute()
+        ), idempotent=False)
         return result
 
     def write_sheet(self, spreadsheet_id, range_name, values):
-        service = build("sheets", "v4", credentials=self.creds)
         body = {"values": values}
-        return service.spreadsheets().values().update(
+        return self._execute("sheets", self._sheet_values().update(
             spreadsheetId=spreadsheet_id,
             range=range_name,
             valueInputOption="RAW",
             body=body
-        ).execute()
+        ))
 
     def clear_range(self, spreadsheet_id, range_name):
-        """Clear values in a given range of Google Sheet"""
-        try:
-            service = build("sheets", "v4", credentials=self.creds)
-            request = service.spreadsheets().values().clear(
-                spreadsheetId=spreadsheet_id,
-                range=range_name,
-                body={}
-            )
-            response = request.execute()
-            return response
-        except Exception as e:
-            print(f"❌ Error clearing range: {e}")
-            return None
+        """Clear values in a given range of Google Sheet, raises like the other Sheets calls"""
+        return self._execute("sheets", self._sheet_values().clear(
+            spreadsheetId=spreadsheet_id,
+            range=range_name,
+            body={}
+        ))
+
+    def batch_get(self, spreadsheet_id, ranges):
+        """
+        Read several ranges in a single values:batchGet request
+        :return: list of row lists, one per range, in the order requested
+        """
+        result = self._execute("sheets", self._sheet_values().batchGet(
+            spreadsheetId=spreadsheet_id, ranges=list(ranges)
+        ))
+        return [value_range.get("values", []) for value_range in result.get("valueRanges", [])]
+
+    def batch_update(self, spreadsheet_id, data, value_input_option="RAW"):
+        """
+        Write several ranges in a single values:batchUpdate request
+        :param data: list of (range_name, values) pairs
+        """
+        body = {
+            "valueInputOption": value_input_option,
+            "data": [{"range": range_name, "values": values} for range_name, values in data],
+        }
+        return self._execute("sheets", self._sheet_values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body=body
+        ))
+
+    def batch_clear(self, spreadsheet_id, ranges):
+        """Clear several ranges in a single values:batchClear request"""
+        return self._execute("sheets", self._sheet_values().batchClear(
+            spreadsheetId=spreadsheet_id,
+            body={"ranges": list(ranges)}
+        ))
 
     # --- Drive ---
-    def download_file(self, file_id, dest_path):
-        service = build("drive", "v3", credentials=self.creds)
-        request = service.files().get_media(fileId=file_id)
+    def download_file(self, file_id, dest_path, chunk_size=DOWNLOAD_CHUNK_SIZE):
         with io.FileIO(dest_path, "wb") as fh:
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                print(f"Download {int(status.progress() * 100)}%.")
+            self.download_to(file_id, fh, chunk_size)
         return dest_path
 
+    def download_to(self, file_id, fh, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        """
+        Download a Drive file's content into a writable binary file object
+        :param chunk_size: bytes fetched per request, a failed chunk resumes at the last received byte
+        """
+        from googleapiclient.http import MediaIoBaseDownload
+
+        request = self._drive_files().get_media(fileId=file_id)
+        downloader = MediaIoBaseDownload(fh, request, chunksize=chunk_size)
+        done = False
+        while not done:
+            # --- each chunk is one rate limited call, retried by the executor
+            status, done = self.executor.call(
+                "drive", lambda: downloader.next_chunk(num_retries=0), method="drive.files.get_media"
+            )
+        return fh
+
+    def download_to_spool(self, file_id, chunk_size=DOWNLOAD_CHUNK_SIZE, max_memory=DOWNLOAD_SPOOL_MAX_MEMORY):
+        """
+        Download a Drive file into a SpooledTemporaryFile, which moves to disk past max_memory
+        :return: the spooled file, positioned at the start. Caller closes it.
+        """
+        fh = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        try:
+            self.download_to(file_id, fh, chunk_size)
+        except Exception:
+            fh.close()
+            raise
+        fh.seek(0)
+        return fh
+
     def get_file_name(self, file_id):
-        service = build("drive", "v3", credentials=self.creds)
-        file = service.files().get(fileId=file_id, fields="name").execute()
+        file = self._execute("drive", self._drive_files().get(fileId=file_id, fields="name"))
         return file.get("name")
 
     def upload_file(self, file_path, mime_type="application/octet-stream", parent_folder_id=None):
-        service = build("drive", "v3", credentials=self.creds)
         metadata = {"name": os.path.basename(file_path)}
         if parent_folder_id:
             metadata["parents"] = [parent_folder_id]
 
+        from googleapiclient.http import MediaFileUpload
+
         media = MediaFileUpload(file_path, mimetype=mime_type, resumable=True)
-        file = service.files().create(
+        file = self._execute("drive", self._drive_files().create(
             body=metadata, media_body=media, fields="id"
-        ).execute()
+        ), idempotent=False)
         return file.get("id")
 
     def list_files_in_folder(self, folder_id, query=None):
@@ -115,16 +194,15 @@ class GoogleService:
         }
 
         try:
-            service = build("drive", "v3", credentials=self.creds)
             formatted_query = (
                 f"'{folder_id}' in parents"
             )
             if query:
                 formatted_query += f" and ({query})"
-            response = service.files().list(
+            response = self._execute("drive", self._drive_files().list(
                 q=query,
                 fields="files(id, name, mimeType)"
-            ).execute()
+            ))
 
             result["files"] = response.get("files", [])
             result["is_success"] = True
@@ -138,22 +216,20 @@ class GoogleService:
         result = {
             "is_success": False,
             "err_msg": "",
-            "files": []  # array of {id, name, mimeType, modifiedTime}
+            "files": []  # array of {id, name, mimeType, modifiedTime, md5Checksum}
         }
 
         try:
-            service = build("drive", "v3", credentials=self.creds)
-
             # Always constrain search to the folder
             formatted_query = f"'{folder_id}' in parents"
             if query:
                 formatted_query += f" and ({query})"
 
-            response = service.files().list(
+            response = self._execute("drive", self._drive_files().list(
                 q=formatted_query,
-                fields="files(id, name, mimeType, modifiedTime)",
+                fields="files(id, name, mimeType, modifiedTime, md5Checksum)",
                 orderBy="modifiedTime desc"
-            ).execute()
+            ))
 
             files = response.get("files", [])
 
@@ -172,11 +248,14 @@ class GoogleService:
 
         return result
 
-    def read_xlsx_file(self, file_id, sheet_name_list=None):
+    def read_xlsx_file(self, file_id, sheet_name_list=None, file_name=None, parser=None):
         """
         Download an Excel file from Google Drive and parse sheets into dict
         :param file_id: Google Drive file ID
         :param sheet_name_list: list of sheet names to read (default = all)
+        :param file_name: name already known from a listing, skips the metadata request
+        :param parser: parser(fh, sheet_name_list) -> {sheet_name: rows}, default read_workbook_sheets;
+                       e.g. a read-only parser that skips the other sheets
         :return: dict with keys {is_success, err_msg, file_name, file_content}
         """
         result = {
@@ -187,46 +266,39 @@ class GoogleService:
         }
 
         try:
-            # --- Get file metadata (name)
-            service = build("drive", "v3", credentials=self.creds)
-            metadata = service.files().get(fileId=file_id, fields="name").execute()
-            result["file_name"] = metadata["name"]
-
-            # --- Download file content into memory
-            request = service.files().get_media(fileId=file_id)
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-
-            fh.seek(0)
-
-            # --- Load workbook from memory
-            wb = load_workbook(filename=fh, data_only=True)
-
-            # --- Extract sheets
-            sheets_data = {}
-            if sheet_name_list:
-                for sheet_name in sheet_name_list:
-                    if sheet_name in wb.sheetnames:
-                        ws = wb[sheet_name]
-                        sheets_data[sheet_name] = [
-                            list(row)  # row is already a tuple of values
-                            for row in ws.iter_rows(values_only=True)
-                        ]
-            else:
-                for sheet_name in wb.sheetnames:
-                    ws = wb[sheet_name]
-                    sheets_data[sheet_name] = [
-                        list(row)  # row is already a tuple of values
-                        for row in ws.iter_rows(values_only=True)
-                    ]
-
-            result["file_content"] = sheets_data
+            # --- Get file metadata (name) unless the caller already has it
+            if file_name is None:
+                file_name = self.get_file_name(file_id)
+            result["file_name"] = file_name
+
+            # --- Download file content, spooled to disk when large
+            fh = self.download_to_spool(file_id)
+            with fh:
+                result["file_content"] = (parser or read_workbook_sheets)(fh, sheet_name_list)
             result["is_success"] = True
 
         except Exception as e:
             result["err_msg"] = f"Error reading XLSX file from Google Drive: {e}"
 
         return result
+
+
+def read_workbook_sheets(fh, sheet_name_list=None):
+    """
+    Load a whole workbook with openpyxl and return its sheets as {sheet_name: rows}
+    :param sheet_name_list: sheets to return (default = all)
+    """
+    # --- Load workbook
+    from openpyxl import load_workbook
+
+    wb = load_workbook(filename=fh, data_only=True)
+
+    # --- Extract sheets
+    if sheet_name_list:
+        sheet_names = [sheet_name for sheet_name in sheet_name_list if sheet_name in wb.sheetnames]
+    else:
+        sheet_names = wb.sheetnames
+    return {
+        sheet_name: [list(row) for row in wb[sheet_name].iter_rows(values_only=True)]
+        for sheet_name in sheet_names
+    }
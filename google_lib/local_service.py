@@ -0,0 +1,238 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import datetime
+import threading
+from .google_service import GoogleService
+from .request_executor import RequestExecutor
+
+# Drive mime types the app queries for, by file extension
+MIME_TYPES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".xlsm": "application/vnd.ms-excel.sheet.macroEnabled.12",
+}
+_A1_RE = re.compile(r"^([A-Z]*)(\d*)$")
+_MIME_QUERY_RE = re.compile(r"mimeType\s*=\s*'([^']+)'")
+
+
+class LocalGoogleService(GoogleService):
+    """
+    GoogleService backend that keeps Sheets in memory and Drive on the local filesystem.
+
+    Drive folder ids are directory names under root/drive and file ids are
+    "<folder_id>/<file name>". Spreadsheets start from root/sheets/<id>.json
+    ({sheet_name: rows}) when present and then live in memory. Every call
+    still goes through the RequestExecutor, so rate limits, metrics and an
+    optional simulated latency apply like they do against Google.
+    """
+
+    def __init__(self, root, executor=None, latency=0.0):
+        """
+        :param root: folder holding drive/ and sheets/
+        :param latency: seconds added to every call, to mimic network round trips
+        """
+        self.root = root
+        self.latency = latency
+        self.creds = None
+        self.clients = None
+        self.executor = executor or RequestExecutor()
+        self._lock = threading.Lock()
+        self._spreadsheets = {}
+        self.request_count = 0
+
+    # --- Sheets ---
+    def read_sheet(self, spreadsheet_id, range_name):
+        return self._call("sheets", "values.get", lambda: self._get_range(spreadsheet_id, range_name))
+
+    def append_sheet(self, spreadsheet_id, range_name, values):
+        def append():
+            sheet_name, _, _, _ = _parse_range(range_name)
+            with self._lock:
+                rows = self._sheet(spreadsheet_id, sheet_name)
+                while rows and not any(val not in ("", None) for val in rows[-1]):
+                    rows.pop()
+                rows.extend(list(row) for row in values)
+            return {"updates": {"updatedRows": len(values)}}
+        return self._call("sheets", "values.append", append, idempotent=False)
+
+    def write_sheet(self, spreadsheet_id, range_name, values):
+        return self._call("sheets", "values.update", lambda: self._put_range(spreadsheet_id, range_name, values))
+
+    def clear_range(self, spreadsheet_id, range_name):
+        return self._call("sheets", "values.clear", lambda: self._clear_range(spreadsheet_id, range_name))
+
+    def batch_get(self, spreadsheet_id, ranges):
+        return self._call(
+            "sheets", "values.batchGet", lambda: [self._get_range(spreadsheet_id, r) for r in ranges]
+        )
+
+    def batch_update(self, spreadsheet_id, data, value_input_option="RAW"):
+        def update():
+            return {"responses": [self._put_range(spreadsheet_id, r, values) for r, values in data]}
+        return self._call("sheets", "values.batchUpdate", update)
+
+    def batch_clear(self, spreadsheet_id, ranges):
+        def clear():
+            return {"clearedRanges": [self._clear_range(spreadsheet_id, r)["clearedRange"] for r in ranges]}
+        return self._call("sheets", "values.batchClear", clear)
+
+    def get_values(self, spreadsheet_id, sheet_name):
+        """Copy of a whole sheet, for inspecting what the app wrote"""
+        with self._lock:
+            return [list(row) for row in self._sheet(spreadsheet_id, sheet_name)]
+
+    # --- Drive ---
+    def download_to(self, file_id, fh, chunk_size=None):
+        def download():
+            with open(self._file_path(file_id), "rb") as src:
+                shutil.copyfileobj(src, fh, chunk_size or 1024 * 1024)
+            return fh
+        return self._call("drive", "files.get_media", download)
+
+    def get_file_name(self, file_id):
+        return self._call("drive", "files.get", lambda: os.path.basename(self._file_path(file_id)))
+
+    def upload_file(self, file_path, mime_type="application/octet-stream", parent_folder_id=None):
+        def upload():
+            folder = os.path.join(self.root, "drive", parent_folder_id or "root")
+            os.makedirs(folder, exist_ok=True)
+            shutil.copyfile(file_path, os.path.join(folder, os.path.basename(file_path)))
+            return f"{parent_folder_id or 'root'}/{os.path.basename(file_path)}"
+        return self._call("drive", "files.create", upload, idempotent=False)
+
+    def list_files_in_folder(self, folder_id, query=None):
+        result = self.list_latest_files_in_folder(folder_id, query)
+        for f in result["files"]:
+            for key in ("modifiedTime", "md5Checksum"):
+                f.pop(key, None)
+        return result
+
+    def list_latest_files_in_folder(self, folder_id, query=None):
+        result = {"is_success": False, "err_msg": "", "files": []}
+        try:
+            result["files"] = self._call("drive", "files.list", lambda: self._list_folder(folder_id, query))
+            result["is_success"] = True
+        except Exception as e:
+            result["err_msg"] = f"Error listing files in folder: {e}"
+        return result
+
+    # --- internals ---
+    def _call(self, api, method, fn, idempotent=True):
+        def timed():
+            with self._lock:
+                self.request_count += 1
+            if self.latency:
+                time.sleep(self.latency)
+            return fn()
+        return self.executor.call(api, timed, method=f"{api}.{method}", idempotent=idempotent)
+
+    def _sheet(self, spreadsheet_id, sheet_name):
+        # Caller holds self._lock
+        spreadsheet = self._spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            spreadsheet = {}
+            seed_path = os.path.join(self.root, "sheets", f"{spreadsheet_id}.json")
+            if os.path.exists(seed_path):
+                with open(seed_path, "r", encoding="utf-8") as fh:
+                    spreadsheet = json.load(fh)
+            self._spreadsheets[spreadsheet_id] = spreadsheet
+        return spreadsheet.setdefault(sheet_name, [])
+
+    def _get_range(self, spreadsheet_id, range_name):
+        sheet_name, row_start, col_start, col_end = _parse_range(range_name)
+        with self._lock:
+            rows = [
+                list(row[col_start:col_end])
+                for row in self._sheet(spreadsheet_id, sheet_name)[row_start:]
+            ]
+        # --- Sheets drops trailing empty cells and rows
+        for row in rows:
+            while row and row[-1] in ("", None):
+                row.pop()
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def _put_range(self, spreadsheet_id, range_name, values):
+        sheet_name, row_start, col_start, _ = _parse_range(range_name)
+        with self._lock:
+            rows = self._sheet(spreadsheet_id, sheet_name)
+            for offset, row_values in enumerate(values):
+                while len(rows) <= row_start + offset:
+                    rows.append([])
+                target = rows[row_start + offset]
+                if len(target) < col_start + len(row_values):
+                    target.extend([""] * (col_start + len(row_values) - len(target)))
+                for col, val in enumerate(row_values):
+                    if val is not None:
+                        target[col_start + col] = val
+        return {"updatedRange": range_name, "updatedRows": len(values)}
+
+    def _clear_range(self, spreadsheet_id, range_name):
+        sheet_name, row_start, col_start, col_end = _parse_range(range_name)
+        with self._lock:
+            for row in self._sheet(spreadsheet_id, sheet_name)[row_start:]:
+                for col in range(col_start, min(len(row), col_end if col_end is not None else len(row))):
+                    row[col] = ""
+        return {"clearedRange": range_name}
+
+    def _file_path(self, file_id):
+        path = os.path.normpath(os.path.join(self.root, "drive", file_id))
+        if not path.startswith(os.path.join(os.path.normpath(self.root), "drive") + os.sep) or not os.path.isfile(path):
+            raise FileNotFoundError(f"File not found: {file_id}")
+        return path
+
+    def _list_folder(self, folder_id, query):
+        folder = os.path.join(self.root, "drive", folder_id)
+        mime_types = set(_MIME_QUERY_RE.findall(query or ""))
+        files = []
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            mime_type = MIME_TYPES.get(os.path.splitext(name)[1].lower(), "application/octet-stream")
+            if not os.path.isfile(path) or (mime_types and mime_type not in mime_types):
+                continue
+            stat = os.stat(path)
+            files.append({
+                "id": f"{folder_id}/{name}",
+                "name": name,
+                "mimeType": mime_type,
+                "modifiedTime": datetime.datetime.fromtimestamp(stat.st_mtime, datetime.timezone.utc).isoformat(),
+                "md5Checksum": _md5(path),
+            })
+        return files
+
+
+def _parse_range(range_name):
+    """
+    Split an A1 range like "'Fillings'!A2:G" into (sheet, first row index, first col index, end col index)
+    A missing end column is None (open ended), a sheet name alone covers the whole sheet.
+    """
+    sheet_name, _, cells = range_name.partition("!")
+    sheet_name = sheet_name.strip("'")
+    start, _, end = (cells or "A1").partition(":")
+    start_col, start_row = _A1_RE.match(start).groups()
+    end_col = _A1_RE.match(end).group(1) if end else ""
+    return (
+        sheet_name,
+        int(start_row or 1) - 1,
+        _column_index(start_col or "A"),
+        _column_index(end_col) + 1 if end_col else None,
+    )
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _md5(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
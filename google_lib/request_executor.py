@@ -0,0 +1,303 @@
+import ssl
+import sys
+import socket
+import time
+import asyncio
+import random
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Responses worth another attempt: quota (429, some 403s) and server side errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = (b"ratelimitexceeded", b"userratelimitexceeded", b"quotaexceeded")
+TRANSIENT_ERRORS = (TimeoutError, ConnectionError, ssl.SSLError)
+# Failures before the request left this host: no connection or no address, safe to send again
+NOT_SENT_ERRORS = (ConnectionRefusedError, socket.gaierror)
+
+
+class DeadlineExceeded(Exception):
+    """The call, including waiting for rate limit tokens and backoff, ran past its deadline"""
+
+
+class ApiError(Exception):
+    """Error response of a Google API call made without googleapiclient, e.g. by AsyncGoogleService"""
+
+    def __init__(self, status, content=b"", headers=None, uri=""):
+        super().__init__(f"<ApiError {status} when requesting {uri} returned {content[:300]!r}>")
+        self.status = status
+        self.content = content
+        self.headers = headers or {}
+        self.uri = uri
+
+
+class TokenBucket:
+    """
+    Requests-per-second limiter with a burst capacity.
+
+    A quota response halves the rate (down to min_rate). Every success
+    raises it again by a twentieth of the configured rate, so throughput
+    adapts to what the API accepts instead of a fixed sleep.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=None, clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 16
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """Take one token, waiting for it unless that would pass deadline (a clock() value)"""
+        wait = self.reserve(deadline)
+        if wait:
+            self._sleep(wait)
+
+    def reserve(self, deadline=None):
+        """
+        Take one token without waiting for it
+        :return: seconds the caller must wait before using the token
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # --- reserve the token now, so concurrent callers queue up behind each other
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if deadline is not None and now + wait > deadline:
+                self._tokens += 1
+                raise DeadlineExceeded(f"rate limit wait of {wait:.2f}s passes the deadline")
+        return wait
+
+    def penalize(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class RequestExecutor:
+    """
+    Single path for every Google API call GoogleService makes.
+
+    Each call takes a token from its API's bucket, and quota or transient
+    errors are retried with capped exponential backoff and full jitter
+    (Retry-After is honoured when sent). Non-idempotent calls (e.g.
+    values.append) are only retried when the request was certainly not
+    applied: quota rejections and failures to connect, never timeouts or 5xx. The whole call, waits included,
+    must finish within its deadline. clock, sleep and rng are injectable
+    so the policy can be exercised against a fake transport without waiting.
+    observer, when set, is called as observer(api, method, seconds, outcome)
+    after every call.
+    """
+
+    def __init__(self, rates=None, max_retries=5, base_delay=0.5, max_delay=32.0, deadline=120.0,
+                 clock=time.monotonic, sleep=time.sleep, rng=None):
+        """
+        :param rates: {api: (requests per second, burst)}; APIs not listed are not limited
+        :param deadline: default seconds per call, None for no deadline
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self.buckets = {
+            api: TokenBucket(rate, capacity, clock=clock, sleep=sleep)
+            for api, (rate, capacity) in (rates or {}).items()
+        }
+        self.observer = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def execute(self, api, request, deadline=None, idempotent=True):
+        """Run a googleapiclient HttpRequest, retries are handled here instead of by the client"""
+        method = getattr(request, "methodId", None)
+        return self.call(api, lambda: request.execute(num_retries=0), deadline, method, idempotent)
+
+    def call(self, api, fn, deadline=None, method=None, idempotent=True):
+        """
+        Run fn() with rate limiting and retries
+        :param api: bucket name, e.g. "sheets" or "drive"
+        :param deadline: seconds for this call, defaults to the executor's deadline
+        :param method: name reported to the observer, defaults to api
+        :param idempotent: False when sending the request twice could apply it twice
+        """
+        if self.observer is None:
+            return self._call(api, fn, deadline, idempotent)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = self._call(api, fn, deadline, idempotent)
+            outcome = "ok"
+            return result
+        except DeadlineExceeded:
+            outcome = "deadline"
+            raise
+        finally:
+            self.observer(api, method or api, time.perf_counter() - start, outcome)
+
+    async def acall(self, api, fn, deadline=None, method=None, idempotent=True):
+        """
+        call() for coroutines: await fn() with the same rate limits, retries and deadline,
+        waiting with asyncio.sleep so the event loop keeps running
+        """
+        if self.observer is None:
+            return await self._acall(api, fn, deadline, idempotent)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await self._acall(api, fn, deadline, idempotent)
+            outcome = "ok"
+            return result
+        except DeadlineExceeded:
+            outcome = "deadline"
+            raise
+        finally:
+            self.observer(api, method or api, time.perf_counter() - start, outcome)
+
+    def _call(self, api, fn, deadline, idempotent):
+        deadline_at, bucket = self._start(api, deadline)
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire(deadline_at)
+            try:
+                result = fn()
+            except Exception as e:
+                attempt += 1
+                self._sleep(self._retry_delay(api, bucket, e, attempt, deadline_at, idempotent))
+                continue
+            if bucket is not None:
+                bucket.reward()
+            return result
+
+    async def _acall(self, api, fn, deadline, idempotent):
+        deadline_at, bucket = self._start(api, deadline)
+        attempt = 0
+        while True:
+            if bucket is not None:
+                wait = bucket.reserve(deadline_at)
+                if wait:
+                    await asyncio.sleep(wait)
+            try:
+                result = await fn()
+            except Exception as e:
+                attempt += 1
+                await asyncio.sleep(self._retry_delay(api, bucket, e, attempt, deadline_at, idempotent))
+                continue
+            if bucket is not None:
+                bucket.reward()
+            return result
+
+    def _start(self, api, deadline):
+        deadline = self.deadline if deadline is None else deadline
+        with self._lock:
+            self.calls += 1
+        return (self._clock() + deadline if deadline is not None else None), self.buckets.get(api)
+
+    def _retry_delay(self, api, bucket, error, attempt, deadline_at, idempotent=True):
+        """Seconds to wait before retry attempt, raises when error is final"""
+        if not (is_transient(error) if idempotent else is_not_applied(error)):
+            self._count_failure()
+            raise error
+        if bucket is not None and _is_http_error(error) and is_rate_limited(error):
+            bucket.penalize()
+        if attempt > self.max_retries:
+            self._count_failure()
+            raise error
+        retry_after = _retry_after(error)
+        delay = retry_after if retry_after is not None else self.backoff(attempt)
+        if deadline_at is not None and self._clock() + delay > deadline_at:
+            self._count_failure()
+            raise DeadlineExceeded(f"{api} call gave up after {attempt} attempts: {error}") from error
+        logger.info(f"{api} call failed ({error}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+        with self._lock:
+            self.retries += 1
+        return delay
+
+    def backoff(self, attempt):
+        """Full jitter: uniform between 0 and the capped exponential delay"""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rates": {api: round(bucket.rate, 3) for api, bucket in self.buckets.items()},
+            }
+
+    def _count_failure(self):
+        with self._lock:
+            self.failures += 1
+
+
+def is_transient(error):
+    """Quota and server side HTTP errors, timeouts and connection failures"""
+    if _is_http_error(error):
+        return is_retryable(error)
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    # Checked through sys.modules so the executor never imports httplib2 itself
+    httplib2 = sys.modules.get("httplib2")
+    return httplib2 is not None and isinstance(error, httplib2.HttpLib2Error)
+
+
+def is_not_applied(error):
+    """Errors after which the server certainly did not apply the request: quota rejections, failures to connect"""
+    if _is_http_error(error):
+        return is_rate_limited(error)
+    if isinstance(error, NOT_SENT_ERRORS):
+        return True
+    httplib2 = sys.modules.get("httplib2")
+    return httplib2 is not None and isinstance(error, httplib2.ServerNotFoundError)
+
+
+def is_retryable(error):
+    status = _status(error)
+    return status in RETRY_STATUSES or (status == 403 and is_rate_limited(error))
+
+
+def is_rate_limited(error):
+    status = _status(error)
+    if status == 429:
+        return True
+    content = (error.content or b"").lower()
+    return status == 403 and any(reason in content for reason in RATE_LIMIT_REASONS)
+
+
+def _is_http_error(error):
+    """googleapiclient HttpError or ApiError"""
+    if isinstance(error, ApiError):
+        return True
+    errors = sys.modules.get("googleapiclient.errors")
+    return errors is not None and isinstance(error, errors.HttpError)
+
+
+def _status(error):
+    return error.status if isinstance(error, ApiError) else error.resp.status
+
+
+def _retry_after(error):
+    if not _is_http_error(error):
+        return None
+    headers = error.headers if isinstance(error, ApiError) else error.resp
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,18 @@
+from .audit_log import AuditLog
+from .file_lock import FileLock
+from .jobs import Job, JobQueue, JobQueueFull, WorkerPool
+from .metrics import Metrics
+from .shared_run import SharedRun
+from .zip_stream import stream_zip
+
+__all__ = [
+    "AuditLog",
+    "FileLock",
+    "Job",
+    "JobQueue",
+    "JobQueueFull",
+    "Metrics",
+    "SharedRun",
+    "WorkerPool",
+    "stream_zip",
+]
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """
+    Durable buffer for audit rows, sent in batches by a background thread.
+
+    enqueue() only inserts into a local SQLite file, so the request never
+    waits on the Sheets API. The writer thread sends up to batch_size rows
+    per send(rows) call and deletes them once the call returns. Failed sends
+    the rows certainly were not stored by (retry_if) are retried with
+    exponential backoff and jitter, and rows survive a restart; other failed
+    batches are logged and dropped, since sending them again could store
+    them twice. Rows are claimed before sending, so several worker processes
+    can share one database without sending a row twice.
+    """
+
+    def __init__(self, db_path, send, batch_size=500, flush_interval=2.0,
+                 base_backoff=1.0, max_backoff=300.0, claim_timeout=None, send_timeout=None, retry_if=None):
+        """
+        :param send: callable taking a list of rows, raises when they were not stored
+        :param retry_if: callable(error), True when the failed send certainly stored nothing
+                         (e.g. google_lib's is_not_applied); None retries every failure
+        :param flush_interval: seconds rows are collected before a batch is sent
+        :param send_timeout: longest one send() call can take, retries included
+        :param claim_timeout: seconds after which rows claimed by a dead process are sent again,
+                              must exceed send_timeout; defaults to twice send_timeout (or 600)
+        """
+        if claim_timeout is None:
+            claim_timeout = 2 * send_timeout if send_timeout else 600.0
+        if send_timeout is not None and claim_timeout <= send_timeout:
+            # A batch still being sent would be claimed and sent again by another process
+            raise ValueError(
+                f"Audit log claim_timeout ({claim_timeout}s) must be longer than a send ({send_timeout}s)"
+            )
+        self.db_path = db_path
+        self.send = send
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.claim_timeout = claim_timeout
+        self.retry_if = retry_if
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._schema_ready = False
+        self._failures = 0
+        self.sent = 0
+        self.send_errors = 0
+        self.dropped = 0
+
+    def enqueue(self, row):
+        """Store row for sending and make sure the writer thread runs"""
+        with self._connect() as conn:
+            conn.execute("INSERT INTO audit_rows (row) VALUES (?)", (json.dumps(row, default=str),))
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def enqueue_many(self, rows):
+        """Store several rows in one transaction, they go out together in the next batch"""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO audit_rows (row) VALUES (?)", [(json.dumps(row, default=str),) for row in rows]
+            )
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def flush(self):
+        """
+        Send every stored row now, batch by batch
+        :return: number of rows sent
+        """
+        sent = 0
+        while True:
+            count = self._send_batch()
+            if not count:
+                return sent
+            sent += count
+
+    def pending(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM audit_rows").fetchone()[0]
+
+    def close(self, timeout=10.0):
+        """Stop the writer thread after a last flush, rows that still fail stay stored"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stopping.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        elif self._schema_ready or os.path.exists(self.db_path):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Audit rows left for the next start: {e}")
+
+    def stats(self):
+        return {
+            "pending": self.pending(),
+            "sent": self.sent,
+            "send_errors": self.send_errors,
+            "dropped": self.dropped,
+            "consecutive_failures": self._failures,
+        }
+
+    def _ensure_thread(self):
+        # A forked worker does not inherit the parent's running thread
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            stopping = self._stopping.is_set()
+            if not stopping:
+                # --- collect a burst into one append
+                self._stopping.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                self._failures = 0
+            except Exception as e:
+                self._failures += 1
+                self.send_errors += 1
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (self._failures - 1))
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(f"Sending audit rows failed ({self._failures} in a row), retry in {delay:.1f}s: {e}")
+                if self._stopping.is_set():
+                    return
+                self._stopping.wait(delay)
+                self._wakeup.set()
+                continue
+            if stopping or self._stopping.is_set():
+                return
+
+    def _send_batch(self):
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, row FROM audit_rows WHERE claimed_by IS NULL OR claimed_at < ? ORDER BY id LIMIT ?",
+                (now - self.claim_timeout, self.batch_size),
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE audit_rows SET claimed_by = ?, claimed_at = ? WHERE id = ?",
+                    [(owner, now, row_id) for row_id, _ in rows],
+                )
+        if not rows:
+            return 0
+
+        ids = [(row_id,) for row_id, _ in rows]
+        try:
+            self.send([json.loads(row) for _, row in rows])
+        except BaseException as e:
+            if isinstance(e, Exception) and self.retry_if is not None and not self.retry_if(e):
+                # --- the send may have stored the rows, sending them again could duplicate them
+                with self._connect() as conn:
+                    conn.executemany("DELETE FROM audit_rows WHERE id = ?", ids)
+                self.dropped += len(rows)
+                logger.error(f"Audit rows dropped, the failed send may have stored them ({e}): {[r for _, r in rows]}")
+                raise
+            with self._connect() as conn:
+                conn.executemany("UPDATE audit_rows SET claimed_by = NULL WHERE id = ?", ids)
+            raise
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM audit_rows WHERE id = ?", ids)
+        self.sent += len(rows)
+        return len(rows)
+
+    def _connect(self):
+        # The database is created on first use, not when the app is imported
+        if not self._schema_ready:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS audit_rows ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, row TEXT NOT NULL, "
+                "claimed_by TEXT, claimed_at REAL)"
+            )
+            self._schema_ready = True
+        return _Transaction(conn)
+
+
+class _Transaction:
+    """sqlite3 connection that commits (or rolls back) and closes when the with block ends"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
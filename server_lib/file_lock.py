@@ -0,0 +1,61 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no other worker processes to exclude
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive lock shared by the threads of this process and by every process using the same path.
+
+    Backed by flock on path, so the lock is released by the OS when the
+    holding process dies. Not reentrant.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fh = None
+
+    def acquire(self, blocking=True):
+        """
+        :param blocking: wait for the lock, otherwise return False when it is held
+        :return: True once the lock is held
+        """
+        if not self._lock.acquire(blocking):
+            return False
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fh = open(self.path, "a+b")
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    fh.close()
+                    self._lock.release()
+                    return False
+        except BaseException:
+            self._lock.release()
+            raise
+        self._fh = fh
+        return True
+
+    def release(self):
+        fh = self._fh
+        self._fh = None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            fh.close()
+        finally:
+            self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import time
+import uuid
+import threading
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from excel_lib.template_sync import write_atomic
+
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class JobQueueFull(Exception):
+    """Raised by JobQueue.submit when max_pending jobs are already waiting or running"""
+
+
+class Job:
+    def __init__(self, job_id, key, meta=None):
+        self.id = job_id
+        self.key = key
+        self.meta = meta or {}
+        self.created_at = time.time()
+        self.finished_at = None
+        self.err_msg = ""
+        self._status = "queued"
+        self._future = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        """queued, running, done or failed"""
+        if self._status == "queued" and self._future is not None and self._future.running():
+            return "running"
+        return self._status
+
+    @property
+    def is_finished(self):
+        return self._status in ("done", "failed")
+
+    def add_done_callback(self, fn):
+        """Call fn(job) once the job finishes, right away if it already has"""
+        with self._lock:
+            if not self.is_finished:
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "err_msg": self.err_msg,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "meta": self.meta,
+        }
+
+
+class WorkerPool:
+    """
+    Process (or thread) pool started on first submit and replaced after a worker crash.
+
+    Processes are started with spawn, forking a threaded web server worker is
+    not safe. Each worker process keeps its module level caches (parsed master,
+    dependency sheets) from one task to the next.
+    """
+
+    def __init__(self, max_workers=2, use_processes=True, initializer=None, initargs=()):
+        """
+        :param initializer: called with initargs in each new worker, e.g. to size its caches
+                            like the parent's, since spawned workers only see module defaults
+        """
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """:return: concurrent.futures.Future of fn(*args)"""
+        try:
+            return self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            # A crashed worker breaks the whole pool, start a fresh one
+            self.reset()
+            return self._get_executor().submit(fn, *args)
+
+    def reset(self):
+        """Drop a broken pool, the next submit starts a new one"""
+        with self._lock:
+            self._executor = None
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.use_processes:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                        initializer=self.initializer, initargs=self.initargs,
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, initializer=self.initializer, initargs=self.initargs
+                    )
+            return self._executor
+
+
+class JobQueue:
+    """
+    Bounded pool that runs generation jobs outside the request thread.
+
+    Jobs run in worker processes (openpyxl work is CPU bound). Submitting a
+    key that matches a job still queued or running returns that job instead
+    of starting another one. Once max_pending jobs are unfinished, submit
+    raises JobQueueFull. Job state is also written to state_dir so any
+    worker process of the web server can answer status and download calls.
+    """
+
+    def __init__(self, state_dir, max_workers=2, max_pending=20, result_ttl=3600, use_processes=True,
+                 initializer=None, initargs=()):
+        """:param initializer: see WorkerPool"""
+        self.state_dir = state_dir
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.use_processes = use_processes
+        self._pool = WorkerPool(max_workers, use_processes, initializer, initargs)
+        self._lock = threading.Lock()
+        self._jobs = {}  # job id -> Job
+        self._active = {}  # key -> unfinished Job
+        self.collapsed = 0
+        self.rejected = 0
+
+    def submit(self, key, fn, args=(), meta=None):
+        """
+        Run fn(*args) as a job
+        :param key: jobs with the same key collapse while unfinished
+        :param meta: JSON-serializable details returned with the job status
+        :return: (job, created) where created is False for a collapsed submit
+        """
+        with self._lock:
+            self._prune()
+            job = self._active.get(key)
+            if job is not None:
+                self.collapsed += 1
+                return job, False
+            if len(self._active) >= self.max_pending:
+                self.rejected += 1
+                raise JobQueueFull(f"{len(self._active)} generation jobs are already pending")
+            job = Job(uuid.uuid4().hex, key, meta)
+            self._jobs[job.id] = job
+            self._active[key] = job
+
+        try:
+            self._save(job)
+            future = self._pool.submit(fn, *args)
+        except Exception as e:
+            # --- the job never started, the next submit of key starts a new one
+            with self._lock:
+                if self._active.get(key) is job:
+                    del self._active[key]
+            job._status = "failed"
+            job.err_msg = str(e)
+            job.finished_at = time.time()
+            try:
+                self._save(job)
+            except OSError:
+                pass
+            raise
+        job._future = future
+        future.add_done_callback(partial(self._finish, job))
+        return job, True
+
+    def record(self, key, meta=None):
+        """Register a result that is already available as a finished job, e.g. a cache hit"""
+        job = Job(uuid.uuid4().hex, key, meta)
+        job._status = "done"
+        job.finished_at = time.time()
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._save(job)
+        return job
+
+    def _finish(self, job, future):
+        error = future.exception()
+        with job._lock:
+            job._status = "failed" if error else "done"
+            job.err_msg = str(error) if error else ""
+            job.finished_at = time.time()
+            callbacks, job._callbacks = job._callbacks, []
+        with self._lock:
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+        if isinstance(error, BrokenProcessPool):
+            self._pool.reset()
+        self._save(job)
+        for callback in callbacks:
+            callback(job)
+
+    def get(self, job_id):
+        """Job status dict for job_id, from memory or from the shared state file"""
+        if not _JOB_ID_RE.match(job_id or ""):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        try:
+            with open(self._state_path(job_id), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._active),
+                "max_pending": self.max_pending,
+                "max_workers": self.max_workers,
+                "tracked": len(self._jobs),
+                "collapsed": self.collapsed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def _prune(self):
+        # Forget finished jobs older than result_ttl; caller holds self._lock
+        cutoff = time.time() - self.result_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.is_finished and job.finished_at < cutoff:
+                del self._jobs[job_id]
+                try:
+                    os.remove(self._state_path(job_id))
+                except OSError:
+                    pass
+
+    def _state_path(self, job_id):
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        os.makedirs(self.state_dir, exist_ok=True)
+        data = json.dumps(job.to_dict()).encode("utf-8")
+        write_atomic(self._state_path(job.id), lambda fh: fh.write(data))
@@ -0,0 +1,150 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Upper bounds in seconds, Prometheus style (cumulative with a final +Inf)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Metrics:
+    """
+    In-process counters and latency histograms with Prometheus text output.
+
+    phase() times a named step and also adds it to the current request's
+    timings, which server_timing() turns into a Server-Timing header value.
+    When disabled every call returns right away, so the hooks can stay in place.
+    """
+
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._help = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, labels=(), value=1):
+        """
+        Add value to a counter
+        :param labels: tuple of (label, value) pairs
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=()):
+        """Record one duration in a histogram"""
+        if not self.enabled:
+            return
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    @contextmanager
+    def phase(self, name):
+        """Time the block as app_phase_seconds{phase=name} and as part of the current request"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("app_phase_seconds", elapsed, (("phase", name),))
+            self.add_request_timing(name, elapsed)
+
+    def observe_google_call(self, api, method, seconds, outcome):
+        """RequestExecutor observer: one finished call, retries included"""
+        if not self.enabled:
+            return
+        self.inc("google_api_calls_total", (("api", api), ("method", method), ("outcome", outcome)))
+        self.observe("google_api_call_seconds", seconds, (("api", api), ("method", method)))
+        self.add_request_timing("google", seconds)
+
+    def start_request(self):
+        """Begin collecting Server-Timing entries for the request handled by this thread"""
+        if self.enabled:
+            return _request_timings.set({})
+        return None
+
+    def end_request(self, token):
+        if token is not None:
+            _request_timings.reset(token)
+
+    def add_request_timing(self, name, seconds):
+        timings = _request_timings.get()
+        if timings is not None:
+            total, count = timings.get(name, (0.0, 0))
+            timings[name] = (total + seconds, count + 1)
+
+    def server_timing(self):
+        """Server-Timing header value for the current request, "" when nothing was timed"""
+        timings = _request_timings.get()
+        if not timings:
+            return ""
+        entries = []
+        for name, (total, count) in timings.items():
+            entry = f"{name};dur={total * 1000:.1f}"
+            if count > 1:
+                entry += f';desc="{count} calls"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+
+        lines = []
+        described = set()
+
+        def header(name, metric_type):
+            if name in described:
+                return
+            described.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), values in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for label, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{label}="{value}"')
+    return "{" + ",".join(pairs) + "}"
@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import threading
+from excel_lib.template_sync import write_atomic
+
+
+class _Run:
+    """The in-progress run that other threads of this process wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SharedRun:
+    """
+    Runs a task at most once at a time across threads and worker processes.
+
+    A caller arriving while a run is in progress does not start another one:
+    it waits and gets that run's result. Threads of one process share the
+    run directly. Other processes wait on lock (a FileLock) and then pick
+    up the result stored in result_path, provided the run finished after
+    they asked. Results must be JSON serializable.
+    """
+
+    def __init__(self, lock, result_path):
+        self.lock = lock
+        self.result_path = result_path
+        self._guard = threading.Lock()
+        self._current = None
+        self.runs = 0
+        self.attached = 0
+
+    def run(self, fn):
+        """
+        :return: (result, attached), attached is True when the result came from a run started by another caller
+        """
+        requested_at = time.time()
+        with self._guard:
+            current = self._current
+            owner = current is None
+            if owner:
+                current = self._current = _Run()
+        if not owner:
+            current.done.wait()
+            self.attached += 1
+            if current.error is not None:
+                raise current.error
+            return current.result, True
+
+        try:
+            current.result, attached = self._run_locked(fn, requested_at)
+            return current.result, attached
+        except BaseException as e:
+            current.error = e
+            raise
+        finally:
+            with self._guard:
+                self._current = None
+            current.done.set()
+
+    def _run_locked(self, fn, requested_at):
+        with self.lock:
+            # --- another process finished a run while this one waited for the lock
+            last = self._read_last()
+            if last is not None and last["finished_at"] >= requested_at:
+                self.attached += 1
+                return last["result"], True
+            result = fn()
+            self.runs += 1
+            self._write_last({"finished_at": time.time(), "result": result})
+            return result, False
+
+    def _read_last(self):
+        try:
+            with open(self.result_path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _write_last(self, last):
+        data = json.dumps(last, default=str).encode("utf-8")
+        os.makedirs(os.path.dirname(self.result_path) or ".", exist_ok=True)
+        write_atomic(self.result_path, lambda fh: fh.write(data))
+
+    def stats(self):
+        return {"runs": self.runs, "attached": self.attached, "running": self._current is not None}
@@ -0,0 +1,54 @@
+import time
+import zipfile
+
+# Bytes read from a file per chunk while it is added to a streamed archive
+ZIP_CHUNK_SIZE = 256 * 1024
+
+
+class _ZipOutput:
+    """Write target of a streamed ZipFile, written bytes are taken out with drain()"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries, chunk_size=ZIP_CHUNK_SIZE):
+    """
+    Zip archive produced while it is sent, nothing is buffered beyond one chunk
+    :param entries: iterable of (name, path, bytes or open binary file), consumed lazily so
+                    entries can be yielded as the work producing them finishes; files are closed
+    :return: generator of byte chunks
+    """
+    output = _ZipOutput()
+    # Stored, not deflated: the workbooks inside are zip files already
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, content in entries:
+            info = zipfile.ZipInfo(name, time.localtime()[:6])
+            with zf.open(info, "w") as dest:
+                if isinstance(content, bytes):
+                    dest.write(content)
+                else:
+                    with content if hasattr(content, "read") else open(content, "rb") as fh:
+                        for chunk in iter(lambda: fh.read(chunk_size), b""):
+                            dest.write(chunk)
+                            data = output.drain()
+                            if data:
+                                yield data
+            data = output.drain()
+            if data:
+                yield data
+    data = output.drain()
+    if data:
+        yield data
@@ -0,0 +1,43 @@
+import json
+import threading
+import httplib2
+
+
+class FakeHttp:
+    """
+    Minimal httplib2.Http stand-in that answers every Sheets/Drive call locally.
+
+    Every response carries the keys the GoogleService methods look for, so the
+    real googleapiclient request/response path runs without network access.
+    statuses scripts failures: the first requests answer with those HTTP
+    statuses (e.g. [429, 503]) before the normal 200 responses. An exception
+    in statuses (e.g. TimeoutError()) is raised instead, after the request
+    counts as received. requests records (method, uri, body) of every call.
+    """
+
+    def __init__(self, payload=None, latency=0.0, statuses=None):
+        self.payload = payload or {
+            "values": [["Visible Name", "Filling Name"], ["Option A", "Filling A"]],
+            "name": "Template_Master.xlsm",
+            "files": [],
+        }
+        self.latency = latency
+        self.statuses = list(statuses or [])
+        self.request_count = 0
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        with self._lock:
+            self.request_count += 1
+            self.requests.append((method, uri, body))
+            status = self.statuses.pop(0) if self.statuses else 200
+        if self.latency:
+            threading.Event().wait(self.latency)
+        if isinstance(status, BaseException):
+            raise status
+        response = httplib2.Response({"status": str(status), "content-type": "application/json"})
+        if status != 200:
+            error = {"error": {"code": status, "message": "scripted failure", "errors": [{"reason": "backendError"}]}}
+            return response, json.dumps(error).encode("utf-8")
+        return response, json.dumps(self.payload).encode("utf-8")
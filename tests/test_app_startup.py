@@ -0,0 +1,35 @@
+import os
+import sys
+import json
+import subprocess
+from google_lib import LazyGoogleService
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOADED_MODULES = """
+import sys, json
+from wsgi import app
+prefixes = ("openpyxl", "googleapiclient", "google.oauth2", "httpx")
+print(json.dumps({p: sorted(m for m in sys.modules if m == p or m.startswith(p + ".")) for p in prefixes}))
+"""
+
+
+def test_importing_the_app_defers_workbook_and_google_libraries(tmp_path):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, GENERATED_FOLDER=str(tmp_path / "generated"), APP_PRELOAD="0")
+    result = subprocess.run(
+        [sys.executable, "-c", LOADED_MODULES], cwd=tmp_path, env=env, capture_output=True, text=True, check=True
+    )
+    assert json.loads(result.stdout.splitlines()[-1]) == {
+        "openpyxl": [], "googleapiclient": [], "google.oauth2": [], "httpx": [],
+    }
+
+
+def test_the_service_is_built_once_on_first_use():
+    built = []
+    created = []
+    lazy = LazyGoogleService(lambda: built.append(object()) or built[-1], on_create=created.append)
+    assert not lazy.created and built == []
+
+    assert lazy.get() is lazy.get()
+    assert lazy.created
+    assert created == built and len(built) == 1
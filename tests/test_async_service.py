@@ -0,0 +1,95 @@
+import io
+import asyncio
+import httpx
+from google_lib import AsyncGoogleService, RequestExecutor
+
+CONTENT = bytes(range(256)) * 10
+
+
+class StaticCredentials:
+    valid = True
+
+    def apply(self, headers):
+        headers["authorization"] = "Bearer token"
+
+
+def make_service(handler):
+    executor = RequestExecutor(base_delay=0.001)
+    return AsyncGoogleService(StaticCredentials(), executor=executor, transport=httpx.MockTransport(handler))
+
+
+def run(service, coroutine_fn):
+    async def main():
+        async with service:
+            return await coroutine_fn()
+    return asyncio.run(main())
+
+
+def range_handler(requests, failures=()):
+    """Serves CONTENT in 206 chunks for the requested byte range, failing the listed request numbers with 503"""
+    def handler(request):
+        requests.append(request)
+        if len(requests) in failures:
+            return httpx.Response(503)
+        start, end = map(int, request.headers["range"].removeprefix("bytes=").split("-"))
+        part = CONTENT[start:end + 1]
+        return httpx.Response(
+            206, content=part, headers={"content-range": f"bytes {start}-{start + len(part) - 1}/{len(CONTENT)}"}
+        )
+    return handler
+
+
+def test_download_requests_consecutive_ranges():
+    requests = []
+    service = make_service(range_handler(requests))
+    fh = run(service, lambda: service.download_to("folder/file id", io.BytesIO(), chunk_size=1000))
+
+    assert fh.getvalue() == CONTENT
+    assert [r.headers["range"] for r in requests] == ["bytes=0-999", "bytes=1000-1999", "bytes=2000-2999"]
+    assert all(r.url.params["alt"] == "media" for r in requests)
+    assert requests[0].url.raw_path.startswith(b"/drive/v3/files/folder%2Ffile%20id")
+
+
+def test_a_failed_chunk_is_requested_again_from_the_same_byte():
+    requests = []
+    service = make_service(range_handler(requests, failures={2}))
+    fh = run(service, lambda: service.download_to("file", io.BytesIO(), chunk_size=1000))
+
+    assert fh.getvalue() == CONTENT
+    assert [r.headers["range"] for r in requests] == [
+        "bytes=0-999", "bytes=1000-1999", "bytes=1000-1999", "bytes=2000-2999",
+    ]
+
+
+def test_a_full_response_ends_the_download():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=CONTENT)
+
+    service = make_service(handler)
+    fh = run(service, lambda: service.download_to("file", io.BytesIO(), chunk_size=1000))
+    assert fh.getvalue() == CONTENT
+    assert len(requests) == 1
+
+
+def test_batch_get_sends_every_range_in_one_request():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        ranges = request.url.params.get_list("ranges")
+        return httpx.Response(200, json={"valueRanges": [{"values": [[name]]} for name in ranges[:2]] + [{}]})
+
+    service = make_service(handler)
+    ranges = ["'Fillings'!A1:G", "'FillingsData'!B1:F", "FillingsOrder!A2:A"]
+    values = run(service, lambda: service.batch_get("sheet id", ranges))
+
+    assert len(requests) == 1
+    request = requests[0]
+    assert request.method == "GET"
+    assert request.url.raw_path.startswith(b"/v4/spreadsheets/sheet%20id/values:batchGet?")
+    assert request.url.params.get_list("ranges") == ranges
+    assert request.headers["authorization"] == "Bearer token"
+    assert values == [[["'Fillings'!A1:G"]], [["'FillingsData'!B1:F"]], []]
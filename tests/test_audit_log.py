@@ -0,0 +1,51 @@
+import threading
+import pytest
+from google_lib.request_executor import is_not_applied
+from server_lib import AuditLog
+
+
+def test_claim_timeout_must_outlast_a_send(tmp_path):
+    with pytest.raises(ValueError):
+        AuditLog(str(tmp_path / "audit.sqlite3"), lambda rows: None, claim_timeout=120.0, send_timeout=212.0)
+    audit_log = AuditLog(str(tmp_path / "audit.sqlite3"), lambda rows: None, send_timeout=212.0)
+    assert audit_log.claim_timeout == 424.0
+
+
+def test_rows_being_sent_are_not_claimed_again(tmp_path):
+    db_path = str(tmp_path / "audit.sqlite3")
+    sending = threading.Event()
+    release = threading.Event()
+    sent = []
+
+    def slow_send(rows):
+        sending.set()
+        release.wait(5)
+        sent.extend(rows)
+
+    first = AuditLog(db_path, slow_send, send_timeout=1.0)
+    second = AuditLog(db_path, sent.extend, send_timeout=1.0)
+    with first._connect() as conn:
+        conn.execute("INSERT INTO audit_rows (row) VALUES (?)", ('["row"]',))
+    worker = threading.Thread(target=first.flush)
+    worker.start()
+    assert sending.wait(5)
+    # --- the second process finds the row claimed and sends nothing
+    assert second.flush() == 0
+    release.set()
+    worker.join()
+    assert sent == [["row"]]
+    assert first.pending() == 0
+
+
+@pytest.mark.parametrize("failure, pending", [(ConnectionRefusedError(), 1), (TimeoutError("read timed out"), 0)])
+def test_only_batches_that_were_certainly_not_stored_are_kept(tmp_path, failure, pending):
+    def send(rows):
+        raise failure
+
+    audit_log = AuditLog(str(tmp_path / "audit.sqlite3"), send, send_timeout=1.0, retry_if=is_not_applied)
+    with audit_log._connect() as conn:
+        conn.execute("INSERT INTO audit_rows (row) VALUES (?)", ('["row"]',))
+    with pytest.raises(type(failure)):
+        audit_log.flush()
+    assert audit_log.pending() == pending
+    assert audit_log.stats()["dropped"] == 1 - pending
@@ -0,0 +1,21 @@
+import threading
+from google.auth.credentials import AnonymousCredentials
+from google_lib import GoogleService
+from tests.fake_transport import FakeHttp
+
+
+def test_clients_are_built_once_per_thread():
+    http = FakeHttp()
+    service = GoogleService(creds=AnonymousCredentials(), http_factory=lambda: http)
+    for _ in range(3):
+        service.read_sheet("sheet", "A1:B2")
+        service.get_file_name("master")
+    assert service.clients.build_count == 2
+    assert http.request_count == 6
+
+    thread = threading.Thread(target=service.read_sheet, args=("sheet", "A1:B2"))
+    thread.start()
+    thread.join()
+    # --- a new thread builds its own sheets client, discovery documents stay loaded
+    assert service.clients.build_count == 3
+    assert service.clients.get("sheets", "v4") is service.clients.get("sheets", "v4")
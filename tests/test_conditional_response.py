@@ -0,0 +1,32 @@
+from flask import Flask
+import app as app_module
+
+
+def respond(monkeypatch, headers=None, max_age=0):
+    calls = []
+    monkeypatch.setattr(app_module, "FILLING_OPTIONS_MAX_AGE", max_age)
+    with Flask(__name__).test_request_context(headers=headers or {}):
+        response = app_module.conditional_response("v1", lambda: calls.append(1) or "options")
+    return response, calls
+
+
+def test_a_matching_etag_is_answered_304_without_building(monkeypatch):
+    response, calls = respond(monkeypatch, {"If-None-Match": '"v1"'})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == '"v1"'
+    assert calls == []
+
+
+def test_other_requests_get_the_full_response_to_revalidate(monkeypatch):
+    response, calls = respond(monkeypatch, {"If-None-Match": '"v0"'})
+    assert response.status_code == 200
+    assert response.get_data() == b"options"
+    assert response.headers["ETag"] == '"v1"'
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert calls == [1]
+
+
+def test_a_configured_max_age_replaces_no_cache(monkeypatch):
+    response, _ = respond(monkeypatch, max_age=60)
+    assert response.headers["Cache-Control"] == "max-age=60"
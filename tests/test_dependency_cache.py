@@ -0,0 +1,50 @@
+import os
+from openpyxl import Workbook
+from excel_lib import DependencyCache, collect_dependency_sheets
+
+
+def make_dependency(path, rows=1, value="value"):
+    wb = Workbook()
+    wb.active.title = "List.data"
+    for r in range(rows):
+        wb.active.append([value, f"=A{r + 1}"])
+    wb.create_sheet("Fillings")
+    wb.save(path)
+    return str(path)
+
+
+def test_workbooks_are_read_once_until_they_change(tmp_path):
+    path = make_dependency(tmp_path / "dep0.xlsx")
+    cache = DependencyCache()
+    assert cache.get(path)["List.data"] == [["value", "=A1"]]
+    assert cache.get(path) is cache.get(path)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    make_dependency(path, value="new value")
+    os.utime(path, ns=(1, 1))
+    assert cache.get(path)["List.data"][0][0] == "new value"
+    assert cache.misses == 2
+
+
+def test_least_recently_used_workbooks_are_evicted_past_max_bytes(tmp_path):
+    paths = [make_dependency(tmp_path / f"dep{i}.xlsx", rows=20) for i in range(3)]
+    cache = DependencyCache(max_bytes=1)
+    cache.get(paths[0])
+    assert cache.stats()["entries"] == 0
+
+    one_entry = DependencyCache()
+    one_entry.get(paths[0])
+    cache = DependencyCache(max_bytes=2 * one_entry.stats()["bytes"])
+    for path in (paths[0], paths[1], paths[0], paths[2]):
+        cache.get(path)
+    assert cache.stats()["entries"] == 2
+    cache.get(paths[0])
+    assert cache.hits == 2
+    cache.get(paths[1])
+    assert cache.misses == 4
+
+
+def test_only_dotted_sheets_are_copied(tmp_path):
+    make_dependency(tmp_path / "dep0.xlsx")
+    sheets = collect_dependency_sheets(["dep0", "missing"], str(tmp_path), DependencyCache())
+    assert sheets == [("List.data.dep0", [["value", "=A1"]])]
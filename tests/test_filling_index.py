@@ -0,0 +1,33 @@
+from filling_lib import FillingIndex
+
+FILLING_HEADER = ["Visible Name", "Filling Name", "Loading Code", "SpreadSheet Name"]
+DATA_ROWS = [["Filling Name", "System Type"]]
+
+
+def test_codes_are_used_up_by_the_first_filling_asking_for_them():
+    index = FillingIndex(
+        [FILLING_HEADER, ["A", "A1", "", "s"], ["A", "A2", "LC1", "s"], ["A", "A3", "LC1", "s"]],
+        DATA_ROWS, [["A"]],
+    )
+    result = index.validate(["A"], "LC1")
+    assert list(result["validated_filling_dict"]["A"]) == ["A1", "A2"]
+
+
+def test_every_filling_matches_without_a_loading_code_column():
+    index = FillingIndex(
+        [["Visible Name", "Filling Name", "SpreadSheet Name"], ["A", "A1", "s"], ["A", "A2", "s"]],
+        DATA_ROWS, [["A"]],
+    )
+    result = index.validate(["A"], "LC1")
+    assert result["is_success"]
+    assert list(result["validated_filling_dict"]["A"]) == ["A1", "A2"]
+
+
+def test_the_option_list_version_follows_the_options_only():
+    def version(filling_rows, order_rows):
+        return FillingIndex([FILLING_HEADER] + filling_rows, DATA_ROWS, order_rows).option_list_version
+
+    rows = [["A", "A1", "", "s"], ["B", "B1", "", "s"]]
+    assert version(rows, [["A"], ["B"]]) == version(rows + [["A", "A2", "LC1", "t"]], [["A"], ["B"]])
+    assert version(rows, [["A"], ["B"]]) != version(rows, [["B"], ["A"]])
+    assert version(rows, [["A"], ["B"]]) != version(rows + [["C", "C1", "", "s"]], [["A"], ["B"], ["C"]])
@@ -0,0 +1,38 @@
+from filling_lib import FillingSnapshot
+
+FILLING_ROWS = [["Visible Name", "Filling Name", "Loading Code"], ["A", "A1", ""]]
+DATA_ROWS = [["Filling Name", "System Type"], ["A1", "Type"]]
+
+
+def test_lookups_are_counted_as_hits_and_misses(tmp_path):
+    snapshot = FillingSnapshot(str(tmp_path / "snapshot.json"))
+    assert snapshot.current() is None
+    snapshot.save(FILLING_ROWS, DATA_ROWS, [["A"]])
+    assert snapshot.current().index.option_list == ["A"]
+    assert snapshot.current() is snapshot.current()
+
+    stats = snapshot.stats()
+    assert (stats["hits"], stats["misses"], stats["version"]) == (3, 1, 1)
+
+
+def test_workers_pick_up_a_version_saved_by_another_process(tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    worker, syncer = FillingSnapshot(path), FillingSnapshot(path)
+    syncer.save(FILLING_ROWS, DATA_ROWS, [["A"]])
+    first = worker.current()
+    assert first.version == 1
+    assert worker.current() is first
+
+    syncer.save(FILLING_ROWS + [["B", "B1", ""]], DATA_ROWS, [["A"], ["B"]])
+    second = worker.current()
+    assert second.version == 2
+    assert second.index.option_list == ["A", "B"]
+    assert worker.stats()["loads"] == 2
+
+
+def test_an_unreadable_snapshot_is_a_miss(tmp_path):
+    path = tmp_path / "snapshot.json"
+    path.write_text("{not json")
+    snapshot = FillingSnapshot(str(path))
+    assert snapshot.current() is None
+    assert snapshot.stats()["misses"] == 1
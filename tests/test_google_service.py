@@ -0,0 +1,89 @@
+import io
+import json
+from urllib.parse import parse_qs, urlparse
+import httplib2
+from google.auth.credentials import AnonymousCredentials
+from google_lib import GoogleService, LocalGoogleService
+from tests.fake_transport import FakeHttp
+
+CONTENT = bytes(range(256)) * 10
+RANGES = ["'Fillings'!A1:G", "'FillingsData'!B1:F", "FillingsOrder!A2:A"]
+
+
+def make_service(payload=None):
+    http = FakeHttp(payload=payload)
+    return GoogleService(creds=AnonymousCredentials(), http_factory=lambda: http), http
+
+
+def test_batch_get_reads_every_range_in_one_request():
+    service, http = make_service({"valueRanges": [{"values": [["a"]]}, {}, {"values": [["c"]]}]})
+    assert service.batch_get("sheet", RANGES) == [[["a"]], [], [["c"]]]
+    assert http.request_count == 1
+    method, uri, _ = http.requests[0]
+    assert method == "GET"
+    assert "/values:batchGet" in uri
+    assert parse_qs(urlparse(uri).query)["ranges"] == RANGES
+
+
+def test_batch_update_writes_every_range_in_one_request():
+    service, http = make_service({"totalUpdatedRows": 2})
+    service.batch_update("sheet", [("'Fillings'!A2", [["x", 1]]), ("FillingsOrder!A2", [["y"]])])
+    assert http.request_count == 1
+    method, uri, body = http.requests[0]
+    assert method == "POST"
+    assert "/values:batchUpdate" in uri
+    assert json.loads(body) == {
+        "valueInputOption": "RAW",
+        "data": [
+            {"range": "'Fillings'!A2", "values": [["x", 1]]},
+            {"range": "FillingsOrder!A2", "values": [["y"]]},
+        ],
+    }
+
+
+def test_batch_clear_clears_every_range_in_one_request():
+    service, http = make_service({"clearedRanges": RANGES})
+    service.batch_clear("sheet", RANGES)
+    _, uri, body = http.requests[0]
+    assert "/values:batchClear" in uri
+    assert json.loads(body) == {"ranges": RANGES}
+
+
+def test_large_downloads_spool_to_disk(tmp_path):
+    (tmp_path / "drive" / "excel").mkdir(parents=True)
+    (tmp_path / "drive" / "excel" / "big.xlsx").write_bytes(b"x" * 5000)
+    service = LocalGoogleService(str(tmp_path))
+    with service.download_to_spool("excel/big.xlsx", max_memory=1000) as fh:
+        assert fh._rolled
+        assert fh.read() == b"x" * 5000
+    with service.download_to_spool("excel/big.xlsx") as fh:
+        assert not fh._rolled
+
+
+def test_a_known_file_name_skips_the_metadata_request(tmp_path):
+    (tmp_path / "drive" / "excel").mkdir(parents=True)
+    (tmp_path / "drive" / "excel" / "source.xlsx").write_bytes(b"not a workbook")
+    service = LocalGoogleService(str(tmp_path))
+    service.read_xlsx_file("excel/source.xlsx", file_name="source.xlsx")
+    assert service.request_count == 1
+    service.read_xlsx_file("excel/source.xlsx")
+    assert service.request_count == 3
+
+
+def test_downloads_are_requested_in_chunks():
+    service, http = make_service()
+    requests = []
+
+    def respond(uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        requests.append(headers["range"])
+        start, end = map(int, headers["range"].removeprefix("bytes=").split("-"))
+        part = CONTENT[start:end + 1]
+        response = httplib2.Response({
+            "status": "206", "content-range": f"bytes {start}-{start + len(part) - 1}/{len(CONTENT)}",
+        })
+        return response, part
+
+    http.request = respond
+    fh = service.download_to("file", io.BytesIO(), chunk_size=1000)
+    assert fh.getvalue() == CONTENT
+    assert requests == ["bytes=0-999", "bytes=1000-1999", "bytes=2000-2999"]
@@ -0,0 +1,32 @@
+import threading
+import pytest
+from server_lib import JobQueue
+
+
+def test_a_failed_submit_does_not_block_the_key(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path), use_processes=False)
+
+    def broken_submit(fn, *args):
+        raise RuntimeError("cannot start workers")
+
+    monkeypatch.setattr(queue._pool, "submit", broken_submit)
+    with pytest.raises(RuntimeError):
+        queue.submit("key", len, ("abc",))
+    assert queue.stats()["pending"] == 0
+
+    monkeypatch.undo()
+    job, created = queue.submit("key", len, ("abc",))
+    assert created
+    queue.shutdown()
+    assert job.status == "done"
+
+
+def test_workers_run_the_initializer(tmp_path):
+    seen = []
+    queue = JobQueue(str(tmp_path), use_processes=False, initializer=seen.append, initargs=(1024,))
+    done = threading.Event()
+    job, _ = queue.submit("key", len, ("abc",))
+    job.add_done_callback(lambda finished_job: done.set())
+    assert done.wait(5)
+    queue.shutdown()
+    assert seen == [1024]
@@ -0,0 +1,66 @@
+import os
+import json
+from google_lib import LocalGoogleService
+from google_lib.local_service import MIME_TYPES
+
+
+def make_service(tmp_path):
+    (tmp_path / "sheets").mkdir()
+    (tmp_path / "sheets" / "sheet.json").write_text(json.dumps({
+        "Fillings": [["id", "name", "code"], ["1", "A", ""], ["2", "B", "x"], ["", "", ""]],
+    }))
+    folder = tmp_path / "drive" / "folder"
+    folder.mkdir(parents=True)
+    (folder / "master.xlsm").write_bytes(b"master")
+    (folder / "dep0.xlsx").write_bytes(b"dependency")
+    (folder / "notes.txt").write_bytes(b"notes")
+    return LocalGoogleService(str(tmp_path))
+
+
+def test_ranges_drop_trailing_empty_cells_and_rows(tmp_path):
+    service = make_service(tmp_path)
+    assert service.read_sheet("sheet", "'Fillings'!A2:C") == [["1", "A"], ["2", "B", "x"]]
+    assert service.read_sheet("sheet", "Fillings!B3:B") == [["B"]]
+    assert service.batch_get("sheet", ["Fillings!A1:A1", "Missing!A1:C"]) == [[["id"], ["1"], ["2"]], []]
+
+
+def test_writes_and_clears_land_in_the_spreadsheet(tmp_path):
+    service = make_service(tmp_path)
+    service.batch_update("sheet", [("Fillings!C2", [["y"]]), ("Fillings!B5:C", [["E", None]])])
+    service.clear_range("sheet", "Fillings!C3:C")
+    service.append_sheet("sheet", "Fillings!A1:C", [["3", "C", "z"]])
+
+    assert service.get_values("sheet", "Fillings") == [
+        ["id", "name", "code"], ["1", "A", "y"], ["2", "B", ""], ["", "", ""], ["", "E", ""], ["3", "C", "z"],
+    ]
+    assert service.request_count == 3
+
+
+def test_drive_files_are_served_from_the_folder(tmp_path):
+    service = make_service(tmp_path)
+    query = f"mimeType='{MIME_TYPES['.xlsx']}' or mimeType='{MIME_TYPES['.xlsm']}'"
+    files = service.list_latest_files_in_folder("folder", query)["files"]
+    assert [f["id"] for f in files] == ["folder/dep0.xlsx", "folder/master.xlsm"]
+    assert all(f["modifiedTime"] and f["md5Checksum"] for f in files)
+
+    target = tmp_path / "copy.xlsm"
+    with open(target, "wb") as fh:
+        service.download_to("folder/master.xlsm", fh)
+    assert target.read_bytes() == b"master"
+    assert service.get_file_name("folder/dep0.xlsx") == "dep0.xlsx"
+
+    file_id = service.upload_file(str(target), parent_folder_id="folder")
+    assert file_id == "folder/copy.xlsm"
+    assert os.path.exists(tmp_path / "drive" / "folder" / "copy.xlsm")
+
+
+def test_files_outside_the_drive_folder_are_not_found(tmp_path):
+    service = make_service(tmp_path)
+    result = service.list_latest_files_in_folder("missing")
+    assert not result["is_success"]
+    try:
+        service.get_file_name("../sheets/sheet.json")
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError("expected FileNotFoundError")
@@ -0,0 +1,49 @@
+import os
+import pytest
+from openpyxl import Workbook
+from excel_lib import MasterTemplate
+
+
+def make_master(path, title="Configurator"):
+    wb = Workbook()
+    wb.active.title = title
+    wb.create_sheet("Fillings").append(["Visible Name", "Filling Name"])
+    wb.create_sheet("FillingsData")
+    wb.save(path)
+    return str(path)
+
+
+def test_a_checked_out_copy_is_restored_and_reused(tmp_path):
+    template = MasterTemplate(make_master(tmp_path / "master.xlsx"), pool_size=1)
+    with template.checkout() as wb:
+        wb["Fillings"]["A2"] = "Option A"
+        wb["Fillings"]["A1"] = "changed"
+        wb.create_sheet("Data.dep0")
+    with template.checkout() as wb:
+        assert wb.sheetnames == ["Configurator", "Fillings", "FillingsData"]
+        assert wb["Fillings"]["A1"].value == "Visible Name"
+        assert wb["Fillings"]["A2"].value is None
+    assert template.parse_count == 1
+
+
+def test_the_master_is_parsed_again_after_it_changed(tmp_path):
+    path = make_master(tmp_path / "master.xlsx")
+    template = MasterTemplate(path, pool_size=1)
+    with template.checkout():
+        pass
+    make_master(path, title="Configurator v2")
+    os.utime(path, ns=(1, 1))
+    with template.checkout() as wb:
+        assert wb.sheetnames[0] == "Configurator v2"
+    assert template.parse_count == 2
+
+
+def test_a_failed_request_drops_its_copy(tmp_path):
+    template = MasterTemplate(make_master(tmp_path / "master.xlsx"), pool_size=1)
+    with pytest.raises(RuntimeError):
+        with template.checkout() as wb:
+            wb["Configurator"]["A1"] = "edited outside the restored sheets"
+            raise RuntimeError("build failed")
+    with template.checkout() as wb:
+        assert wb["Configurator"]["A1"].value is None
+    assert template.parse_count == 2
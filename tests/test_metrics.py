@@ -0,0 +1,52 @@
+from server_lib import Metrics
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    token = metrics.start_request()
+    metrics.inc("calls_total")
+    with metrics.phase("build"):
+        pass
+    assert metrics.server_timing() == ""
+    metrics.end_request(token)
+    assert metrics.render() == "\n"
+
+
+def test_counters_and_histograms_render_as_prometheus_text():
+    metrics = Metrics(enabled=True, buckets=(0.1, 1.0))
+    metrics.describe("calls_total", "Calls by outcome")
+    metrics.inc("calls_total", (("outcome", 'say "ok"'),))
+    metrics.inc("calls_total", (("outcome", 'say "ok"'),), value=2)
+    metrics.observe("call_seconds", 0.05)
+    metrics.observe("call_seconds", 0.5)
+    metrics.observe("call_seconds", 5.0)
+
+    assert metrics.render().splitlines() == [
+        "# HELP calls_total Calls by outcome",
+        "# TYPE calls_total counter",
+        'calls_total{outcome="say \\"ok\\""} 3',
+        "# TYPE call_seconds histogram",
+        'call_seconds_bucket{le="0.1"} 1',
+        'call_seconds_bucket{le="1.0"} 2',
+        'call_seconds_bucket{le="+Inf"} 3',
+        "call_seconds_sum 5.55",
+        "call_seconds_count 3",
+    ]
+
+
+def test_request_timings_become_a_server_timing_value():
+    metrics = Metrics(enabled=True)
+    assert metrics.server_timing() == ""
+
+    token = metrics.start_request()
+    with metrics.phase("build"):
+        pass
+    metrics.observe_google_call("sheets", "values.get", 0.010, "ok")
+    metrics.observe_google_call("sheets", "values.get", 0.020, "ok")
+
+    entries = metrics.server_timing().split(", ")
+    assert entries[0].startswith("build;dur=")
+    assert entries[1] == 'google;dur=30.0;desc="2 calls"'
+    metrics.end_request(token)
+    assert metrics.server_timing() == ""
+    assert 'google_api_calls_total{api="sheets",method="values.get",outcome="ok"} 2' in metrics.render()
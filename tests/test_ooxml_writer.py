@@ -0,0 +1,213 @@
+import io
+import re
+import datetime
+import zipfile
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+from excel_lib import OOXMLTemplate, OOXMLUnsupported, build_data_validations, build_workbook
+
+VBA_PROJECT = b"\xd0\xcf\x11\xe0 fake vba project " * 64
+EDITABLE_SHEETS = ("Fillings", "FillingsData")
+
+
+def make_master(path, epoch=None, force_zip64=False, extra_entries=0, encrypted_entry=False):
+    """
+    .xlsm master shaped like the real one: a VBA project, shared strings, and a shared
+    formula anchored at FillingsData!K2 (filling K2:K5)
+    """
+    wb = Workbook()
+    if epoch is not None:
+        wb.epoch = epoch
+    configurator = wb.active
+    configurator.title = "Configurator"
+    configurator["A1"] = "Configurator"
+    fillings = wb.create_sheet("Fillings")
+    fillings.append(["Visible Name", "Filling Name", "Loading Code"])
+    filling_data = wb.create_sheet("FillingsData")
+    filling_data.append(["", "Filling Name", "System Type", "Module"])
+    for r in range(2, 6):
+        filling_data[f"K{r}"] = f"=B{r}*2"
+    source = io.BytesIO()
+    wb.save(source)
+
+    with zipfile.ZipFile(source) as archive:
+        parts = {info.filename: archive.read(info) for info in archive.infolist()}
+    parts["[Content_Types].xml"] = parts["[Content_Types].xml"].replace(
+        b"application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml",
+        b"application/vnd.ms-excel.sheet.macroEnabled.main+xml",
+    ).replace(b"</Types>", b'<Default Extension="bin" ContentType="application/vnd.ms-office.vbaProject"/></Types>')
+    parts["xl/_rels/workbook.xml.rels"] = parts["xl/_rels/workbook.xml.rels"].replace(
+        b"</Relationships>",
+        b'<Relationship Id="rIdVba" Type="http://schemas.microsoft.com/office/2006/relationships/vbaProject" '
+        b'Target="/xl/vbaProject.bin"/></Relationships>',
+    )
+    parts["xl/vbaProject.bin"] = VBA_PROJECT
+
+    def shared(match):
+        row = match.group(1)
+        if row == b"2":
+            return b'<f t="shared" ref="K2:K5" si="0">B2*2</f>'
+        return b'<f t="shared" si="0"/>'
+
+    parts["xl/worksheets/sheet3.xml"] = re.sub(rb"<f>B(\d)\*2</f>", shared, parts["xl/worksheets/sheet3.xml"])
+    assert b'ref="K2:K5"' in parts["xl/worksheets/sheet3.xml"]
+    use_shared_strings(parts)
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in parts.items():
+            with archive.open(name, "w", force_zip64=force_zip64) as fh:
+                fh.write(data)
+        for i in range(extra_entries):
+            archive.writestr(f"customXml/item{i}.xml", b"")
+        if encrypted_entry:
+            archive.writestr("xl/secret.bin", b"secret")
+    if encrypted_entry:
+        with open(path, "r+b") as fh:
+            data = bytearray(fh.read())
+            # --- set the encryption flag in the last central directory record
+            record = data.rindex(b"PK\x01\x02")
+            data[record + 8] |= 0x01
+            fh.seek(0)
+            fh.write(data)
+    return str(path)
+
+
+def use_shared_strings(parts):
+    """Move the inline strings openpyxl writes into xl/sharedStrings.xml, as Excel stores them"""
+    strings = []
+
+    def shared(match):
+        strings.append(match.group(2))
+        return b'<c r="%s" t="s"><v>%d</v></c>' % (match.group(1), len(strings) - 1)
+
+    for name in [name for name in parts if name.startswith("xl/worksheets/")]:
+        parts[name] = re.sub(rb'<c r="(\w+)" t="inlineStr"><is><t>([^<]*)</t></is></c>', shared, parts[name])
+    assert strings
+    parts["xl/sharedStrings.xml"] = (
+        b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="%d" uniqueCount="%d">'
+        % (len(strings), len(strings)) + b"".join(b"<si><t>%s</t></si>" % text for text in strings) + b"</sst>"
+    )
+    parts["[Content_Types].xml"] = parts["[Content_Types].xml"].replace(
+        b"</Types>",
+        b'<Override PartName="/xl/sharedStrings.xml" '
+        b'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>',
+    )
+    parts["xl/_rels/workbook.xml.rels"] = parts["xl/_rels/workbook.xml.rels"].replace(
+        b"</Relationships>",
+        b'<Relationship Id="rIdStrings" '
+        b'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+        b'Target="/xl/sharedStrings.xml"/></Relationships>',
+    )
+
+
+def render(master_path, cell_updates=None, new_sheets=()):
+    template = OOXMLTemplate(master_path, {"Configurator": build_data_validations()}, EDITABLE_SHEETS)
+    output = io.BytesIO()
+    template.render(output, cell_updates, new_sheets)
+    output.seek(0)
+    return output
+
+
+def test_round_trip_keeps_vba_shared_strings_and_shared_formulas(tmp_path):
+    master_path = make_master(tmp_path / "Template_Master.xlsm")
+    output = render(
+        master_path,
+        {
+            "Fillings": (2, 1, [["Option A", "Filling A", "LC1"], ["Option B", "Filling B", None]]),
+            "FillingsData": (2, 2, [["Filling A", "Type", 3], ["Filling B", "Type", 4.5]]),
+        },
+        [("Data.dep0", [["name", 1], ["other", True]], "hidden")],
+    )
+
+    with zipfile.ZipFile(output) as archive:
+        assert archive.testzip() is None
+        assert archive.read("xl/vbaProject.bin") == VBA_PROJECT
+        with zipfile.ZipFile(master_path) as master:
+            assert archive.read("xl/sharedStrings.xml") == master.read("xl/sharedStrings.xml")
+        assert "xl/calcChain.xml" not in archive.namelist()
+
+    wb = load_workbook(output, keep_vba=True)
+    assert wb.vba_archive is not None
+    assert [c.value for c in wb["Fillings"][1]] == ["Visible Name", "Filling Name", "Loading Code"]
+    assert [c.value for c in wb["Fillings"][3]] == ["Option B", "Filling B", None]
+    filling_data = wb["FillingsData"]
+    assert [c.value for c in filling_data[2]][1:4] == ["Filling A", "Type", 3]
+    assert filling_data["D3"].value == 4.5
+    assert [filling_data[f"K{r}"].value for r in range(2, 6)] == ["=B2*2", "=B3*2", "=B4*2", "=B5*2"]
+    assert wb["Data.dep0"].sheet_state == "hidden"
+    assert [[c.value for c in row] for row in wb["Data.dep0"].iter_rows()] == [["name", 1], ["other", True]]
+    assert len(wb["Configurator"].data_validations.dataValidation) == len(build_data_validations())
+
+
+def test_dates_are_written_as_serials_with_date_formats(tmp_path):
+    master_path = make_master(tmp_path / "Template_Master.xlsm")
+    row = [
+        datetime.datetime(2024, 3, 1, 12, 30), datetime.date(2024, 3, 1),
+        datetime.time(6, 15), datetime.timedelta(hours=30), "text",
+    ]
+    output = render(master_path, {"Fillings": (2, 1, [row])}, [("Data.dep0", [row], "hidden")])
+
+    wb = load_workbook(output)
+    for ws, written_row in ((wb["Data.dep0"], 1), (wb["Fillings"], 2)):
+        cells = ws[written_row]
+        assert cells[0].value == datetime.datetime(2024, 3, 1, 12, 30)
+        assert cells[0].number_format == "yyyy-mm-dd h:mm:ss"
+        assert cells[1].value == datetime.datetime(2024, 3, 1)
+        assert cells[1].number_format == "yyyy-mm-dd"
+        assert cells[2].value == datetime.time(6, 15)
+        assert cells[3].value == datetime.timedelta(hours=30)
+        assert cells[4].value == "text"
+
+
+def test_dates_follow_the_1904_date_system(tmp_path):
+    master_path = make_master(tmp_path / "Template_Master.xlsm", epoch=CALENDAR_MAC_1904)
+    output = render(master_path, new_sheets=[("Data.dep0", [[datetime.date(2024, 3, 1)]], "hidden")])
+    assert load_workbook(output)["Data.dep0"]["A1"].value == datetime.datetime(2024, 3, 1)
+
+
+def test_timezone_aware_datetimes_are_unsupported(tmp_path):
+    master_path = make_master(tmp_path / "Template_Master.xlsm")
+    value = datetime.datetime(2024, 3, 1, tzinfo=datetime.timezone.utc)
+    with pytest.raises(OOXMLUnsupported):
+        render(master_path, new_sheets=[("Data.dep0", [[value]], "hidden")])
+
+
+def test_overwriting_a_shared_formula_anchor_falls_back_to_openpyxl(tmp_path):
+    master_path = make_master(tmp_path / "Template_Master.xlsm")
+    # Ten columns from B reach the anchor in K2
+    row = ["Filling A"] + [str(i) for i in range(9)]
+    with pytest.raises(OOXMLUnsupported):
+        render(master_path, {"FillingsData": (2, 2, [row])})
+
+    output = io.BytesIO()
+    build_workbook(master_path, output, [], [row], [], str(tmp_path), use_ooxml=True)
+    output.seek(0)
+    filling_data = load_workbook(output, keep_vba=True)["FillingsData"]
+    assert filling_data["B2"].value == "Filling A"
+    assert filling_data["K2"].value == 8
+    assert filling_data["K3"].value == "=B3*2"
+
+
+def test_zip64_entries_in_the_master_are_copied(tmp_path):
+    master_path = make_master(tmp_path / "Template_Master.xlsm", force_zip64=True)
+    output = render(master_path, {"Fillings": (2, 1, [["Option A"]])})
+    with zipfile.ZipFile(output) as archive:
+        assert archive.testzip() is None
+        assert archive.read("xl/vbaProject.bin") == VBA_PROJECT
+    assert load_workbook(output)["Fillings"]["A2"].value == "Option A"
+
+
+def test_archives_needing_zip64_are_unsupported(tmp_path):
+    with zipfile.ZipFile(make_master(tmp_path / "plain.xlsm")) as archive:
+        part_count = len(archive.namelist())
+    # The master fits a plain zip, the new sheet makes 0xFFFF entries, which need zip64
+    master_path = make_master(tmp_path / "Template_Master.xlsm", extra_entries=0xFFFE - part_count)
+    with pytest.raises(OOXMLUnsupported, match="zip64"):
+        render(master_path, new_sheets=[("Data.dep0", [["name"]], "hidden")])
+
+
+def test_encrypted_entries_are_unsupported(tmp_path):
+    master_path = make_master(tmp_path / "Template_Master.xlsm", encrypted_entry=True)
+    with pytest.raises(OOXMLUnsupported, match="encrypted"):
+        OOXMLTemplate(master_path, None, EDITABLE_SHEETS)
@@ -0,0 +1,98 @@
+import pytest
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.errors import HttpError
+from tests.fake_transport import FakeHttp
+from google_lib import DeadlineExceeded, GoogleService, RequestExecutor
+
+
+class FakeClock:
+    """clock and sleep for the executor: sleeping only moves the clock"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class UpperBoundRng:
+    """Jitter that always picks the full delay, so backoff is predictable"""
+
+    def uniform(self, low, high):
+        return high
+
+
+def make_service(statuses, **executor_options):
+    clock = FakeClock()
+    http = FakeHttp(statuses=statuses)
+    executor = RequestExecutor(clock=clock, sleep=clock.sleep, rng=UpperBoundRng(), **executor_options)
+    service = GoogleService(creds=AnonymousCredentials(), http_factory=lambda: http, executor=executor)
+    return service, http, clock
+
+
+def test_quota_and_server_errors_are_retried_with_exponential_backoff():
+    service, http, clock = make_service([429, 503, 500])
+    assert service.read_sheet("sheet", "A1:B2")[0] == ["Visible Name", "Filling Name"]
+    assert http.request_count == 4
+    assert clock.sleeps == [0.5, 1.0, 2.0]
+    assert service.executor.stats()["retries"] == 3
+
+
+def test_backoff_is_capped_at_max_delay():
+    service, http, clock = make_service([503] * 4, max_delay=1.5)
+    service.read_sheet("sheet", "A1:B2")
+    assert clock.sleeps == [0.5, 1.0, 1.5, 1.5]
+
+
+def test_client_errors_are_not_retried():
+    service, http, clock = make_service([400])
+    with pytest.raises(HttpError):
+        service.read_sheet("sheet", "A1:B2")
+    assert http.request_count == 1
+    assert clock.sleeps == []
+    assert service.executor.stats()["failures"] == 1
+
+
+def test_timeouts_of_idempotent_calls_are_retried():
+    service, http, clock = make_service([TimeoutError("read timed out")])
+    service.read_sheet("sheet", "A1:B2")
+    assert http.request_count == 2
+
+
+def test_retries_stop_after_max_retries():
+    service, http, clock = make_service([503] * 10, max_retries=3)
+    with pytest.raises(HttpError):
+        service.read_sheet("sheet", "A1:B2")
+    assert http.request_count == 4
+    assert clock.sleeps == [0.5, 1.0, 2.0]
+
+
+def test_backoff_past_the_deadline_gives_up():
+    service, http, clock = make_service([503] * 10, deadline=3.0)
+    with pytest.raises(DeadlineExceeded):
+        service.read_sheet("sheet", "A1:B2")
+    # 0.5 + 1.0 fit in 3 seconds, the next 2.0 would not
+    assert clock.sleeps == [0.5, 1.0]
+    assert http.request_count == 3
+
+
+@pytest.mark.parametrize("failure", [TimeoutError("read timed out"), ConnectionResetError(), 503, 500])
+def test_append_is_not_resent_when_the_server_may_have_stored_it(failure):
+    service, http, clock = make_service([failure])
+    with pytest.raises((HttpError, OSError)):
+        service.append_sheet("sheet", "Log!A1", [["row"]])
+    assert http.request_count == 1
+    assert clock.sleeps == []
+
+
+@pytest.mark.parametrize("failure", [429, ConnectionRefusedError()])
+def test_append_is_retried_when_the_request_was_not_applied(failure):
+    service, http, clock = make_service([failure])
+    service.append_sheet("sheet", "Log!A1", [["row"]])
+    assert http.request_count == 2
+    assert clock.sleeps == [0.5]
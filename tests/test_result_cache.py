@@ -0,0 +1,73 @@
+import os
+import time
+from excel_lib import ResultCache
+
+
+def make_templates(tmp_path):
+    folder = tmp_path / "templates"
+    folder.mkdir()
+    (folder / "master.xlsm").write_bytes(b"master")
+    (folder / "dep0.xlsx").write_bytes(b"dependency")
+    return str(folder / "master.xlsm"), str(folder)
+
+
+def test_keys_follow_the_selection_and_the_template_versions(tmp_path):
+    master_path, folder = make_templates(tmp_path)
+    cache = ResultCache(str(tmp_path / "results"))
+    key = cache.key_for(master_path, [["A1"]], [["B1"]], ["dep0"], folder)
+
+    assert key == cache.key_for(master_path, [["A1"]], [["B1"]], ["dep0"], folder)
+    assert key != cache.key_for(master_path, [["A2"]], [["B1"]], ["dep0"], folder)
+
+    os.utime(os.path.join(folder, "dep0.xlsx"), ns=(1, 1))
+    assert key != cache.key_for(master_path, [["A1"]], [["B1"]], ["dep0"], folder)
+
+
+def test_stored_results_are_hits(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"))
+    assert cache.get("key") is None
+
+    path = cache.store("key", lambda tmp_path: open(tmp_path, "wb").write(b"workbook"))
+    assert cache.get("key") == path
+    assert open(path, "rb").read() == b"workbook"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert os.listdir(cache.folder) == ["key.xlsm"]
+
+
+def test_a_failed_build_leaves_nothing_behind(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"))
+
+    def build(tmp_path):
+        open(tmp_path, "wb").write(b"partial")
+        raise ValueError("broken")
+
+    try:
+        cache.store("key", build)
+    except ValueError:
+        pass
+    assert os.listdir(cache.folder) == []
+    assert cache.get("key") is None
+
+
+def test_least_recently_used_results_are_evicted_past_max_bytes(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"))
+    now = time.time()
+    for age, key in enumerate(["a", "b", "c"]):
+        path = cache.store(key, lambda tmp_path: open(tmp_path, "wb").write(b"x" * 8))
+        os.utime(path, (now - 100 + age, now - 100 + age))
+    # --- reading "a" makes it the most recently used
+    cache.get("a")
+    cache.max_bytes = 20
+    cache.store("d", lambda tmp_path: open(tmp_path, "wb").write(b"x" * 8))
+
+    assert sorted(os.listdir(cache.folder)) == ["a.xlsm", "d.xlsm"]
+    assert cache.evicted == 2
+
+
+def test_results_unused_for_max_age_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"), max_age=60)
+    old = cache.store("old", lambda tmp_path: open(tmp_path, "wb").write(b"x"))
+    os.utime(old, (time.time() - 120, time.time() - 120))
+    cache.store("new", lambda tmp_path: open(tmp_path, "wb").write(b"x"))
+
+    assert os.listdir(cache.folder) == ["new.xlsm"]
@@ -0,0 +1,78 @@
+import time
+import threading
+import pytest
+from server_lib import FileLock, SharedRun
+
+
+def test_a_held_lock_excludes_other_holders_of_the_path(tmp_path):
+    path = str(tmp_path / "locks" / "sync.lock")
+    first, second = FileLock(path), FileLock(path)
+    with first:
+        assert not second.acquire(blocking=False)
+        assert not first.acquire(blocking=False)
+    assert second.acquire(blocking=False)
+    second.release()
+
+
+def start_blocked_run(shared_run, result):
+    """Run on a thread that holds the lock until release is set"""
+    started, release = threading.Event(), threading.Event()
+    outcome = []
+
+    def fn():
+        started.set()
+        release.wait(5)
+        return result
+
+    thread = threading.Thread(target=lambda: outcome.append(shared_run.run(fn)))
+    thread.start()
+    assert started.wait(5)
+    return thread, release, outcome
+
+
+def run_in_thread(shared_run, fn):
+    outcome = []
+    thread = threading.Thread(target=lambda: outcome.append(shared_run.run(fn)))
+    thread.start()
+    return thread, outcome
+
+
+def test_callers_during_a_run_get_its_result(tmp_path):
+    shared_run = SharedRun(FileLock(str(tmp_path / "sync.lock")), str(tmp_path / "last_sync.json"))
+    owner, release, owner_outcome = start_blocked_run(shared_run, {"synced": 3})
+    waiter, waiter_outcome = run_in_thread(shared_run, lambda: pytest.fail("started a second run"))
+    time.sleep(0.05)
+    release.set()
+    owner.join()
+    waiter.join()
+
+    assert owner_outcome == [({"synced": 3}, False)]
+    assert waiter_outcome == [({"synced": 3}, True)]
+    assert shared_run.stats() == {"runs": 1, "attached": 1, "running": False}
+
+
+def test_a_run_finished_by_another_process_is_picked_up(tmp_path):
+    # --- separate instances on the same paths stand in for two worker processes
+    paths = str(tmp_path / "sync.lock"), str(tmp_path / "last_sync.json")
+    first, second = SharedRun(FileLock(paths[0]), paths[1]), SharedRun(FileLock(paths[0]), paths[1])
+    owner, release, _ = start_blocked_run(first, {"synced": 3})
+    waiter, waiter_outcome = run_in_thread(second, lambda: pytest.fail("started a second run"))
+    time.sleep(0.05)
+    release.set()
+    owner.join()
+    waiter.join()
+    assert waiter_outcome == [({"synced": 3}, True)]
+
+    # --- a result finished before the request is not reused
+    assert second.run(lambda: {"synced": 0}) == ({"synced": 0}, False)
+
+
+def test_a_failed_run_raises_for_every_caller(tmp_path):
+    shared_run = SharedRun(FileLock(str(tmp_path / "sync.lock")), str(tmp_path / "last_sync.json"))
+
+    def fail():
+        raise ValueError("sync failed")
+
+    with pytest.raises(ValueError):
+        shared_run.run(fail)
+    assert shared_run.run(lambda: "ok") == ("ok", False)
@@ -0,0 +1,30 @@
+from filling_lib import changed_row_runs, merge_option_order, rows_as_read
+
+
+def test_only_changed_rows_are_written_in_runs():
+    current = [["A", "1"], ["B", "2"], ["C", "3"], ["D", "4"]]
+    new = [["A", 1], ["B", "changed"], ["C", "changed"], ["D", 4.0]]
+    assert changed_row_runs(current, new, 2) == [(1, [["B", "changed"], ["C", "changed"]])]
+
+
+def test_cells_read_back_as_text_are_not_changes():
+    current = [["TRUE", "5"], ["x"]]
+    new = [[True, 5.0], ["x", None, "cut past the width"]]
+    assert changed_row_runs(current, new, 2) == []
+
+
+def test_rows_past_the_new_table_are_blanked():
+    current = [["A"], ["B"], ["C"]]
+    assert changed_row_runs(current, [["A"]], 2) == [(1, [["", ""], ["", ""]])]
+    assert changed_row_runs([["A"]], [["A"], [], ["C"]], 1) == [(2, [["C"]])]
+
+
+def test_option_order_keeps_existing_positions_and_appends_new_options():
+    current = ["B", "gone", "A"]
+    options = ["A", "C", "B", "C", "D"]
+    assert merge_option_order(current, options) == ["B", "A", "C", "D"]
+
+
+def test_rows_as_read_trims_trailing_blanks():
+    rows = [[1.0, None, ""], [], ["x", False, "cut"], [None], [""]]
+    assert rows_as_read(rows, 2) == [["1"], [], ["x", "FALSE"]]
@@ -0,0 +1,38 @@
+from filling_lib import SyncManifest
+
+FILE = {"id": "f1", "name": "source.xlsx", "modifiedTime": "2026-01-01T00:00:00Z", "md5Checksum": "abc"}
+CONTENT = {"Fillings": [["Visible Name"], ["A"]]}
+
+
+def test_stored_rows_are_reused_only_for_the_same_drive_version(tmp_path):
+    manifest = SyncManifest(str(tmp_path / "manifest.json"))
+    assert manifest.get_content(FILE) is None
+    manifest.update(FILE, CONTENT)
+    assert manifest.get_content(FILE) == CONTENT
+    assert manifest.get_content(dict(FILE, md5Checksum="def")) is None
+    assert manifest.get_content(dict(FILE, modifiedTime="2026-01-02T00:00:00Z")) is None
+    # --- without a modifiedTime the version is unknown, the file is downloaded again
+    assert manifest.get_content(dict(FILE, modifiedTime=None)) is None
+
+
+def test_saved_entries_survive_a_restart_and_removed_files_are_pruned(tmp_path):
+    path = str(tmp_path / "cache" / "manifest.json")
+    manifest = SyncManifest(path)
+    manifest.update(FILE, CONTENT)
+    manifest.update(dict(FILE, id="f2"), CONTENT)
+    manifest.prune(["f1"])
+    manifest.save()
+
+    restarted = SyncManifest(path)
+    assert restarted.get_content(FILE) == CONTENT
+    assert restarted.get_content(dict(FILE, id="f2")) is None
+
+
+def test_reload_picks_up_a_manifest_saved_by_another_worker(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    worker, syncer = SyncManifest(path), SyncManifest(path)
+    syncer.update(FILE, CONTENT)
+    syncer.save()
+    assert worker.get_content(FILE) is None
+    worker.reload()
+    assert worker.get_content(FILE) == CONTENT
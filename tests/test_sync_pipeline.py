@@ -0,0 +1,48 @@
+import time
+import threading
+from filling_lib import fetch_xlsx_files
+
+FILES = [{"id": f"f{i}", "name": f"source{i}.xlsx"} for i in range(4)]
+
+
+class StubService:
+    """read_xlsx_file that fails for f2 and finishes the files in reverse order"""
+
+    def __init__(self):
+        self.parsers = set()
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def read_xlsx_file(self, file_id, sheet_name_list=None, file_name=None, parser=None):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.parsers.add(parser)
+        time.sleep(0.05 * (4 - int(file_id[1:])))
+        with self._lock:
+            self.running -= 1
+        if file_id == "f2":
+            raise ConnectionResetError("reset")
+        return {"is_success": True, "err_msg": "", "file_name": file_name, "file_content": {"Fillings": [[file_id]]}}
+
+
+def test_results_keep_the_listing_order_and_failures_stay_per_file():
+    service = StubService()
+    results = fetch_xlsx_files(service, FILES, ["Fillings"], max_workers=4)
+
+    assert [r["file_id"] for r in results] == ["f0", "f1", "f2", "f3"]
+    assert [r["is_success"] for r in results] == [True, True, False, True]
+    assert results[2]["file_name"] == "source2.xlsx"
+    assert "reset" in results[2]["err_msg"]
+    assert all(r["seconds"] > 0 for r in results)
+    assert service.max_running > 1
+    # --- every file is parsed read-only by the same streaming parser
+    assert len(service.parsers) == 1 and None not in service.parsers
+
+
+def test_max_workers_bounds_parallel_downloads():
+    service = StubService()
+    fetch_xlsx_files(service, FILES, ["Fillings"], max_workers=1)
+    assert service.max_running == 1
+    assert fetch_xlsx_files(service, [], ["Fillings"]) == []
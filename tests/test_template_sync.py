@@ -0,0 +1,70 @@
+import os
+import json
+from excel_lib import load_template_index, sync_templates
+
+
+class StubDrive:
+    """download_to that writes the file id, failing for ids listed in failing"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.downloads = []
+
+    def download_to(self, file_id, fh):
+        self.downloads.append(file_id)
+        fh.write(b"partial")
+        if file_id in self.failing:
+            raise ConnectionResetError("reset")
+        fh.write(file_id.encode("utf-8"))
+
+
+def drive_file(file_id, name, modified="2026-01-01T00:00:00Z"):
+    return {"id": file_id, "name": name, "modifiedTime": modified, "md5Checksum": f"md5-{modified}"}
+
+
+def test_the_template_index_is_parsed_again_only_after_it_changed(tmp_path):
+    path = tmp_path / ".template_index.json"
+    path.write_text(json.dumps({"Template_Master.xlsm": {"id": "master"}}))
+    index = load_template_index(str(path))
+    assert index.name_for_id("master") == "Template_Master.xlsm"
+    assert load_template_index(str(path)) is index
+
+    path.write_text(json.dumps({"Template_Master v2.xlsm": {"id": "master"}}))
+    assert load_template_index(str(path)).name_for_id("master") == "Template_Master v2.xlsm"
+
+
+def test_a_missing_template_index_is_empty(tmp_path):
+    assert load_template_index(str(tmp_path / "missing.json")).name_for_id("master") is None
+
+
+def test_only_changed_templates_are_downloaded(tmp_path):
+    folder = str(tmp_path / "templates")
+    files = [drive_file("master", "Template_Master.xlsm"), drive_file("dep", "dep0.xlsx")]
+    drive = StubDrive()
+    assert sync_templates(drive, files, folder)["downloaded"] == 2
+
+    files[1] = drive_file("dep", "dep0.xlsx", modified="2026-02-01T00:00:00Z")
+    result = sync_templates(drive, files, folder)
+    assert (result["downloaded"], result["skipped"]) == (1, 1)
+    assert drive.downloads == ["master", "dep", "dep"]
+    assert load_template_index(os.path.join(folder, ".template_index.json")).name_for_id("master") == (
+        "Template_Master.xlsm"
+    )
+
+    assert sync_templates(drive, files, folder, force=True)["downloaded"] == 2
+
+
+def test_a_failed_download_keeps_the_previous_copy(tmp_path):
+    folder = str(tmp_path / "templates")
+    sync_templates(StubDrive(), [drive_file("dep", "dep0.xlsx")], folder)
+    changed = [drive_file("dep", "dep0.xlsx", modified="2026-02-01T00:00:00Z")]
+
+    result = sync_templates(StubDrive(failing={"dep"}), changed, folder)
+    assert result["failed"] == 1
+    assert result["files"][0]["err_msg"] == "reset"
+    with open(os.path.join(folder, "dep0.xlsx"), "rb") as fh:
+        assert fh.read() == b"partialdep"
+    # --- no temp file is left behind
+    assert sorted(os.listdir(folder)) == [".template_index.json", "dep0.xlsx"]
+    # --- still out of date, the next refresh tries again
+    assert sync_templates(StubDrive(), changed, folder)["downloaded"] == 1
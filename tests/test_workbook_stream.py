@@ -0,0 +1,45 @@
+import io
+import os
+from excel_lib import ResultCache, WorkbookStream
+
+CONTENT = bytes(range(256)) * 40
+
+
+def test_a_kept_workbook_is_stored_while_it_is_sent(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"))
+    stream = WorkbookStream(io.BytesIO(CONTENT), cache, "key", chunk_size=1000)
+    assert stream.size == len(CONTENT)
+
+    assert b"".join(stream) == CONTENT
+    stream.close()
+    assert open(cache.get("key"), "rb").read() == CONTENT
+    assert os.listdir(cache.folder) == ["key.xlsm"]
+
+
+def test_the_rest_is_stored_when_the_client_goes_away(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"))
+    stream = WorkbookStream(io.BytesIO(CONTENT), cache, "key", chunk_size=1000)
+    chunks = iter(stream)
+    assert next(chunks) == CONTENT[:1000]
+    chunks.close()
+    stream.close()
+
+    assert open(cache.get("key"), "rb").read() == CONTENT
+    assert os.listdir(cache.folder) == ["key.xlsm"]
+
+
+def test_a_stream_never_iterated_is_still_stored(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"))
+    fh = io.BytesIO(CONTENT)
+    WorkbookStream(fh, cache, "key").close()
+
+    assert fh.closed
+    assert open(cache.get("key"), "rb").read() == CONTENT
+
+
+def test_without_a_cache_nothing_is_written(tmp_path):
+    fh = io.BytesIO(CONTENT)
+    stream = WorkbookStream(fh, chunk_size=1000)
+    assert b"".join(stream) == CONTENT
+    stream.close()
+    assert fh.closed
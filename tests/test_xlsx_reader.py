@@ -0,0 +1,55 @@
+import io
+from openpyxl import Workbook
+from excel_lib import iter_sheet_rows, read_sheet_rows
+from filling_lib.sync_pipeline import read_workbook_rows
+from google_lib import LocalGoogleService
+
+
+def make_workbook(path=None):
+    wb = Workbook()
+    fillings = wb.active
+    fillings.title = "Fillings"
+    fillings.append(["Visible Name", "Filling Name"])
+    fillings.append(["A", "A1"])
+    fillings.append([None, None])
+    fillings.append(["B", "B1"])
+    # A formatted cell far below the data makes openpyxl report trailing blank rows
+    fillings["A40"].number_format = "0.00"
+    wb.create_sheet("Other").append(["never read"])
+    target = path or io.BytesIO()
+    wb.save(target)
+    return target
+
+
+def test_trailing_blank_rows_are_dropped_and_inner_ones_kept():
+    rows = read_sheet_rows(make_workbook(), ["Fillings", "Missing"])
+    assert rows == {"Fillings": [["Visible Name", "Filling Name"], ["A", "A1"], [None, None], ["B", "B1"]]}
+
+
+def test_a_sheet_ends_after_max_blank_rows():
+    assert read_sheet_rows(make_workbook(), ["Fillings"], max_blank_rows=1)["Fillings"] == [
+        ["Visible Name", "Filling Name"], ["A", "A1"],
+    ]
+
+
+def test_only_requested_sheets_are_read():
+    assert [name for name, _ in iter_sheet_rows(make_workbook(), ["Other"])] == ["Other"]
+
+
+def test_read_xlsx_file_parses_with_the_given_parser(tmp_path):
+    (tmp_path / "drive" / "excel").mkdir(parents=True)
+    make_workbook(str(tmp_path / "drive" / "excel" / "source.xlsx"))
+    service = LocalGoogleService(str(tmp_path))
+
+    streamed = service.read_xlsx_file("excel/source.xlsx", ["Fillings"], parser=read_workbook_rows)
+    assert streamed["is_success"] and streamed["file_name"] == "source.xlsx"
+    assert streamed["file_content"]["Fillings"][-1] == ["B", "B1"]
+
+    full = service.read_xlsx_file("excel/source.xlsx", file_name="known.xlsx")
+    assert full["file_name"] == "known.xlsx"
+    assert set(full["file_content"]) == {"Fillings", "Other"}
+    assert len(full["file_content"]["Fillings"]) == 40
+
+    missing = service.read_xlsx_file("excel/missing.xlsx")
+    assert not missing["is_success"]
+    assert missing["err_msg"].startswith("Error reading XLSX file from Google Drive")
@@ -0,0 +1,16 @@
+import io
+import zipfile
+from server_lib import stream_zip
+
+
+def test_entries_can_be_paths_bytes_or_open_files(tmp_path):
+    path = tmp_path / "a.xlsm"
+    path.write_bytes(b"from a path")
+    fh = open(tmp_path / "a.xlsm", "rb")
+    archive = b"".join(stream_zip([("a.xlsm", str(path)), ("b.xlsm", fh), ("summary.json", b"{}")], chunk_size=4))
+
+    assert fh.closed
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert zf.read("a.xlsm") == b"from a path"
+        assert zf.read("b.xlsm") == b"from a path"
+        assert zf.read("summary.json") == b"{}"